@@ -0,0 +1,196 @@
+"""
+API JSON de solo lectura para horarios y catálogos.
+
+GET /api/<recurso> lista semestres, profesores, cursos, clases o cronogramas:
+- `campos=a,b`: solo esas columnas (la clave del recurso siempre se incluye);
+- filtros `id_semestre`, `id_curso`, `id_profesor` según el recurso;
+- paginación por cursor: `limite` filas (LIMITE_POR_DEFECTO, hasta
+  LIMITE_MAXIMO) ordenadas por clave, y `siguiente` para pedir la página
+  siguiente con `cursor=`; a diferencia de OFFSET, no depende de cuántas filas
+  haya antes.
+
+El ETag de cada respuesta sale de los contadores de cambios de las tablas que
+lee el recurso (`versiones_tablas`, ver database.TABLAS_VERSIONADAS), así que
+un cliente que revalida recibe 304 mientras ninguna de ellas cambie.
+GET /api/cronogramas/<id> retorna un horario con sus entradas, con el ETag de
+su versión en `versiones_cronogramas`.
+"""
+from flask import Blueprint, request, jsonify, abort, make_response
+from werkzeug.http import is_resource_modified
+
+from database import get_db_connection, version_tabla
+
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 500
+
+# recurso -> FROM, columna clave, campos publicados, filtros admitidos y tablas de las que depende
+RECURSOS = {
+    'semestres': {
+        'desde': "semestres se",
+        'clave': 'id_semestre',
+        'campos': {'id_semestre': 'se.id_semestre', 'nombre': 'se.nombre',
+                   'fecha_inicio': 'se.fecha_inicio', 'fecha_fin': 'se.fecha_fin'},
+        'filtros': {},
+        'tablas': ('semestres',),
+    },
+    'profesores': {
+        'desde': "profesores p",
+        'clave': 'id_profesor',
+        'campos': {'id_profesor': 'p.id_profesor', 'cedula': 'p.cedula', 'nombre': 'p.nombre',
+                   'correo': 'p.correo', 'telefono': 'p.telefono'},
+        'filtros': {
+            'id_semestre': "EXISTS (SELECT 1 FROM clases cl WHERE cl.id_profesor = p.id_profesor AND cl.id_semestre = ?)",
+            'id_curso': "EXISTS (SELECT 1 FROM clases cl WHERE cl.id_profesor = p.id_profesor AND cl.id_curso = ?)",
+        },
+        'tablas': ('profesores', 'clases'),
+    },
+    'cursos': {
+        'desde': "cursos cu",
+        'clave': 'id_curso',
+        'campos': {'id_curso': 'cu.id_curso', 'nombre': 'cu.nombre', 'descripcion': 'cu.descripcion'},
+        'filtros': {
+            'id_semestre': "EXISTS (SELECT 1 FROM clases cl WHERE cl.id_curso = cu.id_curso AND cl.id_semestre = ?)",
+        },
+        'tablas': ('cursos', 'clases'),
+    },
+    'clases': {
+        'desde': """clases cl
+                    LEFT JOIN cursos cu ON cl.id_curso = cu.id_curso
+                    LEFT JOIN profesores p ON cl.id_profesor = p.id_profesor
+                    LEFT JOIN semestres se ON cl.id_semestre = se.id_semestre""",
+        'clave': 'id_clase',
+        'campos': {'id_clase': 'cl.id_clase', 'nombre': 'cl.nombre', 'descripcion': 'cl.descripcion',
+                   'n_horas': 'cl.n_horas', 'horas_semana': 'cl.horas_semana',
+                   'id_curso': 'cl.id_curso', 'curso_nombre': 'cu.nombre',
+                   'id_profesor': 'cl.id_profesor', 'profesor_nombre': 'p.nombre',
+                   'id_semestre': 'cl.id_semestre', 'semestre_nombre': 'se.nombre'},
+        'filtros': {'id_semestre': "cl.id_semestre = ?", 'id_curso': "cl.id_curso = ?",
+                    'id_profesor': "cl.id_profesor = ?"},
+        'tablas': ('clases', 'cursos', 'profesores', 'semestres'),
+    },
+    'cronogramas': {
+        'desde': "cronogramas cr LEFT JOIN cursos cu ON cr.id_curso = cu.id_curso",
+        'clave': 'id_cronograma',
+        'campos': {'id_cronograma': 'cr.id_cronograma', 'nombre': 'cr.nombre',
+                   'id_curso': 'cr.id_curso', 'curso_nombre': 'cu.nombre'},
+        'filtros': {
+            'id_curso': "cr.id_curso = ?",
+            'id_semestre': """EXISTS (SELECT 1 FROM detalle_cronogramas dc JOIN clases cl ON dc.id_clase = cl.id_clase
+                                      WHERE dc.id_cronograma = cr.id_cronograma AND cl.id_semestre = ?)""",
+        },
+        'tablas': ('cronogramas', 'cursos', 'detalle_cronogramas', 'clases'),
+    },
+}
+
+api_bp = Blueprint('api_bp', __name__, url_prefix='/api')
+
+
+def _error(mensaje):
+    return jsonify({'error': mensaje}), 400
+
+
+def _con_etag(respuesta, etag):
+    respuesta.set_etag(etag, weak=True)
+    respuesta.cache_control.no_cache = True
+    return respuesta
+
+
+def _responder(datos, etag):
+    return _con_etag(jsonify(datos), etag)
+
+
+def _no_modificado(conn, etag):
+    """Si el cliente ya tiene `etag`, cierra la conexión y retorna el 304; si no, None."""
+    if is_resource_modified(request.environ, etag=etag):
+        return None
+    conn.close()
+    return _con_etag(make_response('', 304), etag)
+
+
+@api_bp.route('/<recurso>')
+def listar(recurso):
+    """Lista un recurso con selección de campos, filtros y paginación por cursor."""
+    definicion = RECURSOS.get(recurso)
+    if definicion is None:
+        abort(404)
+
+    clave = definicion['clave']
+    if request.args.get('campos'):
+        campos = [c.strip() for c in request.args['campos'].split(',') if c.strip()]
+        desconocidos = [c for c in campos if c not in definicion['campos']]
+        if desconocidos:
+            return _error(f"Campos desconocidos para {recurso}: {', '.join(desconocidos)}.")
+        if clave not in campos:
+            campos.insert(0, clave)
+    else:
+        campos = list(definicion['campos'])
+
+    limite = request.args.get('limite', LIMITE_POR_DEFECTO, type=int)
+    if not 1 <= limite <= LIMITE_MAXIMO:
+        return _error(f"'limite' debe estar entre 1 y {LIMITE_MAXIMO}.")
+    cursor = request.args.get('cursor', type=int)
+
+    condiciones, parametros = [], []
+    for filtro, condicion in definicion['filtros'].items():
+        valor = request.args.get(filtro, type=int)
+        if valor is not None:
+            condiciones.append(condicion)
+            parametros.append(valor)
+    if cursor is not None:
+        condiciones.append(f"{definicion['campos'][clave]} > ?")
+        parametros.append(cursor)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
+    conn = get_db_connection()
+    etag = f"api-{recurso}-" + ".".join(str(version_tabla(conn, t)[0]) for t in definicion['tablas'])
+    no_modificado = _no_modificado(conn, etag)
+    if no_modificado:
+        return no_modificado
+
+    columnas = ", ".join(f"{definicion['campos'][c]} AS {c}" for c in campos)
+    filas = conn.execute(f"""
+        SELECT {columnas} FROM {definicion['desde']}
+        {where}
+        ORDER BY {definicion['campos'][clave]}
+        LIMIT ?
+    """, (*parametros, limite + 1)).fetchall()
+    conn.close()
+
+    hay_mas = len(filas) > limite
+    datos = [dict(f) for f in filas[:limite]]
+    return _responder({'datos': datos, 'siguiente': datos[-1][clave] if hay_mas else None}, etag)
+
+
+@api_bp.route('/cronogramas/<int:id_cronograma>')
+def cronograma(id_cronograma):
+    """Un horario con todas sus entradas, ordenadas por día y hora."""
+    conn = get_db_connection()
+    cabecera = conn.execute("""
+        SELECT cr.id_cronograma, cr.nombre, cr.id_curso, cu.nombre AS curso_nombre, COALESCE(vc.version, 0) AS version
+        FROM cronogramas cr
+        LEFT JOIN cursos cu ON cr.id_curso = cu.id_curso
+        LEFT JOIN versiones_cronogramas vc ON cr.id_cronograma = vc.id_cronograma
+        WHERE cr.id_cronograma = ?
+    """, (id_cronograma,)).fetchone()
+    if cabecera is None:
+        conn.close()
+        abort(404)
+    etag = f"api-cronograma-{id_cronograma}-{cabecera['version']}"
+    no_modificado = _no_modificado(conn, etag)
+    if no_modificado:
+        return no_modificado
+
+    entradas = conn.execute("""
+        SELECT dc.id_detalle, dc.dia, dc.h_inicio, dc.h_fin, dc.id_clase, cl.nombre AS clase_nombre,
+               cl.id_profesor, p.nombre AS profesor_nombre, cl.id_semestre
+        FROM detalle_cronogramas dc
+        JOIN clases cl ON dc.id_clase = cl.id_clase
+        LEFT JOIN profesores p ON cl.id_profesor = p.id_profesor
+        WHERE dc.id_cronograma = ?
+        ORDER BY dc.dia_num, dc.min_inicio
+    """, (id_cronograma,)).fetchall()
+    conn.close()
+
+    datos = {k: cabecera[k] for k in ('id_cronograma', 'nombre', 'id_curso', 'curso_nombre')}
+    datos['entradas'] = [dict(e) for e in entradas]
+    return _responder(datos, etag)
@@ -0,0 +1,80 @@
+"""
+Medición del costo de arranque de la aplicación web.
+
+Importa `main` (lo mismo que hace cada worker al arrancar) en un
+intérprete nuevo con `python -X importtime` y resume el
+tiempo de importación por paquete de primer nivel (la suma del tiempo propio
+de todos sus módulos), junto con el tiempo total y si se cargó el solver.
+
+Uso:
+    python arranque.py --top 15
+    python arranque.py --modulo generador --json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+
+# Módulos que solo necesita la generación automática; no deberían cargarse al arrancar.
+MODULOS_SOLVER = ('pulp',)
+
+# Se ejecuta en el proceso medido; la última línea de su salida es el resultado en JSON.
+_SONDA = """
+import json, sys, time
+t = time.perf_counter()
+import {modulo}
+total = time.perf_counter() - t
+print(json.dumps({{'total': total, 'cargados': [m for m in {solver!r} if m in sys.modules]}}))
+"""
+
+
+def medir(modulo='main'):
+    """Importa `modulo` en un proceso nuevo y retorna el informe de tiempos (en milisegundos)."""
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    entorno = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [directorio, os.environ.get('PYTHONPATH')])))
+    with tempfile.TemporaryDirectory() as temporal:
+        # Desde un directorio vacío: importar la aplicación no debe tocar la base de datos
+        proceso = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', _SONDA.format(modulo=modulo, solver=MODULOS_SOLVER)],
+            cwd=temporal, env=entorno, capture_output=True, text=True)
+    if proceso.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {modulo}:\n{proceso.stderr[-2000:]}")
+
+    por_paquete = {}
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith('import time:') or 'imported package' in linea:
+            continue
+        propio, _, nombre = linea[len('import time:'):].split('|')
+        paquete = nombre.strip().split('.')[0]
+        por_paquete[paquete] = por_paquete.get(paquete, 0) + int(propio)
+
+    resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+    return {
+        'modulo': modulo,
+        'total_ms': round(resultado['total'] * 1000, 1),
+        'solver_cargado': resultado['cargados'],
+        'paquetes': sorted(({'paquete': p, 'ms': round(us / 1000, 1)} for p, us in por_paquete.items()),
+                           key=lambda p: p['ms'], reverse=True),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mide el tiempo de importación de la aplicación por paquete.")
+    parser.add_argument('--modulo', default='main', help="Módulo a importar (por defecto %(default)s).")
+    parser.add_argument('--top', type=int, default=15, help="Paquetes a mostrar (por defecto %(default)s).")
+    parser.add_argument('--json', action='store_true', help="Salida en JSON.")
+    args = parser.parse_args()
+
+    informe = medir(args.modulo)
+    if args.json:
+        informe['paquetes'] = informe['paquetes'][:args.top]
+        print(json.dumps(informe, indent=2, ensure_ascii=False))
+    else:
+        print(f"import {informe['modulo']}: {informe['total_ms']:.1f} ms")
+        for p in informe['paquetes'][:args.top]:
+            print(f"  {p['paquete']:<28} {p['ms']:>8.1f} ms")
+        if informe['solver_cargado']:
+            print(f"Aviso: el arranque carga {', '.join(informe['solver_cargado'])}.")
@@ -0,0 +1,140 @@
+"""
+Banco de pruebas de rendimiento del generador de horarios.
+
+Genera instancias sintéticas con `instancias.py` y las resuelve con el mismo
+camino que la generación automática (carga de clases y slots ocupados,
+división en componentes y `generador.resolver_componente`), sin Flask ni
+caché. Por cada instancia informa tamaño del modelo, tiempos de construcción
+y de resolución, estado y costo, en JSON, para comparar versiones.
+
+Uso:
+    python benchmark.py --tamanos 5,20,50 --motor milp --salida resultados.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pulp
+
+import generador
+import instancias
+import modelo
+
+TAMANOS_POR_DEFECTO = '5,10,20,50,100,200,500'
+
+
+def ejecutar_instancia(info, motor):
+    """Resuelve la instancia descrita por `info` (ver instancias.generar_instancia) y retorna sus métricas."""
+    conn = sqlite3.connect(info['ruta'])
+    conn.row_factory = sqlite3.Row
+    t0 = time.perf_counter()
+    clases_a_planificar = generador._cargar_clases(conn, info['id_semestre'], info['cursos'])
+    profesores = {c['id_profesor'] for c in clases_a_planificar.values()}
+    horarios_profesores_ocupados = generador._cargar_profesores_ocupados(conn, info['id_semestre'], profesores)
+    t_carga = time.perf_counter() - t0
+    conn.close()
+
+    componentes = generador.dividir_en_componentes(clases_a_planificar)
+    resultados = [generador.resolver_componente(clases, horarios_profesores_ocupados, None, motor)
+                  for clases in componentes]
+    t_total = time.perf_counter() - t0
+
+    estados = [r['estado'] for r in resultados]
+    fallidos = [e for e in estados if e not in generador.ESTADOS_CON_SOLUCION]
+    estadisticas = [r['estadisticas'] for r in resultados]
+    return {
+        'n_clases': info['n_clases'],
+        'semilla': info['semilla'],
+        'n_cursos': len(info['cursos']),
+        'n_profesores': info['n_profesores'],
+        'componentes': len(componentes),
+        'max_clases_componente': max((len(c) for c in componentes), default=0),
+        'variables': None if motor != 'milp' else sum(e['variables'] for e in estadisticas),
+        'restricciones': None if motor != 'milp' else sum(e['restricciones'] for e in estadisticas),
+        't_carga': round(t_carga, 4),
+        't_construccion': round(sum(e['t_construccion'] for e in estadisticas), 4),
+        'fases_construccion': {fase: round(sum(e.get('fases_construccion', {}).get(fase, 0.0) for e in estadisticas), 4)
+                               for fase in ('indices', 'variables', 'objetivo', 'restricciones')},
+        't_resolucion': round(sum(e['t_resolucion'] for e in estadisticas), 4),
+        't_total': round(t_total, 4),
+        'estado': fallidos[0] if fallidos else (estados[0] if estados else None),
+        'objetivo': None if fallidos else sum(r['objetivo'] for r in resultados),
+        'optimo_probado': bool(resultados) and all(r.get('probado') for r in resultados),
+    }
+
+
+def ejecutar(tamanos, semillas, motor, compartido, bloqueos, directorio, progreso=None):
+    """Genera y resuelve cada combinación tamaño × semilla; retorna el informe completo."""
+    resultados = []
+    for n_clases in tamanos:
+        for semilla in semillas:
+            ruta = os.path.join(directorio, f"instancia_{n_clases}_{semilla}.db")
+            if os.path.exists(ruta):
+                os.remove(ruta)
+            info = instancias.generar_instancia(ruta, n_clases, compartido, bloqueos, semilla)
+            resultado = ejecutar_instancia(info, motor)
+            resultados.append(resultado)
+            if progreso:
+                progreso(resultado)
+    return {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'entorno': {
+            'python': platform.python_version(),
+            'pulp': pulp.__version__,
+            'cpus': os.cpu_count(),
+        },
+        'parametros': {
+            'motor': motor,
+            'formulacion': modelo.FORMULACION_POR_DEFECTO if motor == 'milp' else None,
+            'tiempo_limite': generador.TIEMPO_LIMITE_SOLVER,
+            'compartido': compartido,
+            'bloqueos': bloqueos,
+        },
+        'resultados': resultados,
+    }
+
+
+def _lista_enteros(texto):
+    return [int(v) for v in texto.split(',') if v.strip()]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Mide el rendimiento de la generación de horarios sobre instancias sintéticas.")
+    parser.add_argument('--tamanos', type=_lista_enteros, default=_lista_enteros(TAMANOS_POR_DEFECTO),
+                        help="Números de clases separados por comas (por defecto %(default)s).")
+    parser.add_argument('--semillas', type=_lista_enteros, default=[0], help="Semillas separadas por comas.")
+    parser.add_argument('--motor', choices=sorted(generador.MOTORES), default=generador.MOTOR_POR_DEFECTO)
+    parser.add_argument('--formulacion', choices=modelo.FORMULACIONES, default=modelo.FORMULACION_POR_DEFECTO)
+    parser.add_argument('--tiempo-limite', type=int, default=generador.TIEMPO_LIMITE_SOLVER,
+                        help="Segundos de CBC por componente.")
+    parser.add_argument('--compartido', type=float, default=0.3, help="Probabilidad de reutilizar un profesor.")
+    parser.add_argument('--bloqueos', type=float, default=0.1, help="Fracción de slots bloqueados por profesor.")
+    parser.add_argument('--directorio', help="Dónde dejar las bases generadas (por defecto, un directorio temporal).")
+    parser.add_argument('--salida', help="Archivo JSON de salida (por defecto, la salida estándar).")
+    args = parser.parse_args()
+
+    modelo.FORMULACION_POR_DEFECTO = args.formulacion
+    generador.TIEMPO_LIMITE_SOLVER = args.tiempo_limite
+
+    def progreso(r):
+        print(f"{r['n_clases']:>4} clases (semilla {r['semilla']}): {r['estado']}"
+              f"{'' if r['optimo_probado'] else ' (sin probar)'}, costo {r['objetivo']}, "
+              f"construcción {r['t_construccion']:.2f}s, resolución {r['t_resolucion']:.2f}s", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory() as temporal:
+        directorio = args.directorio or temporal
+        os.makedirs(directorio, exist_ok=True)
+        informe = ejecutar(args.tamanos, args.semillas, args.motor, args.compartido, args.bloqueos, directorio, progreso)
+
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+    else:
+        print(texto)
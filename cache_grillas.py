@@ -0,0 +1,38 @@
+"""
+Caché en memoria de las grillas ya calculadas de la lista de horarios.
+
+Cada entrada guarda el horario procesado de un cronograma (ver
+`horarios._agrupar_por_cronograma`) junto con la versión del cronograma en
+`versiones_cronogramas`. Los triggers generados desde `database.VERSIONES_HORARIOS` incrementan esa
+versión en cada escritura que afecta al horario (sus detalles, el cronograma
+o las clases, profesores, cursos y semestres que referencia), así que una
+entrada con otra versión simplemente no se usa. La caché está acotada a
+MAX_GRILLAS_CACHE entradas y desaloja las menos usadas recientemente (LRU).
+"""
+import os
+import threading
+from collections import OrderedDict
+
+MAX_GRILLAS_CACHE = int(os.environ.get('HORARIOS_MAX_GRILLAS', 200))
+
+_grillas = OrderedDict()
+_lock = threading.Lock()
+
+
+def buscar(id_cronograma, version):
+    """Retorna el horario guardado para `id_cronograma` si sigue en `version`, o None."""
+    with _lock:
+        entrada = _grillas.get(id_cronograma)
+        if entrada is None or entrada[0] != version:
+            return None
+        _grillas.move_to_end(id_cronograma)
+        return entrada[1]
+
+
+def guardar(id_cronograma, version, horario):
+    """Guarda el horario procesado y desaloja los menos usados si se supera el límite."""
+    with _lock:
+        _grillas[id_cronograma] = (version, horario)
+        _grillas.move_to_end(id_cronograma)
+        while len(_grillas) > MAX_GRILLAS_CACHE:
+            _grillas.popitem(last=False)
@@ -0,0 +1,74 @@
+"""
+Caché persistente de resultados del solver.
+
+Cada entrada se guarda en la tabla `cache_soluciones` bajo la huella de las
+entradas del modelo (ver `generador.huella_modelo`). Solo se guardan óptimos
+demostrados por CBC: un incumbente cortado por el límite de tiempo o un
+resultado heurístico se podría mejorar en otra ejecución. La tabla está acotada a
+MAX_ENTRADAS_CACHE filas y desaloja las menos usadas recientemente (LRU).
+Los aciertos, fallos y desalojos se acumulan en `cache_estadisticas`.
+"""
+import json
+import os
+import time
+
+MAX_ENTRADAS_CACHE = int(os.environ.get('HORARIOS_MAX_CACHE', 500))
+
+
+def _incrementar(conn, nombre, cantidad=1):
+    conn.execute("""
+        INSERT INTO cache_estadisticas (nombre, valor) VALUES (?, ?)
+        ON CONFLICT(nombre) DO UPDATE SET valor = valor + excluded.valor
+    """, (nombre, cantidad))
+
+
+def buscar(conn, huella):
+    """Retorna el resultado guardado para `huella` (y lo marca como usado) o None."""
+    fila = conn.execute("SELECT estado, objetivo, asignacion FROM cache_soluciones WHERE huella = ?", (huella,)).fetchone()
+    if fila is None:
+        _incrementar(conn, 'fallos')
+        conn.commit()
+        return None
+    conn.execute("UPDATE cache_soluciones SET ultimo_uso = ? WHERE huella = ?", (time.time(), huella))
+    _incrementar(conn, 'aciertos')
+    conn.commit()
+    return {
+        'estado': fila['estado'],
+        'objetivo': fila['objetivo'],
+        'asignacion': [tuple(a) for a in json.loads(fila['asignacion'])],
+        'probado': True,
+    }
+
+
+def guardar(conn, huella, resultado):
+    """Guarda un óptimo demostrado y desaloja las entradas más antiguas si se supera el límite."""
+    if not resultado.get('probado'):
+        raise ValueError("Solo se guardan en la caché los óptimos demostrados.")
+    conn.execute("""
+        INSERT OR REPLACE INTO cache_soluciones (huella, estado, objetivo, asignacion, ultimo_uso)
+        VALUES (?, ?, ?, ?, ?)
+    """, (huella, resultado['estado'], resultado['objetivo'], json.dumps(resultado['asignacion']), time.time()))
+    desalojadas = conn.execute("""
+        DELETE FROM cache_soluciones WHERE huella IN (
+            SELECT huella FROM cache_soluciones ORDER BY ultimo_uso DESC LIMIT -1 OFFSET ?
+        )
+    """, (MAX_ENTRADAS_CACHE,)).rowcount
+    if desalojadas:
+        _incrementar(conn, 'desalojos', desalojadas)
+    conn.commit()
+
+
+def estadisticas(conn):
+    """Contadores de la caché y tasa de aciertos."""
+    contadores = {f['nombre']: f['valor'] for f in conn.execute("SELECT nombre, valor FROM cache_estadisticas")}
+    aciertos = contadores.get('aciertos', 0)
+    fallos = contadores.get('fallos', 0)
+    consultas = aciertos + fallos
+    return {
+        'entradas': conn.execute("SELECT COUNT(*) FROM cache_soluciones").fetchone()[0],
+        'max_entradas': MAX_ENTRADAS_CACHE,
+        'aciertos': aciertos,
+        'fallos': fallos,
+        'desalojos': contadores.get('desalojos', 0),
+        'tasa_aciertos': round(aciertos / consultas, 4) if consultas else None,
+    }
@@ -0,0 +1,390 @@
+"""
+Prueba de carga HTTP de la aplicación sobre una base de datos sintética.
+
+Crea una base desechable con `instancias.py` y le añade un horario guardado
+por curso (miles de filas en `detalle_cronogramas` y cientos de profesores
+con los valores por defecto). Luego apunta la aplicación a esa base y la
+recorre con varios clientes concurrentes usando los blueprints reales: la
+lista de horarios, gestión, profesores, entradas manuales
+(`POST /horarios/crear`) y generación automática con la heurística (se
+espera a que termine el trabajo y se mide aparte como `generacion`).
+
+Por escenario informa solicitudes por segundo, latencia media, p50, p95, p99
+y máxima, códigos de estado y tasa de error (código 5xx o excepción; en
+`generacion`, un trabajo que no termina `completado`). Todo corre en la
+máquina local: con `--modo cliente` se usa el cliente de pruebas de Flask y
+con `--modo wsgi` (por defecto) un servidor WSGI de werkzeug en 127.0.0.1, así
+que se pueden comparar cambios de conexiones o cachés con la misma carga
+(clientes y semilla fijos dan la misma secuencia de solicitudes).
+
+Uso:
+    python carga.py --clases 1200 --clientes 8 --solicitudes 100
+    python carga.py --modo cliente --escenarios lista_horarios,gestion --json --salida carga.json
+"""
+import argparse
+import http.client
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from urllib.parse import urlencode
+
+import database
+import instancias
+from trabajos import ESTADOS_TERMINALES
+
+# escenario -> peso en la mezcla de solicitudes de cada cliente
+ESCENARIOS = {
+    'lista_horarios': 30,
+    'gestion': 15,
+    'profesores': 15,
+    'crear_entrada': 30,
+    'generacion': 5,
+    'api_clases': 5,
+}
+MODOS = ('wsgi', 'cliente')
+# Segundos como máximo que un cliente espera a que termine un trabajo de generación.
+ESPERA_MAXIMA_TRABAJO = 120
+INTERVALO_SONDEO = 0.2
+
+
+# --- Base de datos sintética ---
+
+def sembrar(ruta, n_clases, compartido=0.5, bloqueos=0.1, semilla=0):
+    """
+    Crea la instancia de `instancias.generar_instancia` en `ruta` y guarda un
+    horario por curso, colocando cada hora de cada clase en un slot libre para
+    el curso y para el profesor. Retorna el dict de la instancia más el número
+    de cronogramas y de entradas guardadas.
+    """
+    info = instancias.generar_instancia(ruta, n_clases, compartido, bloqueos, semilla)
+    rng = random.Random(semilla)
+    conn = sqlite3.connect(ruta)
+    conn.row_factory = sqlite3.Row
+
+    ocupado_profesor = {}
+    for f in conn.execute("""
+        SELECT cl.id_profesor, dc.dia_num, dc.min_inicio FROM detalle_cronogramas dc
+        JOIN clases cl ON dc.id_clase = cl.id_clase
+    """):
+        ocupado_profesor.setdefault(f['id_profesor'], set()).add((f['dia_num'], f['min_inicio'] // 60))
+
+    slots = [(d, h) for d in range(len(instancias.DIAS)) for h in instancias.HORAS]
+    detalles = []
+    for id_curso in info['cursos']:
+        id_cronograma = conn.execute("INSERT INTO cronogramas (nombre, id_curso) VALUES (?, ?)",
+                                     (f"Horario curso {id_curso}", id_curso)).lastrowid
+        ocupado_curso = set()
+        clases = conn.execute("SELECT id_clase, id_profesor, horas_semana FROM clases WHERE id_curso = ? ORDER BY id_clase",
+                              (id_curso,)).fetchall()
+        for clase in clases:
+            ocupado = ocupado_profesor.setdefault(clase['id_profesor'], set())
+            libres = [s for s in slots if s not in ocupado_curso and s not in ocupado]
+            for d, h in rng.sample(libres, min(clase['horas_semana'], len(libres))):
+                ocupado_curso.add((d, h))
+                ocupado.add((d, h))
+                detalles.append((id_cronograma, d, h * 60, (h + 1) * 60, clase['id_clase'], id_curso))
+    conn.executemany("""
+        INSERT INTO detalle_cronogramas (id_cronograma, dia_num, min_inicio, min_fin, id_clase, id_curso)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, detalles)
+    conn.commit()
+    info['n_detalles'] = conn.execute("SELECT COUNT(*) FROM detalle_cronogramas").fetchone()[0]
+    info['n_cronogramas'] = conn.execute("SELECT COUNT(*) FROM cronogramas").fetchone()[0]
+    conn.close()
+    return info
+
+
+def _datos_solicitudes(ruta):
+    """Ids de la base con los que se arman las solicitudes de escritura."""
+    conn = sqlite3.connect(ruta)
+    conn.row_factory = sqlite3.Row
+    clases = [dict(f) for f in conn.execute(
+        "SELECT id_clase, id_curso, id_profesor, id_semestre FROM clases WHERE horas_semana > 0")]
+    cronogramas = {}
+    for f in conn.execute("SELECT id_cronograma, id_curso FROM cronogramas"):
+        cronogramas.setdefault(f['id_curso'], []).append(f['id_cronograma'])
+    # Solo se regeneran cursos cuyas horas caben en la grilla (el curso de bloqueos de instancias.py no)
+    generables = {f['id_curso'] for f in conn.execute(
+        "SELECT id_curso FROM clases GROUP BY id_curso HAVING SUM(horas_semana) <= ?",
+        (len(instancias.DIAS) * len(instancias.HORAS),))}
+    conn.close()
+    return {
+        'clases': clases,
+        'cronogramas': cronogramas,
+        'generables': [c for c in clases if c['id_curso'] in generables],
+        'profesores': sorted({c['id_profesor'] for c in clases}),
+    }
+
+
+# --- Clientes ---
+
+class ClientePrueba:
+    """Solicitudes a través del cliente de pruebas de Flask (sin red)."""
+
+    def __init__(self, app):
+        self._cliente = app.test_client()
+
+    def pedir(self, metodo, ruta, formulario=None, cabeceras=None):
+        respuesta = self._cliente.open(ruta, method=metodo, data=formulario, headers=cabeceras or {})
+        return respuesta.status_code, respuesta.get_data()
+
+
+class ClienteHTTP:
+    """Solicitudes HTTP a un servidor local, una conexión por solicitud (sin seguir redirecciones)."""
+
+    def __init__(self, puerto):
+        self._puerto = puerto
+
+    def pedir(self, metodo, ruta, formulario=None, cabeceras=None):
+        cabeceras = dict(cabeceras or {})
+        cuerpo = None
+        if formulario is not None:
+            cuerpo = urlencode(formulario)
+            cabeceras['Content-Type'] = 'application/x-www-form-urlencoded'
+        conexion = http.client.HTTPConnection('127.0.0.1', self._puerto, timeout=ESPERA_MAXIMA_TRABAJO)
+        try:
+            conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+            respuesta = conexion.getresponse()
+            return respuesta.status, respuesta.read()
+        finally:
+            conexion.close()
+
+
+# --- Escenarios ---
+
+def _solicitud(escenario, rng, datos, cliente_id, n):
+    """(método, ruta, formulario, cabeceras) de una solicitud del escenario."""
+    if escenario == 'lista_horarios':
+        pagina = rng.randint(1, 3)
+        return 'GET', f"/horarios/?pagina={pagina}", None, None
+    if escenario == 'gestion':
+        return 'GET', "/gestion", None, None
+    if escenario == 'profesores':
+        return 'GET', "/profesores/", None, None
+    if escenario == 'api_clases':
+        id_profesor = rng.choice(datos['profesores'])
+        return 'GET', f"/api/clases?id_profesor={id_profesor}&campos=id_clase,nombre", None, {'Accept': 'application/json'}
+    if escenario == 'crear_entrada':
+        # Entrada manual en el horario del curso de la clase; muchas chocan y se rechazan con un 302 como en la vida real
+        clase = rng.choice(datos['clases'])
+        h = rng.choice(instancias.HORAS)
+        return 'POST', "/horarios/crear", {
+            'id_cronograma': rng.choice(datos['cronogramas'][clase['id_curso']]),
+            'id_clase': clase['id_clase'],
+            'id_semestre': clase['id_semestre'],
+            'dia': rng.choice(instancias.DIAS),
+            'h_inicio': f"{h:02d}:00",
+            'h_fin': f"{h + 1:02d}:00",
+        }, None
+    # generacion: regenera el horario de un curso partiendo del anterior (que se reemplaza si solo tiene clases
+    # del curso en la grilla), con la heurística
+    clase = rng.choice(datos['generables'])
+    return 'POST', "/horarios/ejecutar_creacion_automatica", {
+        'nombre': f"Carga {cliente_id}-{n}",
+        'alcance': 'curso',
+        'motor': 'heuristico',
+        'arranque': 'anterior',
+        'id_curso': clase['id_curso'],
+        'id_semestre': clase['id_semestre'],
+    }, {'Accept': 'application/json'}
+
+
+def _esperar_trabajo(cliente, cuerpo):
+    """Consulta el trabajo hasta que termina; retorna su estado final."""
+    id_trabajo = json.loads(cuerpo)['id_trabajo']
+    limite = time.monotonic() + ESPERA_MAXIMA_TRABAJO
+    while time.monotonic() < limite:
+        codigo, cuerpo = cliente.pedir('GET', f"/horarios/trabajos/{id_trabajo}")
+        estado = json.loads(cuerpo)['estado'] if codigo == 200 else None
+        if estado in ESTADOS_TERMINALES:
+            return estado
+        time.sleep(INTERVALO_SONDEO)
+    return 'sin_terminar'
+
+
+class Registro:
+    """Latencias y códigos por escenario, compartidos por los clientes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = {}
+        self.codigos = {}
+        self.errores = Counter()
+
+    def anotar(self, escenario, segundos, codigo, error):
+        with self._lock:
+            self.latencias.setdefault(escenario, []).append(segundos)
+            self.codigos.setdefault(escenario, Counter())[str(codigo)] += 1
+            if error:
+                self.errores[escenario] += 1
+
+
+def _ejecutar_cliente(cliente, cliente_id, n_solicitudes, escenarios, datos, semilla, registro):
+    rng = random.Random(semilla * 1000 + cliente_id)
+    nombres, pesos = list(escenarios), list(escenarios.values())
+    for n in range(n_solicitudes):
+        escenario = rng.choices(nombres, pesos)[0]
+        metodo, ruta, formulario, cabeceras = _solicitud(escenario, rng, datos, cliente_id, n)
+        inicio = time.perf_counter()
+        try:
+            codigo, cuerpo = cliente.pedir(metodo, ruta, formulario, cabeceras)
+        except Exception as e:
+            registro.anotar(escenario, time.perf_counter() - inicio, type(e).__name__, True)
+            continue
+        registro.anotar(escenario, time.perf_counter() - inicio, codigo, codigo >= 500)
+        if escenario == 'generacion' and codigo == 202:
+            estado = _esperar_trabajo(cliente, cuerpo)
+            registro.anotar('generacion (trabajo)', time.perf_counter() - inicio, estado, estado != 'completado')
+
+
+def _percentil(ordenados, p):
+    """Percentil por rango más cercano de una lista ordenada."""
+    if not ordenados:
+        return None
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+def _resumir(registro, duracion):
+    escenarios = {}
+    for escenario, latencias in sorted(registro.latencias.items()):
+        ordenadas = sorted(latencias)
+        en_ms = lambda s: None if s is None else round(s * 1000, 2)
+        escenarios[escenario] = {
+            'solicitudes': len(ordenadas),
+            'por_segundo': round(len(ordenadas) / duracion, 2) if duracion else None,
+            'media_ms': en_ms(sum(ordenadas) / len(ordenadas)),
+            'p50_ms': en_ms(_percentil(ordenadas, 50)),
+            'p95_ms': en_ms(_percentil(ordenadas, 95)),
+            'p99_ms': en_ms(_percentil(ordenadas, 99)),
+            'max_ms': en_ms(ordenadas[-1]),
+            'errores': registro.errores[escenario],
+            'tasa_error': round(registro.errores[escenario] / len(ordenadas), 4),
+            'codigos': dict(registro.codigos[escenario]),
+        }
+    total = sum(e['solicitudes'] for n, e in escenarios.items() if n != 'generacion (trabajo)')
+    return {
+        'duracion_s': round(duracion, 3),
+        'solicitudes': total,
+        'por_segundo': round(total / duracion, 2) if duracion else None,
+        'escenarios': escenarios,
+    }
+
+
+def ejecutar(ruta, modo='wsgi', clientes=8, solicitudes=100, escenarios=None, semilla=0):
+    """
+    Apunta la aplicación a la base `ruta` y ejecuta la carga: `clientes` hilos
+    que hacen `solicitudes` solicitudes cada uno con la mezcla `escenarios`
+    (dict nombre -> peso; por defecto ESCENARIOS). Retorna el informe.
+    """
+    database.DATABASE_NAME = ruta
+    import main  # la base ya tiene el esquema: sembrar() usa database.crear_esquema
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    escenarios = escenarios or ESCENARIOS
+    datos = _datos_solicitudes(ruta)
+    servidor = None
+    if modo == 'wsgi':
+        from werkzeug.serving import make_server
+        servidor = make_server('127.0.0.1', 0, main.app, threaded=True)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        nuevo_cliente = lambda: ClienteHTTP(servidor.server_port)
+    else:
+        nuevo_cliente = lambda: ClientePrueba(main.app)
+
+    try:
+        # Calentamiento: una solicitud a cada página para no medir la primera compilación de plantillas
+        calentamiento = nuevo_cliente()
+        for ruta_get in ("/horarios/", "/gestion", "/profesores/"):
+            calentamiento.pedir('GET', ruta_get)
+
+        registro = Registro()
+        hilos = [threading.Thread(target=_ejecutar_cliente,
+                                  args=(nuevo_cliente(), i, solicitudes, escenarios, datos, semilla, registro))
+                 for i in range(clientes)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+    finally:
+        if servidor is not None:
+            servidor.shutdown()
+
+    informe = _resumir(registro, duracion)
+    informe.update({
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'entorno': {'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version, 'cpus': os.cpu_count()},
+        'parametros': {'modo': modo, 'clientes': clientes, 'solicitudes': solicitudes,
+                       'escenarios': escenarios, 'semilla': semilla},
+    })
+    return informe
+
+
+def _escenarios(texto):
+    nombres = [n.strip() for n in texto.split(',') if n.strip()]
+    desconocidos = [n for n in nombres if n not in ESCENARIOS]
+    if desconocidos:
+        raise argparse.ArgumentTypeError(f"Escenarios desconocidos: {', '.join(desconocidos)}")
+    return {n: ESCENARIOS[n] for n in nombres}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Prueba de carga HTTP de la aplicación sobre una base sintética.")
+    parser.add_argument('--clases', type=int, default=1200, help="Clases de la base sintética (por defecto %(default)s).")
+    parser.add_argument('--compartido', type=float, default=0.5, help="Probabilidad de reutilizar un profesor.")
+    parser.add_argument('--bloqueos', type=float, default=0.1, help="Fracción de slots bloqueados por profesor.")
+    parser.add_argument('--clientes', type=int, default=8, help="Clientes concurrentes (por defecto %(default)s).")
+    parser.add_argument('--solicitudes', type=int, default=100, help="Solicitudes por cliente (por defecto %(default)s).")
+    parser.add_argument('--escenarios', type=_escenarios, help=f"Subconjunto de {', '.join(ESCENARIOS)}.")
+    parser.add_argument('--modo', choices=MODOS, default='wsgi')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--base', help="Ruta de la base sintética (por defecto, en un directorio temporal).")
+    parser.add_argument('--sobrescribir', action='store_true', help="Reemplazar la base de --base si ya existe.")
+    parser.add_argument('--json', action='store_true', help="Salida en JSON.")
+    parser.add_argument('--salida', help="Archivo JSON de salida.")
+    args = parser.parse_args()
+    if args.base:
+        # La base sintética se borra y se vuelve a sembrar: nunca la de la aplicación,
+        # y una existente solo si se pide explícitamente.
+        if os.path.realpath(args.base) == os.path.realpath(database.DATABASE_NAME):
+            parser.error(f"--base no puede ser la base de la aplicación ({database.DATABASE_NAME}).")
+        if os.path.exists(args.base) and not args.sobrescribir:
+            parser.error(f"{args.base} ya existe; use --sobrescribir para reemplazarla.")
+
+    with tempfile.TemporaryDirectory() as temporal:
+        ruta = args.base or os.path.join(temporal, 'horarios.db')
+        for archivo in (ruta, ruta + '-wal', ruta + '-shm'):
+            if os.path.exists(archivo):
+                os.remove(archivo)
+        t0 = time.perf_counter()
+        base = sembrar(ruta, args.clases, args.compartido, args.bloqueos, args.semilla)
+        print(f"Base sintética: {base['n_clases']} clases, {len(base['cursos'])} cursos, {base['n_profesores']} profesores, "
+              f"{base['n_cronogramas']} horarios, {base['n_detalles']} entradas ({time.perf_counter() - t0:.1f} s).",
+              file=sys.stderr)
+        informe = ejecutar(ruta, args.modo, args.clientes, args.solicitudes, args.escenarios, args.semilla)
+        informe['base'] = {k: base[k] for k in ('n_clases', 'n_profesores', 'n_cronogramas', 'n_detalles')}
+        informe['base']['n_cursos'] = len(base['cursos'])
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(informe, indent=2, ensure_ascii=False) + '\n')
+    if args.json:
+        print(json.dumps(informe, indent=2, ensure_ascii=False))
+    else:
+        print(f"{informe['solicitudes']} solicitudes en {informe['duracion_s']:.1f} s ({informe['por_segundo']} por segundo), "
+              f"{args.modo}, {args.clientes} clientes")
+        print(f"  {'escenario':<22} {'n':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'error':>7}")
+        for nombre, e in informe['escenarios'].items():
+            print(f"  {nombre:<22} {e['solicitudes']:>6} {e['por_segundo']:>8} {e['p50_ms']:>9} {e['p95_ms']:>9} "
+                  f"{e['p99_ms']:>9} {e['tasa_error']:>7.1%}")
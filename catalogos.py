@@ -0,0 +1,43 @@
+"""
+Caché en memoria de los catálogos de consulta (cursos, profesores, semestres).
+
+Las listas que llenan los desplegables y tablas de varias vistas se guardan
+junto con el contador de cambios de su tabla en `versiones_tablas` (ver
+database.TABLAS_VERSIONADAS). Los triggers lo incrementan en cada INSERT,
+UPDATE o DELETE, venga de las vistas CRUD, de una importación o de otro
+proceso, así que cada lectura solo consulta los contadores (una consulta por
+clave primaria) y vuelve a leer únicamente las tablas que cambiaron.
+"""
+import threading
+
+# catálogo -> consulta completa, en el orden en que se muestra
+CATALOGOS = {
+    'cursos': "SELECT id_curso, nombre, descripcion FROM cursos ORDER BY nombre ASC",
+    'profesores': "SELECT id_profesor, cedula, nombre, correo, telefono FROM profesores ORDER BY nombre ASC",
+    'semestres': "SELECT id_semestre, nombre, fecha_inicio, fecha_fin FROM semestres ORDER BY nombre DESC",
+}
+
+_catalogos = {}
+_lock = threading.Lock()
+
+
+def obtener(conn, *nombres):
+    """
+    Retorna una lista de filas (dicts) por cada catálogo pedido, en el mismo
+    orden: `cursos, semestres = catalogos.obtener(conn, 'cursos', 'semestres')`.
+    Con un solo nombre retorna directamente su lista.
+    """
+    marcadores = ", ".join("?" for _ in nombres)
+    versiones = dict(conn.execute(f"SELECT nombre, version FROM versiones_tablas WHERE nombre IN ({marcadores})",
+                                  nombres).fetchall())
+    resultado = []
+    for nombre in nombres:
+        version = versiones.get(nombre, 0)
+        with _lock:
+            entrada = _catalogos.get(nombre)
+        if entrada is None or entrada[0] != version:
+            entrada = (version, [dict(f) for f in conn.execute(CATALOGOS[nombre])])
+            with _lock:
+                _catalogos[nombre] = entrada
+        resultado.append(entrada[1])
+    return resultado if len(nombres) > 1 else resultado[0]
@@ -0,0 +1,138 @@
+"""
+Detección de conflictos entre horarios guardados.
+
+`crear_horario` solo evita solapamientos dentro de un mismo cronograma. Aquí
+se buscan los que cruzan cronogramas: un profesor con dos clases a la vez
+(aunque sean de cursos distintos) o una misma clase colocada dos veces en
+franjas que se solapan.
+
+- `conflictos_semestre` revisa todo un semestre con un barrido (sweep-line)
+  por profesor y día: O(n log n) más el número de pares en conflicto.
+- `conflictos_entrada` valida una sola entrada antes de insertarla, usando la
+  máscara de `disponibilidad_profesores` como filtro y, solo si hay horas en
+  común, el detalle de las clases de ese profesor en ese día.
+"""
+import heapq
+from itertools import groupby
+
+from database import DIAS_SEMANA
+
+# Columnas de cada entrada que se informan en un conflicto.
+_COLUMNAS_ENTRADA = """
+    dc.id_detalle, dc.id_cronograma, cr.nombre AS cronograma, dc.dia_num, dc.dia,
+    dc.min_inicio, dc.min_fin, dc.h_inicio, dc.h_fin,
+    dc.id_clase, cl.nombre AS clase, cl.id_profesor, p.nombre AS profesor
+"""
+
+
+def solapes(intervalos):
+    """
+    Retorna los pares (a, b) de `intervalos` que se solapan.
+
+    Cada intervalo es una tupla (inicio, fin, dato); dos intervalos se solapan
+    si comparten algún minuto (los extremos que solo se tocan no cuentan).
+    Los intervalos se recorren por inicio manteniendo un montículo de los
+    activos ordenados por fin, así que cada uno se compara solo con los que
+    siguen abiertos cuando empieza.
+    """
+    pares = []
+    activos = []
+    for n, (inicio, fin, dato) in enumerate(sorted(intervalos, key=lambda i: (i[0], i[1]))):
+        while activos and activos[0][0] <= inicio:
+            heapq.heappop(activos)
+        for _, _, otro in activos:
+            pares.append((otro, dato))
+        heapq.heappush(activos, (fin, n, dato))
+    return pares
+
+
+def _tipo(a, b):
+    return 'clase_repetida' if a['id_clase'] == b['id_clase'] else 'profesor_ocupado'
+
+
+def _entrada(fila):
+    return {clave: fila[clave] for clave in
+            ('id_detalle', 'id_cronograma', 'cronograma', 'dia', 'h_inicio', 'h_fin', 'id_clase', 'clase')}
+
+
+def _conflicto(a, b):
+    return {
+        'tipo': _tipo(a, b),
+        'id_profesor': a['id_profesor'],
+        'profesor': a['profesor'],
+        'dia': a['dia'],
+        'entradas': [_entrada(a), _entrada(b)],
+    }
+
+
+def conflictos_semestre(conn, id_semestre):
+    """Lista todos los pares de entradas del semestre que se solapan para un mismo profesor."""
+    filas = conn.execute(f"""
+        SELECT {_COLUMNAS_ENTRADA}
+        FROM detalle_cronogramas dc
+        JOIN clases cl ON dc.id_clase = cl.id_clase
+        JOIN profesores p ON cl.id_profesor = p.id_profesor
+        JOIN cronogramas cr ON dc.id_cronograma = cr.id_cronograma
+        WHERE cl.id_semestre = ?
+        ORDER BY cl.id_profesor, dc.dia_num
+    """, (id_semestre,)).fetchall()
+
+    conflictos = []
+    for _, grupo in groupby(filas, key=lambda f: (f['id_profesor'], f['dia_num'])):
+        intervalos = [(f['min_inicio'], f['min_fin'], f) for f in grupo]
+        if len(intervalos) > 1:
+            conflictos.extend(_conflicto(a, b) for a, b in solapes(intervalos))
+    return conflictos
+
+
+def _mascara_intervalo(min_inicio, min_fin):
+    """Bits de las franjas de una hora (como en disponibilidad_profesores) que toca el intervalo."""
+    mascara = 0
+    for hora in range(min_inicio // 60, min(24, -(-min_fin // 60))):
+        mascara |= 1 << hora
+    return mascara
+
+
+def conflictos_entrada(conn, id_clase, dia_num, min_inicio, min_fin, id_cronograma=None, excluir_detalle=None):
+    """
+    Retorna los conflictos que produciría colocar `id_clase` el día `dia_num`
+    de `min_inicio` a `min_fin`, sin recorrer el resto del semestre.
+
+    `excluir_detalle` omite una fila existente (p. ej. la que se está moviendo).
+    """
+    clase = conn.execute("""
+        SELECT cl.id_clase, cl.nombre AS clase, cl.id_profesor, cl.id_semestre, p.nombre AS profesor
+        FROM clases cl JOIN profesores p ON cl.id_profesor = p.id_profesor
+        WHERE cl.id_clase = ?
+    """, (id_clase,)).fetchone()
+    if clase is None:
+        return []
+
+    dia = DIAS_SEMANA[dia_num]
+    ocupado = conn.execute("""
+        SELECT mascara FROM disponibilidad_profesores
+        WHERE id_semestre = ? AND id_profesor = ? AND dia = ?
+    """, (clase['id_semestre'], clase['id_profesor'], dia)).fetchone()
+    if ocupado is None or not ocupado['mascara'] & _mascara_intervalo(min_inicio, min_fin):
+        return []
+
+    filas = conn.execute(f"""
+        SELECT {_COLUMNAS_ENTRADA}
+        FROM clases cl
+        JOIN detalle_cronogramas dc ON dc.id_clase = cl.id_clase
+        JOIN profesores p ON cl.id_profesor = p.id_profesor
+        JOIN cronogramas cr ON dc.id_cronograma = cr.id_cronograma
+        WHERE cl.id_profesor = ? AND cl.id_semestre = ?
+          AND dc.dia_num = ? AND dc.min_inicio < ? AND dc.min_fin > ?
+          AND dc.id_detalle IS NOT ?
+        ORDER BY dc.min_inicio
+    """, (clase['id_profesor'], clase['id_semestre'], dia_num, min_fin, min_inicio, excluir_detalle)).fetchall()
+
+    nueva = {
+        'id_detalle': None, 'id_cronograma': id_cronograma, 'cronograma': None, 'dia': dia,
+        'h_inicio': f"{min_inicio // 60:02d}:{min_inicio % 60:02d}",
+        'h_fin': f"{min_fin // 60:02d}:{min_fin % 60:02d}",
+        'id_clase': clase['id_clase'], 'clase': clase['clase'],
+        'id_profesor': clase['id_profesor'], 'profesor': clase['profesor'],
+    }
+    return [_conflicto(f, nueva) for f in filas]
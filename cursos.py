@@ -1,12 +1,14 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from database import get_db_connection
+import catalogos
+import sqlite3
 
 cursos_bp = Blueprint('cursos_bp', __name__, template_folder='templates')
 
 @cursos_bp.route("/")
 def lista(): 
     conn = get_db_connection()
-    lista_cursos = conn.execute("SELECT id_curso, nombre, descripcion FROM cursos ORDER BY nombre ASC").fetchall()
+    lista_cursos = catalogos.obtener(conn, 'cursos')
     conn.close()
     return render_template("cursos.html", cursos=lista_cursos)
 
@@ -79,8 +81,11 @@ def edit(id_curso):
 @cursos_bp.route("/delete/<int:id_curso>", methods=['POST'])
 def delete(id_curso):
     conn = get_db_connection()
-    conn.execute("DELETE FROM cursos WHERE id_curso = ?", (id_curso,))
-    conn.commit()
+    try:
+        conn.execute("DELETE FROM cursos WHERE id_curso = ?", (id_curso,))
+        conn.commit()
+        flash('Curso eliminado con éxito.', 'success')
+    except sqlite3.IntegrityError:
+        flash('Error: No se puede eliminar un curso que todavía tiene clases u horarios.', 'error')
     conn.close()
-    flash('Curso eliminado con éxito.', 'success')
     return redirect(url_for('cursos_bp.lista'))
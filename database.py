@@ -1,86 +1,622 @@
+import os
 import sqlite3
+import threading
+import time
+
+from flask import g, has_app_context
+
+import metricas
 
 DATABASE_NAME = 'horarios.db'
 
-def get_db_connection():
-    """Crea y retorna una conexión a la base de datos SQLite."""
-    conn = sqlite3.connect(DATABASE_NAME)
+# Conexiones abiertas que se conservan para reutilizar entre solicitudes y trabajos.
+MAX_CONEXIONES_POOL = int(os.environ.get('HORARIOS_MAX_CONEXIONES', 8))
+
+# Se aplican a cada conexión nueva. En modo WAL los lectores no bloquean al
+# escritor (ni al revés) durante las transacciones largas de la generación
+# automática; con WAL, synchronous=NORMAL sigue siendo seguro ante caídas.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA cache_size = -16000",     # 16 MB de caché de páginas
+    "PRAGMA mmap_size = 268435456",   # 256 MB mapeados en memoria
+    "PRAGMA temp_store = MEMORY",
+)
+
+# Esquema base de la base de datos (idempotente), sobre el que se aplican las
+# MIGRACIONES: los cambios de forma posteriores se hacen solo con una migración nueva.
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS semestres (
+    id_semestre INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL,
+    fecha_inicio TEXT,
+    fecha_fin TEXT
+);
+
+CREATE TABLE IF NOT EXISTS profesores (
+    id_profesor INTEGER PRIMARY KEY AUTOINCREMENT,
+    cedula TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    correo TEXT,
+    telefono TEXT
+);
+
+CREATE TABLE IF NOT EXISTS cursos (
+    id_curso INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL,
+    descripcion TEXT
+);
+
+CREATE TABLE IF NOT EXISTS paralelos (
+    id_paralelo INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL,
+    descripcion TEXT,
+    id_curso INTEGER,
+    FOREIGN KEY (id_curso) REFERENCES cursos(id_curso)
+);
+
+CREATE TABLE IF NOT EXISTS clases (
+    id_clase INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL,
+    descripcion TEXT,
+    n_horas INTEGER,
+    horas_semana INTEGER,
+    id_curso INTEGER,
+    id_profesor INTEGER,
+    id_semestre INTEGER,
+    FOREIGN KEY (id_curso) REFERENCES cursos(id_curso),
+    FOREIGN KEY (id_profesor) REFERENCES profesores(id_profesor),
+    FOREIGN KEY (id_semestre) REFERENCES semestres(id_semestre)
+);
+
+/* El nombre es único (índice ux_cronogramas_nombre, migración 1) */
+CREATE TABLE IF NOT EXISTS cronogramas (
+    id_cronograma INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre TEXT NOT NULL,
+    id_curso INTEGER,
+    FOREIGN KEY (id_curso) REFERENCES cursos(id_curso)
+);
+
+/* Desde la migración 2 los días y las horas se guardan como enteros (dia_num,
+   min_inicio, min_fin) y dia, h_inicio y h_fin se calculan a partir de ellos. */
+CREATE TABLE IF NOT EXISTS detalle_cronogramas (
+    id_detalle INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_cronograma INTEGER,
+    dia TEXT,
+    h_inicio TEXT,
+    h_fin TEXT,
+    id_clase INTEGER,
+    id_curso INTEGER,
+    FOREIGN KEY (id_clase) REFERENCES clases(id_clase),
+    FOREIGN KEY (id_curso) REFERENCES cursos(id_curso),
+    FOREIGN KEY (id_cronograma) REFERENCES cronogramas(id_cronograma)
+);
+
+/* Caché de resultados del solver, indexada por la huella de las entradas del modelo */
+CREATE TABLE IF NOT EXISTS cache_soluciones (
+    huella TEXT PRIMARY KEY,
+    estado TEXT NOT NULL,
+    objetivo REAL,
+    asignacion TEXT NOT NULL,
+    creado TEXT DEFAULT CURRENT_TIMESTAMP,
+    ultimo_uso REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS cache_estadisticas (
+    nombre TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL DEFAULT 0
+);
+
+/* Índice de disponibilidad de profesores: por semestre, profesor y día, una
+   máscara de bits de las horas ocupadas (bit h = franja h:00-h+1:00). Lo
+   mantienen los triggers de OBJETOS_DERIVADOS; ver reconstruir_disponibilidad(). */
+CREATE TABLE IF NOT EXISTS disponibilidad_profesores (
+    id_semestre INTEGER NOT NULL,
+    id_profesor INTEGER NOT NULL,
+    dia TEXT NOT NULL,
+    mascara INTEGER NOT NULL,
+    PRIMARY KEY (id_semestre, id_profesor, dia)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS horas_dia (
+    hora INTEGER PRIMARY KEY
+);
+INSERT OR IGNORE INTO horas_dia (hora) VALUES
+    (0), (1), (2), (3), (4), (5), (6), (7), (8), (9), (10), (11),
+    (12), (13), (14), (15), (16), (17), (18), (19), (20), (21), (22), (23);
+
+/* Versiones para invalidar cachés de lectura (ver cache_grillas.py). Cada
+   escritura que cambia lo que muestra un horario incrementa la versión del
+   cronograma afectado y la versión global 'horarios' de versiones_tablas,
+   que además da el ETag / Last-Modified de la lista de horarios. Los triggers
+   que las mantienen están en OBJETOS_DERIVADOS. */
+CREATE TABLE IF NOT EXISTS versiones_tablas (
+    nombre TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    modificado TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS versiones_cronogramas (
+    id_cronograma INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL,
+    modificado TEXT NOT NULL
+);
+"""
+
+# Índices, vistas y triggers que dependen de las tablas. Se crean después de
+# las MIGRACIONES (que pueden reconstruir tablas y con ello eliminarlos).
+OBJETOS_DERIVADOS = """
+CREATE INDEX IF NOT EXISTS idx_detalle_cronogramas_solape ON detalle_cronogramas (id_cronograma, dia_num, min_inicio, min_fin);
+CREATE INDEX IF NOT EXISTS idx_clases_profesor_semestre ON clases (id_profesor, id_semestre);
+CREATE INDEX IF NOT EXISTS idx_detalle_cronogramas_clase ON detalle_cronogramas (id_clase);
+
+/* Cada fila de detalle expandida en las franjas horarias que toca su intervalo min_inicio-min_fin */
+CREATE VIEW IF NOT EXISTS ocupacion_profesores AS
+SELECT dc.id_detalle, dc.id_cronograma, cl.id_semestre, cl.id_profesor, dc.dia, hd.hora
+FROM detalle_cronogramas dc
+JOIN clases cl ON dc.id_clase = cl.id_clase
+JOIN horas_dia hd ON hd.hora * 60 < dc.min_fin AND (hd.hora + 1) * 60 > dc.min_inicio;
+
+/* Al insertar una hora basta con encender sus bits */
+CREATE TRIGGER IF NOT EXISTS disponibilidad_detalle_insert AFTER INSERT ON detalle_cronogramas
+BEGIN
+    INSERT INTO disponibilidad_profesores (id_semestre, id_profesor, dia, mascara)
+    SELECT id_semestre, id_profesor, dia, SUM(DISTINCT 1 << hora) FROM ocupacion_profesores
+    WHERE id_detalle = NEW.id_detalle AND id_semestre IS NOT NULL AND id_profesor IS NOT NULL
+    GROUP BY id_semestre, id_profesor, dia
+    ON CONFLICT (id_semestre, id_profesor, dia) DO UPDATE SET mascara = mascara | excluded.mascara;
+END;
+
+/* Al borrar, otra fila puede cubrir las mismas horas: se recalcula solo la máscara afectada */
+CREATE TRIGGER IF NOT EXISTS disponibilidad_detalle_delete AFTER DELETE ON detalle_cronogramas
+BEGIN
+    DELETE FROM disponibilidad_profesores
+    WHERE (id_semestre, id_profesor, dia) IN (SELECT id_semestre, id_profesor, OLD.dia FROM clases WHERE id_clase = OLD.id_clase);
+    INSERT INTO disponibilidad_profesores (id_semestre, id_profesor, dia, mascara)
+    SELECT o.id_semestre, o.id_profesor, o.dia, SUM(DISTINCT 1 << o.hora)
+    FROM ocupacion_profesores o JOIN clases cl ON cl.id_clase = OLD.id_clase
+    WHERE o.id_semestre = cl.id_semestre AND o.id_profesor = cl.id_profesor AND o.dia = OLD.dia
+    GROUP BY o.id_semestre, o.id_profesor, o.dia;
+END;
+
+CREATE TRIGGER IF NOT EXISTS disponibilidad_detalle_update
+AFTER UPDATE OF dia_num, min_inicio, min_fin, id_clase ON detalle_cronogramas
+BEGIN
+    DELETE FROM disponibilidad_profesores
+    WHERE (id_semestre, id_profesor, dia) IN (SELECT id_semestre, id_profesor, OLD.dia FROM clases WHERE id_clase = OLD.id_clase
+                                              UNION SELECT id_semestre, id_profesor, NEW.dia FROM clases WHERE id_clase = NEW.id_clase);
+    INSERT INTO disponibilidad_profesores (id_semestre, id_profesor, dia, mascara)
+    SELECT o.id_semestre, o.id_profesor, o.dia, SUM(DISTINCT 1 << o.hora)
+    FROM ocupacion_profesores o
+    WHERE (o.id_semestre, o.id_profesor, o.dia) IN (SELECT id_semestre, id_profesor, OLD.dia FROM clases WHERE id_clase = OLD.id_clase
+                                                    UNION SELECT id_semestre, id_profesor, NEW.dia FROM clases WHERE id_clase = NEW.id_clase)
+    GROUP BY o.id_semestre, o.id_profesor, o.dia;
+END;
+
+/* Cambiar el profesor o el semestre de una clase mueve sus horas de una máscara a otra */
+CREATE TRIGGER IF NOT EXISTS disponibilidad_clase_update AFTER UPDATE OF id_profesor, id_semestre ON clases
+WHEN OLD.id_profesor IS NOT NEW.id_profesor OR OLD.id_semestre IS NOT NEW.id_semestre
+BEGIN
+    DELETE FROM disponibilidad_profesores
+    WHERE (id_semestre = OLD.id_semestre AND id_profesor = OLD.id_profesor)
+       OR (id_semestre = NEW.id_semestre AND id_profesor = NEW.id_profesor);
+    INSERT INTO disponibilidad_profesores (id_semestre, id_profesor, dia, mascara)
+    SELECT id_semestre, id_profesor, dia, SUM(DISTINCT 1 << hora) FROM ocupacion_profesores
+    WHERE (id_semestre = OLD.id_semestre AND id_profesor = OLD.id_profesor)
+       OR (id_semestre = NEW.id_semestre AND id_profesor = NEW.id_profesor)
+    GROUP BY id_semestre, id_profesor, dia;
+END;
+
+CREATE TRIGGER IF NOT EXISTS disponibilidad_clase_delete AFTER DELETE ON clases
+BEGIN
+    DELETE FROM disponibilidad_profesores WHERE id_semestre = OLD.id_semestre AND id_profesor = OLD.id_profesor;
+    INSERT INTO disponibilidad_profesores (id_semestre, id_profesor, dia, mascara)
+    SELECT id_semestre, id_profesor, dia, SUM(DISTINCT 1 << hora) FROM ocupacion_profesores
+    WHERE id_semestre = OLD.id_semestre AND id_profesor = OLD.id_profesor
+    GROUP BY id_semestre, id_profesor, dia;
+END;
+"""
+
+# Versiones de los horarios (ver cache_grillas.py). Por tabla y operación, las
+# consultas que dan los cronogramas cuya grilla cambia con la fila (NEW u OLD):
+# su trigger incrementa la versión de cada uno en versiones_cronogramas y la
+# versión global 'horarios'. Una lista vacía solo incrementa 'horarios' y None
+# indica que la operación no cambia lo que muestra ningún horario. Todas las
+# tablas de TABLAS_VERSIONADAS declaran sus tres operaciones.
+_CRONOGRAMAS_CON = ("SELECT dc.id_cronograma FROM detalle_cronogramas dc JOIN clases cl ON dc.id_clase = cl.id_clase "
+                    "WHERE cl.{columna} = OLD.{columna}")
+VERSIONES_HORARIOS = {
+    ('detalle_cronogramas', 'INSERT'): ["SELECT NEW.id_cronograma AS id_cronograma"],
+    ('detalle_cronogramas', 'UPDATE'): ["SELECT OLD.id_cronograma AS id_cronograma",
+                                        "SELECT NEW.id_cronograma AS id_cronograma"],
+    ('detalle_cronogramas', 'DELETE'): ["SELECT OLD.id_cronograma AS id_cronograma"],
+    ('cronogramas', 'INSERT'): ["SELECT NEW.id_cronograma AS id_cronograma"],
+    ('cronogramas', 'UPDATE'): ["SELECT NEW.id_cronograma AS id_cronograma"],
+    ('cronogramas', 'DELETE'): [],  # su fila de versiones_cronogramas se borra (ver abajo)
+    ('clases', 'INSERT'): None,  # una clase nueva aún no está en ningún horario
+    ('clases', 'UPDATE'): ["SELECT id_cronograma FROM detalle_cronogramas WHERE id_clase = NEW.id_clase"],
+    ('clases', 'DELETE'): ["SELECT id_cronograma FROM detalle_cronogramas WHERE id_clase = OLD.id_clase"],
+    ('profesores', 'INSERT'): None,
+    ('profesores', 'UPDATE'): [_CRONOGRAMAS_CON.format(columna='id_profesor')],
+    ('profesores', 'DELETE'): [_CRONOGRAMAS_CON.format(columna='id_profesor')],
+    # Los cursos y semestres nuevos aparecen en los filtros de la lista de horarios
+    ('cursos', 'INSERT'): [],
+    ('cursos', 'UPDATE'): [_CRONOGRAMAS_CON.format(columna='id_curso'),
+                           "SELECT id_cronograma FROM cronogramas WHERE id_curso = OLD.id_curso"],
+    ('cursos', 'DELETE'): [_CRONOGRAMAS_CON.format(columna='id_curso'),
+                           "SELECT id_cronograma FROM cronogramas WHERE id_curso = OLD.id_curso"],
+    ('semestres', 'INSERT'): [],
+    ('semestres', 'UPDATE'): [_CRONOGRAMAS_CON.format(columna='id_semestre')],
+    ('semestres', 'DELETE'): [_CRONOGRAMAS_CON.format(columna='id_semestre')],
+}
+_NOMBRES_TRIGGER = {'detalle_cronogramas': 'detalle', 'cronogramas': 'cronograma', 'clases': 'clase',
+                    'profesores': 'profesor', 'cursos': 'curso', 'semestres': 'semestre'}
+
+# Contador de cambios propio de cada tabla (fila de versiones_tablas con el nombre
+# de la tabla), del que salen los ETag de la API JSON (ver api.py).
+TABLAS_VERSIONADAS = ('semestres', 'profesores', 'cursos', 'clases', 'cronogramas', 'detalle_cronogramas')
+_sin_declarar = {(t, o) for t in TABLAS_VERSIONADAS for o in ('INSERT', 'UPDATE', 'DELETE')} - set(VERSIONES_HORARIOS)
+if _sin_declarar:
+    raise RuntimeError(f"Operaciones sin versiones de horarios declaradas en VERSIONES_HORARIOS: {sorted(_sin_declarar)}")
+
+
+def _trigger_versiones(tabla, operacion, origenes):
+    """Trigger de VERSIONES_HORARIOS para una tabla y operación."""
+    incrementos = "".join(f"""
+    INSERT INTO versiones_cronogramas (id_cronograma, version, modificado)
+    SELECT DISTINCT id_cronograma, 1, CURRENT_TIMESTAMP FROM ({origen}) WHERE id_cronograma IS NOT NULL
+    ON CONFLICT (id_cronograma) DO UPDATE SET version = version + 1, modificado = excluded.modificado;""" for origen in origenes)
+    return f"""
+CREATE TRIGGER IF NOT EXISTS versiones_{_NOMBRES_TRIGGER[tabla]}_{operacion.lower()} AFTER {operacion} ON {tabla}
+BEGIN{incrementos}
+    INSERT INTO versiones_tablas (nombre, version, modificado) VALUES ('horarios', 1, CURRENT_TIMESTAMP)
+    ON CONFLICT (nombre) DO UPDATE SET version = version + 1, modificado = excluded.modificado;
+END;
+"""
+
+
+OBJETOS_DERIVADOS += "".join(_trigger_versiones(tabla, operacion, origenes)
+                             for (tabla, operacion), origenes in VERSIONES_HORARIOS.items() if origenes is not None)
+OBJETOS_DERIVADOS += """
+CREATE TRIGGER IF NOT EXISTS versiones_cronograma_limpieza AFTER DELETE ON cronogramas
+BEGIN
+    DELETE FROM versiones_cronogramas WHERE id_cronograma = OLD.id_cronograma;
+END;
+"""
+OBJETOS_DERIVADOS += "".join(f"""
+CREATE TRIGGER IF NOT EXISTS versiones_tabla_{tabla}_{operacion.lower()} AFTER {operacion} ON {tabla}
+BEGIN
+    INSERT INTO versiones_tablas (nombre, version, modificado) VALUES ('{tabla}', 1, CURRENT_TIMESTAMP)
+    ON CONFLICT (nombre) DO UPDATE SET version = version + 1, modificado = excluded.modificado;
+END;
+""" for tabla in TABLAS_VERSIONADAS for operacion in ('INSERT', 'UPDATE', 'DELETE'))
+
+# Migraciones versionadas sobre ESQUEMA: (versión, descripción, script SQL).
+# PRAGMA user_version guarda la última aplicada; cada una corre en su propia
+# transacción y solo se agregan al final, nunca se modifican.
+MIGRACIONES = [
+    (1, "Índices de consulta y restricciones UNIQUE", """
+        /* Nombres repetidos de antes de las restricciones: se conserva el más antiguo
+           y a los demás se les añade su id para poder crear los índices UNIQUE. */
+        UPDATE cronogramas SET nombre = nombre || ' (' || id_cronograma || ')'
+        WHERE id_cronograma NOT IN (SELECT MIN(id_cronograma) FROM cronogramas GROUP BY nombre);
+        UPDATE cursos SET nombre = nombre || ' (' || id_curso || ')'
+        WHERE id_curso NOT IN (SELECT MIN(id_curso) FROM cursos GROUP BY LOWER(nombre));
+        UPDATE semestres SET nombre = nombre || ' (' || id_semestre || ')'
+        WHERE id_semestre NOT IN (SELECT MIN(id_semestre) FROM semestres GROUP BY LOWER(nombre));
+
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_cronogramas_nombre ON cronogramas (nombre);
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_cursos_nombre ON cursos (LOWER(nombre));
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_semestres_nombre ON semestres (LOWER(nombre));
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_clases_curso_profesor_semestre ON clases (id_curso, id_profesor, id_semestre);
+
+        /* Validación de solapamientos de crear_horario y detalles de la lista de horarios */
+        CREATE INDEX IF NOT EXISTS idx_detalle_cronogramas_cronograma_dia ON detalle_cronogramas (id_cronograma, dia, h_inicio);
+        CREATE INDEX IF NOT EXISTS idx_cronogramas_curso ON cronogramas (id_curso);
+        /* Clases del semestre a planificar (generador._cargar_clases, filtros por semestre) */
+        CREATE INDEX IF NOT EXISTS idx_clases_semestre_curso ON clases (id_semestre, id_curso);
+    """),
+    (2, "Días y horas de detalle_cronogramas como enteros", """
+        /* Se reconstruye la tabla con dia_num, min_inicio y min_fin calculados desde el
+           texto; la vista y los triggers que dependen de ella se recrean después
+           (OBJETOS_DERIVADOS). */
+        DROP VIEW IF EXISTS ocupacion_profesores;
+        CREATE TABLE detalle_cronogramas_nueva (
+            id_detalle INTEGER PRIMARY KEY AUTOINCREMENT,
+            id_cronograma INTEGER,
+            dia_num INTEGER,
+            min_inicio INTEGER,
+            min_fin INTEGER,
+            id_clase INTEGER,
+            id_curso INTEGER,
+            dia TEXT GENERATED ALWAYS AS (CASE dia_num WHEN 0 THEN 'Lunes' WHEN 1 THEN 'Martes' WHEN 2 THEN 'Miércoles'
+                WHEN 3 THEN 'Jueves' WHEN 4 THEN 'Viernes' WHEN 5 THEN 'Sábado' WHEN 6 THEN 'Domingo' END) VIRTUAL,
+            h_inicio TEXT GENERATED ALWAYS AS (printf('%02d:%02d', min_inicio / 60, min_inicio % 60)) VIRTUAL,
+            h_fin TEXT GENERATED ALWAYS AS (printf('%02d:%02d', min_fin / 60, min_fin % 60)) VIRTUAL,
+            FOREIGN KEY (id_clase) REFERENCES clases(id_clase),
+            FOREIGN KEY (id_curso) REFERENCES cursos(id_curso),
+            FOREIGN KEY (id_cronograma) REFERENCES cronogramas(id_cronograma)
+        );
+        INSERT INTO detalle_cronogramas_nueva (id_detalle, id_cronograma, dia_num, min_inicio, min_fin, id_clase, id_curso)
+        SELECT id_detalle, id_cronograma,
+               CASE dia WHEN 'Lunes' THEN 0 WHEN 'Martes' THEN 1 WHEN 'Miércoles' THEN 2 WHEN 'Jueves' THEN 3
+                        WHEN 'Viernes' THEN 4 WHEN 'Sábado' THEN 5 WHEN 'Domingo' THEN 6 END,
+               CAST(substr(h_inicio, 1, instr(h_inicio, ':') - 1) AS INTEGER) * 60 + CAST(substr(h_inicio, instr(h_inicio, ':') + 1, 2) AS INTEGER),
+               CAST(substr(h_fin, 1, instr(h_fin, ':') - 1) AS INTEGER) * 60 + CAST(substr(h_fin, instr(h_fin, ':') + 1, 2) AS INTEGER),
+               id_clase, id_curso
+        FROM detalle_cronogramas;
+        DROP TABLE detalle_cronogramas;
+        /* Sin validar los triggers de otras tablas que usan la vista, que aún no existe */
+        PRAGMA legacy_alter_table = ON;
+        ALTER TABLE detalle_cronogramas_nueva RENAME TO detalle_cronogramas;
+        PRAGMA legacy_alter_table = OFF;
+    """),
+    (3, "Historial de ejecuciones del solver", """
+        /* Historial de la generación automática: una fila por ejecución con el tamaño
+           de la entrada, el tamaño del modelo, los tiempos, el resultado y el motor y
+           las constantes usadas (ver telemetria.py). Sin claves foráneas: el historial
+           se conserva aunque se eliminen semestres o cursos. */
+        CREATE TABLE IF NOT EXISTS ejecuciones_solver (
+            id_ejecucion INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            id_semestre INTEGER,
+            cursos TEXT NOT NULL,
+            motor TEXT NOT NULL,
+            formulacion TEXT,
+            arranque TEXT NOT NULL,
+            tiempo_limite INTEGER,
+            constantes TEXT NOT NULL,
+            n_cursos INTEGER NOT NULL DEFAULT 0,
+            n_clases INTEGER NOT NULL DEFAULT 0,
+            n_horas INTEGER NOT NULL DEFAULT 0,
+            n_profesores INTEGER NOT NULL DEFAULT 0,
+            n_bloqueos INTEGER NOT NULL DEFAULT 0,
+            n_componentes INTEGER NOT NULL DEFAULT 0,
+            componentes_cache INTEGER NOT NULL DEFAULT 0,
+            variables INTEGER,
+            restricciones INTEGER,
+            t_carga REAL,
+            t_construccion REAL,
+            t_resolucion REAL,
+            t_total REAL NOT NULL,
+            estado TEXT NOT NULL,
+            exito INTEGER NOT NULL DEFAULT 0,
+            objetivo REAL,
+            desglose TEXT,
+            mensaje TEXT
+        );
+    """),
+    (4, "Trabajos en segundo plano", """
+        /* Estado de los trabajos de trabajos.py, compartido por todos los procesos web.
+           ids_cronogramas y reservados son listas JSON; reservados son los cronogramas
+           que creó la vista para el trabajo y que se eliminan si queda sin terminar. */
+        CREATE TABLE IF NOT EXISTS trabajos (
+            id_trabajo TEXT PRIMARY KEY,
+            descripcion TEXT NOT NULL,
+            estado TEXT NOT NULL,
+            cancelacion INTEGER NOT NULL DEFAULT 0,
+            objetivo REAL,
+            mensaje TEXT,
+            ids_cronogramas TEXT NOT NULL DEFAULT '[]',
+            reservados TEXT NOT NULL DEFAULT '[]',
+            creado REAL NOT NULL,
+            inicio REAL,
+            fin REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_trabajos_estado ON trabajos(estado, creado);
+    """),
+    (5, "Proceso dueño y latido de los trabajos", """
+        /* Proceso que ejecuta cada trabajo y última vez que confirmó que sigue vivo
+           (ver trabajos.recuperar_trabajos). */
+        ALTER TABLE trabajos ADD COLUMN host TEXT;
+        ALTER TABLE trabajos ADD COLUMN pid INTEGER;
+        ALTER TABLE trabajos ADD COLUMN latido REAL;
+    """),
+]
+
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+
+def a_minutos(hora):
+    """Convierte 'HH:MM' en minutos desde la medianoche (ValueError si no es una hora válida)."""
+    h, m = hora.split(':')[:2]
+    h, m = int(h), int(m)
+    if not (0 <= h < 24 and 0 <= m < 60):
+        raise ValueError(f"Hora inválida: {hora}")
+    return h * 60 + m
+
+
+class CursorMedido(sqlite3.Cursor):
+    """Cursor que informa a metricas.py de cada sentencia, su duración y las filas leídas."""
+
+    def execute(self, sql, parametros=()):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, parametros)
+        finally:
+            metricas.registrar_sentencia(sql, time.perf_counter() - inicio)
+
+    def executemany(self, sql, secuencia):
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, secuencia)
+        finally:
+            metricas.registrar_sentencia(sql, time.perf_counter() - inicio)
+
+    def executescript(self, script):
+        inicio = time.perf_counter()
+        try:
+            return super().executescript(script)
+        finally:
+            metricas.registrar_sentencia(script, time.perf_counter() - inicio)
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        fila = super().fetchone()
+        metricas.registrar_filas(fila is not None, time.perf_counter() - inicio)
+        return fila
+
+    def fetchmany(self, size=None):
+        inicio = time.perf_counter()
+        filas = super().fetchmany(self.arraysize if size is None else size)
+        metricas.registrar_filas(len(filas), time.perf_counter() - inicio)
+        return filas
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        filas = super().fetchall()
+        metricas.registrar_filas(len(filas), time.perf_counter() - inicio)
+        return filas
+
+    def __next__(self):
+        inicio = time.perf_counter()
+        fila = super().__next__()
+        metricas.registrar_filas(1, time.perf_counter() - inicio)
+        return fila
+
+
+class Conexion(sqlite3.Connection):
+    """
+    Conexión del pool. close() no la cierra: descarta la transacción pendiente
+    y la devuelve al pool, o no hace nada si pertenece a la solicitud en curso
+    (entonces la devuelve liberar_conexion_solicitud al terminar la solicitud).
+
+    Sus cursores son CursorMedido. Los atajos execute* de sqlite3.Connection
+    no pasan por Cursor.execute, así que se redefinen sobre cursor().
+    """
+    ruta = None
+    de_solicitud = False
+
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, secuencia):
+        return self.cursor().executemany(sql, secuencia)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+    def close(self):
+        if self.de_solicitud:
+            if self.in_transaction:
+                self.rollback()
+            return
+        _devolver(self)
+
+
+_pool = []
+_pool_lock = threading.Lock()
+
+
+def _nueva_conexion():
+    conn = sqlite3.connect(DATABASE_NAME, factory=Conexion, check_same_thread=False)
+    conn.ruta = DATABASE_NAME
     conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
     return conn
 
+
+def _tomar():
+    with _pool_lock:
+        while _pool:
+            conn = _pool.pop()
+            if conn.ruta == DATABASE_NAME:
+                return conn
+            sqlite3.Connection.close(conn)
+    return _nueva_conexion()
+
+
+def _devolver(conn):
+    if conn.in_transaction:
+        conn.rollback()
+    conn.row_factory = sqlite3.Row
+    with _pool_lock:
+        if conn.ruta == DATABASE_NAME and len(_pool) < MAX_CONEXIONES_POOL:
+            _pool.append(conn)
+            return
+    sqlite3.Connection.close(conn)
+
+
+def get_db_connection():
+    """
+    Retorna una conexión a la base de datos SQLite tomada del pool.
+
+    Dentro de una solicitud de Flask es siempre la misma conexión para toda la
+    solicitud y se devuelve al pool al terminar (ver liberar_conexion_solicitud),
+    aunque la vista no llegue a cerrarla. Fuera de una solicitud (trabajos en
+    segundo plano, scripts) vuelve al pool con conn.close().
+    """
+    if not has_app_context():
+        return _tomar()
+    if 'conexion' not in g:
+        g.conexion = _tomar()
+        g.conexion.de_solicitud = True
+    return g.conexion
+
+
+def liberar_conexion_solicitud(exc=None):
+    """Teardown del contexto de la aplicación: devuelve al pool la conexión de la solicitud."""
+    conn = g.pop('conexion', None)
+    if conn is not None:
+        conn.de_solicitud = False
+        _devolver(conn)
+
+def version_tabla(conn, nombre):
+    """Retorna (version, modificado) de `nombre` en versiones_tablas, o (0, None) si nunca cambió."""
+    fila = conn.execute("SELECT version, modificado FROM versiones_tablas WHERE nombre = ?", (nombre,)).fetchone()
+    return (fila[0], fila[1]) if fila else (0, None)
+
+def reconstruir_disponibilidad(conn):
+    """Recalcula desde cero el índice disponibilidad_profesores (sin hacer commit)."""
+    conn.execute("DELETE FROM disponibilidad_profesores")
+    conn.execute("""
+        INSERT INTO disponibilidad_profesores (id_semestre, id_profesor, dia, mascara)
+        SELECT id_semestre, id_profesor, dia, SUM(DISTINCT 1 << hora) FROM ocupacion_profesores
+        WHERE id_semestre IS NOT NULL AND id_profesor IS NOT NULL
+        GROUP BY id_semestre, id_profesor, dia
+    """)
+
+def migrar(conn):
+    """Aplica en orden las MIGRACIONES pendientes y retorna la versión final del esquema."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for numero, descripcion, script in MIGRACIONES:
+        if numero <= version:
+            continue
+        try:
+            conn.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {numero};\nCOMMIT;")
+        except sqlite3.Error as e:
+            conn.rollback()
+            raise RuntimeError(f"No se pudo aplicar la migración {numero} ({descripcion}): {e}") from e
+        version = numero
+    return version
+
+def crear_esquema(conn):
+    """Crea las tablas que falten, aplica las migraciones pendientes y crea los objetos derivados; retorna la versión."""
+    conn.executescript(ESQUEMA)
+    version = migrar(conn)
+    conn.executescript(OBJETOS_DERIVADOS)
+    return version
+
 def init_db():
     """Inicializa la base de datos y crea todas las tablas si no existen."""
     conn = get_db_connection()
     cursor = conn.cursor()
 
-    schema = """
-    CREATE TABLE IF NOT EXISTS semestres (
-        id_semestre INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre TEXT NOT NULL,
-        fecha_inicio TEXT,
-        fecha_fin TEXT
-    );
-
-    CREATE TABLE IF NOT EXISTS profesores (
-        id_profesor INTEGER PRIMARY KEY AUTOINCREMENT,
-        cedula TEXT NOT NULL,
-        nombre TEXT NOT NULL,
-        correo TEXT,
-        telefono TEXT
-    );
-
-    CREATE TABLE IF NOT EXISTS cursos (
-        id_curso INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre TEXT NOT NULL,
-        descripcion TEXT
-    );
-
-    CREATE TABLE IF NOT EXISTS paralelos (
-        id_paralelo INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre TEXT NOT NULL,
-        descripcion TEXT,
-        id_curso INTEGER,
-        FOREIGN KEY (id_curso) REFERENCES cursos(id_curso)
-    );
-
-    CREATE TABLE IF NOT EXISTS clases (
-        id_clase INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre TEXT NOT NULL,
-        descripcion TEXT,
-        n_horas INTEGER,
-        horas_semana INTEGER,
-        id_curso INTEGER,
-        id_profesor INTEGER,
-        id_semestre INTEGER,
-        FOREIGN KEY (id_curso) REFERENCES cursos(id_curso),
-        FOREIGN KEY (id_profesor) REFERENCES profesores(id_profesor),
-        FOREIGN KEY (id_semestre) REFERENCES semestres(id_semestre)
-    );
-
-    /* MODIFICACIÓN: Se añade la restricción UNIQUE a la columna nombre */
-    CREATE TABLE IF NOT EXISTS cronogramas (
-        id_cronograma INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre TEXT NOT NULL,
-        id_curso INTEGER,
-        FOREIGN KEY (id_curso) REFERENCES cursos(id_curso)
-    );
-
-    CREATE TABLE IF NOT EXISTS detalle_cronogramas (
-        id_detalle INTEGER PRIMARY KEY AUTOINCREMENT,
-        id_cronograma INTEGER,
-        dia TEXT,
-        h_inicio TEXT,
-        h_fin TEXT,
-        id_clase INTEGER,
-        id_curso INTEGER,
-        FOREIGN KEY (id_clase) REFERENCES clases(id_clase),
-        FOREIGN KEY (id_curso) REFERENCES cursos(id_curso),
-        FOREIGN KEY (id_cronograma) REFERENCES cronogramas(id_cronograma)
-    );
-    """
-   
-    cursor.executescript(schema)
-    print("Base de datos 'horarios.db' y todas sus tablas han sido creadas/verificadas.")
+    version = crear_esquema(conn)
+    print(f"Base de datos 'horarios.db' y todas sus tablas han sido creadas/verificadas (esquema v{version}).")
+
+    # Bases creadas antes del índice de disponibilidad: se llena una sola vez
+    vacio = cursor.execute("SELECT NOT EXISTS (SELECT 1 FROM disponibilidad_profesores)").fetchone()[0]
+    if vacio and cursor.execute("SELECT EXISTS (SELECT 1 FROM ocupacion_profesores)").fetchone()[0]:
+        reconstruir_disponibilidad(conn)
+        conn.commit()
+        print("Índice de disponibilidad de profesores reconstruido.")
    
     cursor.execute("SELECT COUNT(*) FROM profesores")
     count = cursor.fetchone()[0]
@@ -1,3 +1,4 @@
 #!/bin/sh
 source .venv/bin/activate
+python init_db.py
 python -u -m flask --app main run -p 8080 --debug
\ No newline at end of file
@@ -0,0 +1,155 @@
+"""
+Exportación de horarios guardados a iCalendar, CSV y JSON.
+
+Cada exportación es un generador que va leyendo el cursor de SQLite fila a
+fila y produce el documento por partes, así que ni una exportación de toda la
+institución arma el archivo completo en memoria (ver `horarios.exportar`).
+
+Alcances: un cronograma, un profesor o un semestre (todas sus entradas).
+En iCalendar cada entrada es un evento semanal (RRULE) desde la primera fecha
+de ese día de la semana a partir de `semestres.fecha_inicio` hasta
+`fecha_fin`; si el semestre no tiene fechas, empieza la semana actual y se
+repite sin límite.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta, timezone
+
+FORMATOS = {
+    'ics': 'text/calendar; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+}
+
+# alcance -> (tabla, columna del id, condición sobre las entradas)
+ALCANCES = {
+    'cronograma': ('cronogramas', 'id_cronograma', 'dc.id_cronograma = ?'),
+    'profesor': ('profesores', 'id_profesor', 'cl.id_profesor = ?'),
+    'semestre': ('semestres', 'id_semestre', 'cl.id_semestre = ?'),
+}
+
+COLUMNAS = ('id_detalle', 'id_cronograma', 'cronograma', 'curso', 'clase', 'profesor', 'semestre',
+            'dia', 'h_inicio', 'h_fin')
+
+
+def nombre_de(conn, alcance, id_alcance):
+    """Nombre del cronograma, profesor o semestre, o None si no existe."""
+    tabla, columna, _ = ALCANCES[alcance]
+    fila = conn.execute(f"SELECT nombre FROM {tabla} WHERE {columna} = ?", (id_alcance,)).fetchone()
+    return None if fila is None else fila['nombre']
+
+
+def consultar(conn, alcance, id_alcance):
+    """Cursor (sin materializar) con las entradas del alcance, por cronograma, día y hora."""
+    _, _, condicion = ALCANCES[alcance]
+    return conn.execute(f"""
+        SELECT dc.id_detalle, dc.id_cronograma, cr.nombre AS cronograma, cu.nombre AS curso,
+               cl.nombre AS clase, p.nombre AS profesor, s.nombre AS semestre,
+               s.fecha_inicio, s.fecha_fin, dc.dia_num, dc.dia, dc.min_inicio, dc.min_fin, dc.h_inicio, dc.h_fin
+        FROM detalle_cronogramas dc
+        JOIN cronogramas cr ON dc.id_cronograma = cr.id_cronograma
+        JOIN clases cl ON dc.id_clase = cl.id_clase
+        LEFT JOIN cursos cu ON dc.id_curso = cu.id_curso
+        LEFT JOIN profesores p ON cl.id_profesor = p.id_profesor
+        LEFT JOIN semestres s ON cl.id_semestre = s.id_semestre
+        WHERE {condicion}
+        ORDER BY dc.id_cronograma, dc.dia_num, dc.min_inicio
+    """, (id_alcance,))
+
+
+# --- CSV ---
+
+def generar_csv(filas):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUMNAS)
+    for fila in filas:
+        escritor.writerow([fila[c] for c in COLUMNAS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+# --- JSON ---
+
+def generar_json(filas):
+    separador = '['
+    for fila in filas:
+        yield separador + json.dumps({c: fila[c] for c in COLUMNAS}, ensure_ascii=False)
+        separador = ','
+    yield '[]' if separador == '[' else ']'
+
+
+# --- iCalendar ---
+
+def _escapar(texto):
+    return (str(texto or '').replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+
+def _plegar(linea):
+    """Corta la línea en tramos de 75 octetos como pide RFC 5545 (continuación con espacio)."""
+    tramos, actual, octetos = [], '', 0
+    for caracter in linea:
+        tamano = len(caracter.encode('utf-8'))
+        if octetos + tamano > 75:
+            tramos.append(actual)
+            actual, octetos = ' ', 1
+        actual += caracter
+        octetos += tamano
+    tramos.append(actual)
+    return '\r\n'.join(tramos) + '\r\n'
+
+
+def _fecha(texto):
+    try:
+        return date.fromisoformat(texto) if texto else None
+    except ValueError:
+        return None
+
+
+def _evento(fila, marca):
+    inicio_semestre = _fecha(fila['fecha_inicio'])
+    fin_semestre = _fecha(fila['fecha_fin'])
+    base = inicio_semestre or date.today() - timedelta(days=date.today().weekday())
+    dia = base + timedelta(days=(fila['dia_num'] - base.weekday()) % 7)
+    inicio = datetime(dia.year, dia.month, dia.day) + timedelta(minutes=fila['min_inicio'])
+    fin = datetime(dia.year, dia.month, dia.day) + timedelta(minutes=fila['min_fin'])
+    regla = 'RRULE:FREQ=WEEKLY'
+    if fin_semestre:
+        regla += f";UNTIL={fin_semestre:%Y%m%d}T235959"
+    lineas = [
+        'BEGIN:VEVENT',
+        f"UID:detalle-{fila['id_detalle']}@horarios",
+        f"DTSTAMP:{marca}",
+        f"DTSTART:{inicio:%Y%m%dT%H%M%S}",
+        f"DTEND:{fin:%Y%m%dT%H%M%S}",
+        regla,
+        f"SUMMARY:{_escapar(fila['clase'])}",
+        'DESCRIPTION:' + '\\n'.join(_escapar(f"{etiqueta}: {fila[columna]}") for etiqueta, columna in
+                                    (('Profesor', 'profesor'), ('Curso', 'curso'), ('Horario', 'cronograma'))),
+        f"CATEGORIES:{_escapar(fila['semestre'])}",
+        'END:VEVENT',
+    ]
+    return ''.join(_plegar(l) for l in lineas)
+
+
+def generar_ical(filas, nombre):
+    marca = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    yield ''.join(_plegar(l) for l in (
+        'BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//UPCA//Horarios//ES', 'CALSCALE:GREGORIAN',
+        f"X-WR-CALNAME:{_escapar(nombre)}"))
+    for fila in filas:
+        yield _evento(fila, marca)
+    yield _plegar('END:VCALENDAR')
+
+
+def generar(formato, filas, nombre):
+    """Generador del documento en `formato` a partir de las filas de `consultar`."""
+    if formato == 'ics':
+        return generar_ical(filas, nombre)
+    if formato == 'csv':
+        return generar_csv(filas)
+    return generar_json(filas)
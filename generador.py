@@ -0,0 +1,621 @@
+"""
+Generación automática de horarios con PuLP.
+
+Este módulo no depende de Flask: lo ejecutan los trabajos en segundo plano
+(ver `trabajos.py`) lanzados desde `horarios.ejecutar_creacion_automatica`.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import cache_soluciones
+import heuristica
+import modelo
+import telemetria
+from database import DIAS_SEMANA, a_minutos, get_db_connection
+from modelo import (DIAS, HORAS, LIMITE_HORAS_DIARIAS, PENALIZACION_BLOQUE_LARGO, PENALIZACION_EXCESO_HORAS,
+                    PENALIZACION_FRAGMENTACION, PENALIZACION_HUECO, PENALIZACION_INICIO_BLOQUE)
+from trabajos import TrabajoCancelado
+
+# Segundos como máximo que CBC busca una solución.
+TIEMPO_LIMITE_SOLVER = 60
+# Cada cuánto se revisa el log de CBC para actualizar el incumbente y la cancelación.
+INTERVALO_SONDEO = 0.5
+# Procesos que resuelven en paralelo las componentes independientes de un modelo.
+MAX_PROCESOS_SOLVER = int(os.environ.get('HORARIOS_MAX_PROCESOS', os.cpu_count() or 1))
+
+# El pool y el Manager que comparte la cancelación y los incumbentes con sus procesos viven
+# mientras viva el proceso web: crear un Manager por generación arrancaba un intérprete cada vez.
+_pool_procesos = None
+_manager_procesos = None
+_lock_pool = threading.Lock()
+
+# Se incrementa cuando cambia la formulación o lo que se guarda en la caché, para no reutilizar
+# resultados anteriores (la versión 1 guardaba también incumbentes sin óptimo probado).
+VERSION_MODELO = 2
+
+_RE_SOLUCION_ENTERA = re.compile(r"Integer solution of (\S+) found")
+
+
+class ErrorGeneracion(Exception):
+    """Error esperado de la generación (sin clases, modelo infactible, etc.)."""
+
+
+def resolver_cbc(prob, trabajo=None, tiempo_limite=None, arranque_en_caliente=False):
+    """
+    Resuelve `prob` con CBC en un subproceso que se puede terminar.
+
+    Equivale a `prob.solve(pulp.PULP_CBC_CMD(msg=0, timeLimit=..., warmStart=...))`,
+    pero mientras CBC trabaja se lee su log para publicar el incumbente en
+    `trabajo` y se termina el subproceso si el trabajo se cancela. Con
+    `arranque_en_caliente` los valores iniciales de las variables se pasan a
+    CBC como MIP start. Sin `tiempo_limite` se usa TIEMPO_LIMITE_SOLVER.
+    Retorna el estado de PuLP. Si CBC se detiene por el límite de tiempo con
+    un incumbente, PuLP también informa 'Optimal': solo `prob.sol_status ==
+    pulp.LpSolutionOptimal` indica un óptimo probado.
+    """
+    import pulp  # solo el motor exacto lo necesita (ver modelo.py)
+    if tiempo_limite is None:
+        tiempo_limite = TIEMPO_LIMITE_SOLVER
+    solver = pulp.PULP_CBC_CMD(msg=0, timeLimit=tiempo_limite)
+    if not solver.available():
+        raise pulp.PulpSolverError(f"No se encontró el ejecutable de CBC: {solver.path}")
+
+    tmp_mps, tmp_sol, tmp_log, tmp_mst = solver.create_tmp_files(prob.name, "mps", "sol", "log", "mst")
+    variables, nombres_vars, nombres_restr, _ = prob.writeMPS(tmp_mps, rename=1)
+    args = [solver.path, tmp_mps]
+    if arranque_en_caliente:
+        solver.writesol(tmp_mst, prob, variables, nombres_vars, nombres_restr)
+        args += ["-mips", tmp_mst]
+    args += ["-sec", str(tiempo_limite), "-solve", "-printingOptions", "all", "-solution", tmp_sol]
+
+    try:
+        with open(tmp_log, "w") as log_escritura, open(tmp_log) as log_lectura:
+            proceso = subprocess.Popen(args, stdout=log_escritura, stderr=subprocess.STDOUT,
+                                       stdin=subprocess.DEVNULL)
+            if trabajo is not None:
+                trabajo.registrar_proceso(proceso)
+            while True:
+                try:
+                    proceso.wait(timeout=INTERVALO_SONDEO)
+                    terminado = True
+                except subprocess.TimeoutExpired:
+                    terminado = False
+                if trabajo is not None:
+                    for linea in log_lectura.readlines():
+                        encontrado = _RE_SOLUCION_ENTERA.search(linea)
+                        if encontrado:
+                            trabajo.actualizar_objetivo(float(encontrado.group(1)))
+                    if trabajo.cancelado and not terminado:
+                        proceso.terminate()
+                if terminado:
+                    break
+
+        if trabajo is not None:
+            trabajo.comprobar_cancelacion()
+        if proceso.returncode != 0:
+            raise pulp.PulpSolverError(f"CBC terminó con código {proceso.returncode}")
+
+        status, valores, _, _, _, sol_status = solver.readsol_MPS(
+            tmp_sol, prob, variables, nombres_vars, nombres_restr)
+        prob.assignVarsVals(valores)
+        prob.assignStatus(status, sol_status)
+        return status
+    finally:
+        solver.delete_tmp_files(tmp_mps, tmp_sol, tmp_log, tmp_mst)
+
+
+def dividir_en_componentes(clases_a_planificar):
+    """
+    Divide las clases en componentes conexas del grafo curso–profesor.
+
+    Dos cursos quedan en la misma componente si comparten (directa o
+    indirectamente) algún profesor; las componentes distintas no tienen
+    restricciones en común y se pueden resolver por separado. Retorna una lista
+    de dicts id_clase -> clase, de la más grande a la más pequeña.
+    """
+    padre = {}
+
+    def raiz(nodo):
+        padre.setdefault(nodo, nodo)
+        while padre[nodo] != nodo:
+            padre[nodo] = padre[padre[nodo]]
+            nodo = padre[nodo]
+        return nodo
+
+    for clase in clases_a_planificar.values():
+        padre[raiz(('curso', clase['id_curso']))] = raiz(('profesor', clase['id_profesor']))
+
+    componentes = {}
+    for id_c, clase in clases_a_planificar.items():
+        componentes.setdefault(raiz(('curso', clase['id_curso'])), {})[id_c] = clase
+    return sorted(componentes.values(), key=len, reverse=True)
+
+
+def constantes_penalizacion():
+    """Límite diario y pesos de cada término del objetivo, con los nombres que usa `heuristica.py`."""
+    return {
+        'limite_horas_diarias': LIMITE_HORAS_DIARIAS,
+        'pen_exceso': PENALIZACION_EXCESO_HORAS,
+        'pen_inicio_bloque': PENALIZACION_INICIO_BLOQUE,
+        'pen_hueco': PENALIZACION_HUECO,
+        'pen_fragmentacion': PENALIZACION_FRAGMENTACION,
+        'pen_bloque_largo': PENALIZACION_BLOQUE_LARGO,
+    }
+
+
+def _resolver_milp(clases_a_planificar, horarios_profesores_ocupados, trabajo=None, arranque=None, inicial=None):
+    """
+    Motor exacto: modelo PuLP resuelto con CBC.
+
+    Con `arranque` se calcula primero un horario factible con la heurística
+    (partiendo de `inicial`, si se da) y se entrega a CBC como MIP start.
+    """
+    import pulp
+    fases = {}
+    prob, variables = modelo.construir_modelo(clases_a_planificar, horarios_profesores_ocupados, tiempos=fases)
+    inicio = None
+    if arranque:
+        inicio = _resolver_heuristico(clases_a_planificar, horarios_profesores_ocupados, inicial=inicial)
+        if inicio['estado'] in ESTADOS_CON_SOLUCION:
+            asignacion_inicial = inicio['asignacion']
+            if 'inicio_clase' not in variables:
+                asignacion_inicial = modelo.canonizar_asignacion(clases_a_planificar, horarios_profesores_ocupados,
+                                                                 asignacion_inicial)
+            modelo.fijar_solucion_inicial(clases_a_planificar, variables, asignacion_inicial)
+            if trabajo is not None:
+                trabajo.actualizar_objetivo(inicio['objetivo'])
+        else:
+            inicio = None
+    t0 = time.perf_counter()
+    resolver_cbc(prob, trabajo, arranque_en_caliente=inicio is not None)
+    estadisticas = {
+        'variables': len(prob.variables()),
+        'restricciones': prob.numConstraints(),
+        't_construccion': sum(fases.values()),
+        't_resolucion': time.perf_counter() - t0,
+        'fases_construccion': fases,
+    }
+    estado = pulp.LpStatus[prob.status]
+    if estado != 'Optimal':
+        return {'estado': estado, 'objetivo': None, 'asignacion': [], 'probado': False, 'estadisticas': estadisticas}
+    return {'estado': estado, 'objetivo': pulp.value(prob.objective),
+            'asignacion': modelo.extraer_asignacion(clases_a_planificar, variables),
+            'probado': prob.sol_status == pulp.LpSolutionOptimal, 'estadisticas': estadisticas}
+
+
+def _resolver_heuristico(clases_a_planificar, horarios_profesores_ocupados, trabajo=None, arranque=None, inicial=None):
+    """
+    Motor rápido: construcción voraz + recocido simulado (ver `heuristica.py`).
+    Si se da `inicial` (p. ej. el horario anterior), la búsqueda parte de él.
+    """
+    t0 = time.perf_counter()
+    resultado = heuristica.resolver_heuristico(clases_a_planificar, horarios_profesores_ocupados,
+                                               DIAS, HORAS, constantes_penalizacion(), trabajo, inicial)
+    resultado['probado'] = False
+    resultado['estadisticas'] = {
+        'variables': None,
+        'restricciones': None,
+        't_construccion': 0.0,
+        't_resolucion': time.perf_counter() - t0,
+    }
+    return resultado
+
+
+# Motores de resolución disponibles. Todos reciben (clases, ocupados, trabajo, arranque, inicial)
+# y retornan {'estado', 'objetivo', 'asignacion', 'probado', 'estadisticas'} con asignacion =
+# [(id_clase, dia, hora)], probado = si el costo es un óptimo demostrado (solo CBC sin cortar por tiempo)
+# y estadisticas = {'variables', 'restricciones', 't_construccion', 't_resolucion'} (tiempos en segundos;
+# el motor milp añade 'fases_construccion', ver modelo.construir_modelo).
+MOTORES = {
+    'milp': _resolver_milp,
+    'heuristico': _resolver_heuristico,
+}
+MOTOR_POR_DEFECTO = 'milp'
+# Estados con los que un motor entrega un horario válido.
+ESTADOS_CON_SOLUCION = ('Optimal', 'Heuristica')
+# Orígenes de la solución inicial: ninguno, la heurística o el horario anterior del curso.
+ARRANQUES = ('ninguno', 'heuristico', 'anterior')
+
+
+def resolver_componente(clases_a_planificar, horarios_profesores_ocupados, trabajo=None, motor=MOTOR_POR_DEFECTO,
+                        arranque=None, inicial=None):
+    """
+    Resuelve un conjunto de clases con el motor indicado. `arranque` activa la
+    solución inicial e `inicial` es una asignación previa desde la que partir.
+
+    Retorna un dict con 'estado', 'objetivo', 'asignacion' (la lista de
+    (id_clase, dia, hora) asignados), 'probado' (óptimo demostrado) y
+    'estadisticas' (tamaño del modelo y tiempos). Solo usa tipos simples para poder ejecutarse en otro proceso.
+    """
+    return MOTORES[motor](clases_a_planificar, horarios_profesores_ocupados, trabajo, arranque, inicial)
+
+
+def huella_modelo(clases_a_planificar, horarios_profesores_ocupados, motor=MOTOR_POR_DEFECTO):
+    """
+    Hash canónico de todo lo que determina el resultado del modelo: clases
+    (id, curso, horas_semana, profesor), slots bloqueados de sus profesores,
+    constantes de penalización, la grilla de días/horas y el motor usado.
+    """
+    profesores = sorted({c['id_profesor'] for c in clases_a_planificar.values()})
+    entradas = {
+        'version': VERSION_MODELO,
+        'motor': motor,
+        'formulacion': modelo.FORMULACION_POR_DEFECTO if motor == 'milp' else None,
+        'clases': sorted((id_c, c['id_curso'], c['horas_semana'], c['id_profesor'])
+                         for id_c, c in clases_a_planificar.items()),
+        'bloqueos': [(id_p, sorted(set(horarios_profesores_ocupados.get(id_p, []))))
+                     for id_p in profesores],
+        'constantes': [LIMITE_HORAS_DIARIAS, PENALIZACION_EXCESO_HORAS, PENALIZACION_INICIO_BLOQUE,
+                       PENALIZACION_HUECO, PENALIZACION_FRAGMENTACION, PENALIZACION_BLOQUE_LARGO],
+        'dias': DIAS,
+        'horas': HORAS,
+    }
+    canonico = json.dumps(entradas, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonico.encode('utf-8')).hexdigest()
+
+
+class _TrabajoRemoto:
+    """Adaptador de Trabajo para los procesos del pool: cancelación e incumbente vía el Manager compartido."""
+
+    def __init__(self, indice, cancelacion, incumbentes):
+        self.indice = indice
+        self._cancelacion = cancelacion
+        self._incumbentes = incumbentes
+
+    @property
+    def cancelado(self):
+        return self._cancelacion.is_set()
+
+    def comprobar_cancelacion(self):
+        if self.cancelado:
+            raise TrabajoCancelado("El trabajo fue cancelado por el usuario.")
+
+    def actualizar_objetivo(self, valor):
+        self._incumbentes[self.indice] = valor
+
+    def registrar_proceso(self, proceso):
+        # resolver_cbc termina el proceso por sí mismo al detectar la cancelación.
+        pass
+
+
+def _resolver_componente_remoto(indice, clases_a_planificar, horarios_profesores_ocupados, motor, arranque, inicial,
+                                cancelacion, incumbentes):
+    trabajo = _TrabajoRemoto(indice, cancelacion, incumbentes)
+    trabajo.comprobar_cancelacion()
+    return resolver_componente(clases_a_planificar, horarios_profesores_ocupados, trabajo, motor, arranque, inicial)
+
+
+def _obtener_pool_procesos():
+    """Retorna (pool, manager), creándolos la primera vez."""
+    global _pool_procesos, _manager_procesos
+    with _lock_pool:
+        if _pool_procesos is None:
+            # 'spawn' evita heredar los hilos y conexiones del servidor web.
+            contexto = multiprocessing.get_context('spawn')
+            _manager_procesos = contexto.Manager()
+            _pool_procesos = ProcessPoolExecutor(max_workers=MAX_PROCESOS_SOLVER, mp_context=contexto)
+        return _pool_procesos, _manager_procesos
+
+
+def resolver_en_paralelo(componentes, horarios_profesores_ocupados, trabajo, motor=MOTOR_POR_DEFECTO,
+                         arranque=None, inicial=None):
+    """
+    Resuelve cada componente en un proceso del pool y retorna sus resultados en orden.
+    El incumbente del trabajo es la suma de los incumbentes de todas las componentes.
+    """
+    pool, manager = _obtener_pool_procesos()
+    # Cada llamada usa su propio Event y dict en el Manager compartido; se liberan al salir de la función.
+    cancelacion = manager.Event()
+    incumbentes = manager.dict()
+    futuros = []
+    for indice, clases in enumerate(componentes):
+        profesores = {c['id_profesor'] for c in clases.values()}
+        ocupados = {id_p: horarios_profesores_ocupados[id_p] for id_p in profesores if id_p in horarios_profesores_ocupados}
+        inicial_componente = [a for a in inicial if a[0] in clases] if inicial else None
+        futuros.append(pool.submit(_resolver_componente_remoto, indice, clases, ocupados, motor,
+                                   arranque, inicial_componente, cancelacion, incumbentes))
+
+    pendientes = set(futuros)
+    while pendientes:
+        _, pendientes = wait(pendientes, timeout=INTERVALO_SONDEO)
+        if trabajo.cancelado:
+            cancelacion.set()
+        actuales = dict(incumbentes)
+        if len(actuales) == len(componentes):
+            trabajo.actualizar_objetivo(sum(actuales.values()))
+
+    trabajo.comprobar_cancelacion()
+    return [f.result() for f in futuros]
+
+
+def _estadisticas_ejecucion(n_componentes, resueltos):
+    """Tamaño del modelo y tiempos sumados de las componentes resueltas (las de la caché no cuentan)."""
+    estadisticas = [r['estadisticas'] for r in resueltos]
+
+    def suma(clave):
+        valores = [e[clave] for e in estadisticas if e.get(clave) is not None]
+        return sum(valores) if valores else None
+
+    return {
+        'n_componentes': n_componentes,
+        'componentes_cache': n_componentes - len(resueltos),
+        'variables': suma('variables'),
+        'restricciones': suma('restricciones'),
+        't_construccion': suma('t_construccion'),
+        't_resolucion': suma('t_resolucion'),
+    }
+
+
+def _liberar_cronograma(conn, id_cronograma):
+    """Elimina el cronograma reservado cuando la generación no produce un horario."""
+    conn.rollback()
+    conn.execute("DELETE FROM detalle_cronogramas WHERE id_cronograma = ?", (id_cronograma,))
+    conn.execute("DELETE FROM cronogramas WHERE id_cronograma = ?", (id_cronograma,))
+    conn.commit()
+
+
+def _cargar_clases(conn, id_semestre, ids_cursos):
+    """Retorna id_clase -> datos de las clases con horas de los cursos `ids_cursos` en el semestre."""
+    marcadores = ", ".join("?" for _ in ids_cursos)
+    clases_raw = conn.execute(f"""
+        SELECT id_clase, nombre, horas_semana, id_profesor, id_curso
+        FROM clases WHERE id_semestre = ? AND horas_semana > 0 AND id_curso IN ({marcadores})
+    """, (id_semestre, *ids_cursos)).fetchall()
+    return {c['id_clase']: dict(c) for c in clases_raw}
+
+
+def _cargar_profesores_ocupados(conn, id_semestre, profesores, excluir=()):
+    """
+    Retorna id_profesor -> lista de (dia, hora) de la grilla ya ocupados en
+    horarios guardados del semestre, solo para los `profesores` dados y sin
+    contar los cronogramas de `excluir`.
+
+    Lee el índice disponibilidad_profesores (una máscara de horas por
+    profesor y día, mantenida por triggers); solo las máscaras que tocan los
+    cronogramas excluidos se recalculan desde el detalle.
+    """
+    profesores = list(profesores)
+    if not profesores:
+        return {}
+    marcadores = ", ".join("?" for _ in profesores)
+    mascaras = {(f['id_profesor'], f['dia']): f['mascara'] for f in conn.execute(f"""
+        SELECT id_profesor, dia, mascara FROM disponibilidad_profesores
+        WHERE id_semestre = ? AND id_profesor IN ({marcadores})
+    """, (id_semestre, *profesores))}
+
+    if excluir:
+        marcadores_excluir = ", ".join("?" for _ in excluir)
+        afectadas = conn.execute(f"""
+            SELECT DISTINCT id_profesor, dia FROM ocupacion_profesores
+            WHERE id_semestre = ? AND id_profesor IN ({marcadores}) AND id_cronograma IN ({marcadores_excluir})
+        """, (id_semestre, *profesores, *excluir)).fetchall()
+        for f in afectadas:
+            mascaras[(f['id_profesor'], f['dia'])] = 0
+        for f in conn.execute(f"""
+            SELECT id_profesor, dia, SUM(DISTINCT 1 << hora) AS mascara FROM ocupacion_profesores
+            WHERE id_semestre = ? AND id_profesor IN ({marcadores}) AND id_cronograma NOT IN ({marcadores_excluir})
+              AND (id_profesor, dia) IN (SELECT DISTINCT id_profesor, dia FROM ocupacion_profesores
+                                         WHERE id_semestre = ? AND id_cronograma IN ({marcadores_excluir}))
+            GROUP BY id_profesor, dia
+        """, (id_semestre, *profesores, *excluir, id_semestre, *excluir)):
+            mascaras[(f['id_profesor'], f['dia'])] = f['mascara']
+
+    horarios_profesores_ocupados = {}
+    for (id_p, d), mascara in mascaras.items():
+        slots = [(d, h) for h in HORAS if mascara >> int(h[:2]) & 1]
+        if slots:
+            horarios_profesores_ocupados.setdefault(id_p, []).extend(slots)
+    return horarios_profesores_ocupados
+
+
+# Entradas de detalle_cronogramas que caen en horas enteras de la grilla del modelo (días DIAS, horas HORAS).
+_INICIO_GRILLA = int(HORAS[0][:2]) * 60
+_FIN_GRILLA = (int(HORAS[-1][:2]) + 1) * 60
+_EN_GRILLA = """dc.dia_num < ? AND dc.min_inicio % 60 = 0 AND dc.min_fin % 60 = 0
+    AND dc.min_inicio >= ? AND dc.min_fin <= ? AND dc.min_fin > dc.min_inicio"""
+
+
+def _slots_grilla(fila):
+    """Slots (dia, hora) que cubre una entrada de detalle_cronogramas, o None si no cae en la grilla."""
+    if (fila['dia_num'] >= len(DIAS) or fila['min_inicio'] % 60 or fila['min_fin'] % 60
+            or fila['min_inicio'] < _INICIO_GRILLA or fila['min_fin'] > _FIN_GRILLA or fila['min_fin'] <= fila['min_inicio']):
+        return None
+    return [(DIAS[fila['dia_num']], f"{h:02d}:00") for h in range(fila['min_inicio'] // 60, fila['min_fin'] // 60)]
+
+
+def _cargar_horarios_anteriores(conn, id_semestre, cronogramas, clases_a_planificar):
+    """
+    Busca, para cada curso, su cronograma guardado más reciente (distinto del
+    reservado) con entradas de clases del semestre `id_semestre`, y retorna
+    (ids de esos cronogramas, ids de los que se pueden reemplazar, asignación
+    [(id_clase, dia, hora)] de las clases que siguen en el modelo).
+
+    Solo se reemplaza (ver `_reemplazar_anteriores`) un cronograma cuyas
+    entradas son todas horas de la grilla de clases que se regeneran: así el
+    horario nuevo contiene todo lo que tenía. Los demás solo sirven de
+    solución inicial, se conservan y siguen bloqueando a sus profesores.
+    """
+    anteriores, reemplazables, asignacion = [], [], []
+    for id_curso, id_reservado in cronogramas.items():
+        fila = conn.execute("""
+            SELECT MAX(dc.id_cronograma) FROM detalle_cronogramas dc
+            JOIN cronogramas cr ON dc.id_cronograma = cr.id_cronograma
+            JOIN clases cl ON dc.id_clase = cl.id_clase
+            WHERE cr.id_curso = ? AND cr.id_cronograma != ? AND cl.id_semestre = ?
+        """, (id_curso, id_reservado, id_semestre)).fetchone()
+        if fila[0] is None:
+            continue
+        anteriores.append(fila[0])
+        completo = True
+        for entrada in conn.execute("SELECT id_clase, dia_num, min_inicio, min_fin FROM detalle_cronogramas WHERE id_cronograma = ?",
+                                    (fila[0],)).fetchall():
+            slots = _slots_grilla(entrada)
+            if slots is None or entrada['id_clase'] not in clases_a_planificar:
+                completo = False
+                continue
+            asignacion.extend((entrada['id_clase'], d, h) for d, h in slots)
+        if completo:
+            reemplazables.append(fila[0])
+    return anteriores, reemplazables, asignacion
+
+
+def _reemplazar_anteriores(conn, reemplazables, clases_a_planificar):
+    """
+    Elimina los cronogramas anteriores que reemplaza la generación (sin hacer
+    commit, en la misma transacción que inserta el horario nuevo). Si alguno ya
+    no existe o recibió entradas que el horario nuevo no incluye, cambió
+    durante la generación y se aborta.
+    """
+    marcadores = ", ".join("?" for _ in reemplazables)
+    marcadores_clases = ", ".join("?" for _ in clases_a_planificar)
+    conn.execute(f"""
+        DELETE FROM detalle_cronogramas AS dc WHERE dc.id_cronograma IN ({marcadores})
+          AND dc.id_clase IN ({marcadores_clases}) AND {_EN_GRILLA}
+    """, (*reemplazables, *clases_a_planificar, len(DIAS), _INICIO_GRILLA, _FIN_GRILLA))
+    restantes = conn.execute(f"SELECT COUNT(*) FROM detalle_cronogramas WHERE id_cronograma IN ({marcadores})",
+                             reemplazables).fetchone()[0]
+    eliminados = conn.execute(f"DELETE FROM cronogramas WHERE id_cronograma IN ({marcadores})", reemplazables).rowcount \
+        if not restantes else 0
+    if eliminados != len(reemplazables):
+        raise ErrorGeneracion("El horario anterior del curso cambió o fue eliminado durante la generación.")
+
+
+def _guardar_asignacion(conn, clases_a_planificar, asignacion, cronogramas):
+    """Inserta las horas asignadas en el cronograma del curso de cada clase (sin hacer commit)."""
+    filas = []
+    for id_clase, d, h in asignacion:
+        id_curso = clases_a_planificar[id_clase]['id_curso']
+        min_inicio = a_minutos(h)
+        filas.append((cronogramas[id_curso], DIAS_SEMANA.index(d), min_inicio, min_inicio + 60, id_clase, id_curso))
+    conn.executemany("""
+        INSERT INTO detalle_cronogramas (id_cronograma, dia_num, min_inicio, min_fin, id_clase, id_curso)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, filas)
+
+
+def generar_horarios(trabajo, id_semestre, cronogramas, motor=MOTOR_POR_DEFECTO, arranque='ninguno'):
+    """
+    Cuerpo del trabajo de generación automática.
+
+    `cronogramas` es un dict id_curso -> id_cronograma ya reservado por la vista.
+    Con un solo curso equivale a la generación clásica; con varios (modo semestre)
+    las clases comparten las restricciones de profesores, el modelo se divide en
+    componentes sin profesores en común que se resuelven en paralelo, y todos
+    los horarios se guardan en una sola transacción. `motor` es una clave de
+    MOTORES ('milp' o 'heuristico').
+
+    `arranque` (ver ARRANQUES) elige la solución inicial: con 'heuristico' CBC
+    parte de un horario heurístico; con 'anterior' parte del horario guardado
+    más reciente de cada curso en el semestre. Si ese horario solo tiene horas
+    de la grilla de clases que se regeneran, no bloquea a sus profesores y se
+    elimina en la misma transacción en que se guarda el horario nuevo, de modo
+    que sus clases nunca quedan asignadas dos veces; si no, se conserva y solo
+    es la solución inicial. Si la generación no termina con éxito (error,
+    infactible o cancelada) los cronogramas reservados se eliminan y los
+    anteriores se conservan.
+    """
+    conn = get_db_connection()
+    ejecucion = {
+        'id_semestre': id_semestre,
+        'cursos': sorted(cronogramas),
+        'motor': motor,
+        'formulacion': modelo.FORMULACION_POR_DEFECTO if motor == 'milp' else None,
+        'arranque': arranque,
+        'tiempo_limite': TIEMPO_LIMITE_SOLVER if motor == 'milp' else None,
+        'constantes': constantes_penalizacion(),
+        'n_cursos': len(cronogramas),
+    }
+    t0 = time.perf_counter()
+    try:
+        trabajo.comprobar_cancelacion()
+
+        # --- Obtener datos para el modelo ---
+        clases_a_planificar = _cargar_clases(conn, id_semestre, list(cronogramas.keys()))
+        if not clases_a_planificar:
+            ejecucion['estado'] = 'Sin clases'
+            return "No se encontraron clases con horas asignadas para este curso y semestre."
+
+        anteriores, reemplazables, inicial = [], [], None
+        if arranque == 'anterior':
+            anteriores, reemplazables, inicial = _cargar_horarios_anteriores(conn, id_semestre, cronogramas, clases_a_planificar)
+        profesores = {c['id_profesor'] for c in clases_a_planificar.values()}
+        horarios_profesores_ocupados = _cargar_profesores_ocupados(conn, id_semestre, profesores, excluir=reemplazables)
+        usar_arranque = arranque != 'ninguno'
+        ejecucion.update({
+            'n_clases': len(clases_a_planificar),
+            'n_horas': sum(c['horas_semana'] for c in clases_a_planificar.values()),
+            'n_profesores': len(profesores),
+            'n_bloqueos': sum(len(set(slots)) for slots in horarios_profesores_ocupados.values()),
+            't_carga': time.perf_counter() - t0,
+        })
+
+        # --- Resolver el problema (cada componente independiente en su propio proceso) ---
+        # Las componentes con las mismas entradas cuyo óptimo ya se demostró se toman de la caché;
+        # un incumbente cortado por el límite de tiempo o un resultado heurístico nunca se guarda,
+        # para que una nueva generación pueda mejorarlo.
+        componentes = dividir_en_componentes(clases_a_planificar)
+        huellas = [huella_modelo(clases, horarios_profesores_ocupados, motor) for clases in componentes]
+        if motor == 'milp':
+            resultados = [cache_soluciones.buscar(conn, huella) for huella in huellas]
+        else:
+            resultados = [None] * len(componentes)
+        pendientes = [i for i, r in enumerate(resultados) if r is None]
+        if len(pendientes) == 1:
+            resultados[pendientes[0]] = resolver_componente(componentes[pendientes[0]], horarios_profesores_ocupados, trabajo,
+                                                            motor, usar_arranque, inicial)
+        elif pendientes:
+            resueltos = resolver_en_paralelo([componentes[i] for i in pendientes], horarios_profesores_ocupados, trabajo,
+                                             motor, usar_arranque, inicial)
+            for i, resultado in zip(pendientes, resueltos):
+                resultados[i] = resultado
+        for i in pendientes:
+            if resultados[i].get('probado'):
+                cache_soluciones.guardar(conn, huellas[i], resultados[i])
+        ejecucion.update(_estadisticas_ejecucion(len(componentes), [resultados[i] for i in pendientes]))
+
+        # --- Procesar el resultado ---
+        for resultado in resultados:
+            if resultado['estado'] not in ESTADOS_CON_SOLUCION:
+                ejecucion['estado'] = resultado['estado']
+                raise ErrorGeneracion(f"No se pudo generar un horario que cumpliera todas las restricciones. Estado: {resultado['estado']}")
+
+        objetivo = sum(r['objetivo'] for r in resultados)
+        trabajo.actualizar_objetivo(objetivo)
+        asignacion = [fila for r in resultados for fila in r['asignacion']]
+        if reemplazables:
+            _reemplazar_anteriores(conn, reemplazables, clases_a_planificar)
+        _guardar_asignacion(conn, clases_a_planificar, asignacion, cronogramas)
+        conn.commit()
+        ejecucion.update({
+            'estado': resultados[0]['estado'],
+            'exito': 1,
+            'objetivo': objetivo,
+            'desglose': heuristica.desglose_costo(clases_a_planificar, asignacion, DIAS, HORAS, ejecucion['constantes']),
+        })
+        nota = ""
+        if len(reemplazables) < len(anteriores):
+            nota += (f" ({len(anteriores) - len(reemplazables)} horario(s) anterior(es) con entradas que no se regeneran"
+                     " se conservaron y solo sirvieron de punto de partida)")
+        if motor == 'milp' and not all(r.get('probado') for r in resultados):
+            nota += f" (CBC se detuvo a los {TIEMPO_LIMITE_SOLVER} s sin demostrar el óptimo)"
+        if len(cronogramas) == 1:
+            return f"Horario generado con éxito. Costo de penalización: {objetivo:.2f}{nota}"
+        return f"{len(cronogramas)} horarios del semestre generados con éxito. Costo de penalización total: {objetivo:.2f}{nota}"
+    except BaseException as e:
+        conn.rollback()
+        for id_cronograma in cronogramas.values():
+            _liberar_cronograma(conn, id_cronograma)
+        ejecucion.setdefault('estado', 'Cancelado' if isinstance(e, TrabajoCancelado) else 'Error')
+        ejecucion['mensaje'] = str(e) or type(e).__name__
+        raise
+    finally:
+        ejecucion['t_total'] = time.perf_counter() - t0
+        telemetria.registrar(conn, ejecucion)
+        conn.close()
@@ -1,5 +1,13 @@
-from flask import Blueprint, render_template, request, redirect, url_for, abort, flash
+from flask import Blueprint, render_template, request, redirect, url_for, abort, flash, jsonify
 from database import get_db_connection
+import catalogos
+import importacion
+import reparacion
+from trabajos import gestor_trabajos
+import sqlite3
+
+# Errores de fila mostrados como mensajes tras una importación desde el formulario.
+MAX_ERRORES_MOSTRADOS = 10
 
 gestion_bp = Blueprint('gestion_bp', __name__, template_folder='templates')
 
@@ -9,9 +17,7 @@ gestion_bp = Blueprint('gestion_bp', __name__, template_folder='templates')
 def gestion():
     """Renderiza la página de gestión principal con todos los datos necesarios."""
     conn = get_db_connection()
-    semestres = conn.execute("SELECT id_semestre, nombre, fecha_inicio, fecha_fin FROM semestres ORDER BY nombre DESC").fetchall()
-    cursos = conn.execute("SELECT id_curso, nombre FROM cursos ORDER BY nombre ASC").fetchall()
-    profesores = conn.execute("SELECT id_profesor, nombre FROM profesores ORDER BY nombre ASC").fetchall()
+    semestres, cursos, profesores = catalogos.obtener(conn, 'semestres', 'cursos', 'profesores')
     clases = conn.execute("""
         SELECT 
             cl.id_clase, cl.nombre as clase_nombre, cl.descripcion, cl.n_horas, cl.horas_semana,
@@ -125,8 +131,11 @@ def update_semestre(id_semestre):
 @gestion_bp.route('/gestion/delete/<int:id_semestre>', methods=['POST'])
 def delete_semestre(id_semestre):
     conn = get_db_connection()
-    conn.execute("DELETE FROM semestres WHERE id_semestre = ?", (id_semestre,))
-    conn.commit()
+    try:
+        conn.execute("DELETE FROM semestres WHERE id_semestre = ?", (id_semestre,))
+        conn.commit()
+    except sqlite3.IntegrityError:
+        flash('Error: No se puede eliminar un semestre que todavía tiene clases asignadas.', 'error')
     conn.close()
     return redirect(url_for('gestion_bp.gestion'))
 
@@ -134,6 +143,8 @@ def delete_semestre(id_semestre):
 @gestion_bp.route('/gestion/delete_clase/<int:id_clase>', methods=['POST'])
 def delete_clase(id_clase):
     conn = get_db_connection()
+    # Sus horas en horarios guardados se eliminan con ella (las claves foráneas están activas)
+    conn.execute("DELETE FROM detalle_cronogramas WHERE id_clase = ?", (id_clase,))
     conn.execute("DELETE FROM clases WHERE id_clase = ?", (id_clase,))
     conn.commit()
     conn.close()
@@ -149,9 +160,7 @@ def edit_clase_form(id_clase):
     clase = conn.execute("SELECT * FROM clases WHERE id_clase = ?", (id_clase,)).fetchone()
     if clase is None:
         abort(404)
-    cursos = conn.execute("SELECT id_curso, nombre FROM cursos ORDER BY nombre ASC").fetchall()
-    profesores = conn.execute("SELECT id_profesor, nombre FROM profesores ORDER BY nombre ASC").fetchall()
-    semestres = conn.execute("SELECT id_semestre, nombre FROM semestres ORDER BY nombre DESC").fetchall()
+    cursos, profesores, semestres = catalogos.obtener(conn, 'cursos', 'profesores', 'semestres')
     conn.close()
     return render_template('edit_clase.html', clase=clase, cursos=cursos, profesores=profesores, semestres=semestres)
 
@@ -174,9 +183,7 @@ def update_clase(id_clase):
         if existe:
             flash('Error: Ya existe otra clase con la misma combinación de Curso, Profesor y Semestre.', 'error')
             # Recargamos los datos para volver a mostrar el formulario de edición sin perder los cambios del usuario
-            cursos = conn.execute("SELECT id_curso, nombre FROM cursos ORDER BY nombre ASC").fetchall()
-            profesores = conn.execute("SELECT id_profesor, nombre FROM profesores ORDER BY nombre ASC").fetchall()
-            semestres = conn.execute("SELECT id_semestre, nombre FROM semestres ORDER BY nombre DESC").fetchall()
+            cursos, profesores, semestres = catalogos.obtener(conn, 'cursos', 'profesores', 'semestres')
             conn.close()
             # Creamos un objeto 'clase' con los datos del formulario para que el usuario no los pierda
             clase_con_error = {
@@ -192,7 +199,16 @@ def update_clase(id_clase):
         descripcion = request.form.get('descripcion')
         n_horas = request.form.get('n_horas')
         horas_semana = request.form.get('horas_semana')
-        
+
+        # Si cambian las horas, el profesor, el curso o el semestre, los horarios con la clase se reparan
+        anterior = conn.execute(
+            "SELECT horas_semana, id_curso, id_profesor, id_semestre FROM clases WHERE id_clase = ?", (id_clase,)
+        ).fetchone()
+        cambio = anterior is not None and any(
+            str(anterior[campo] if anterior[campo] is not None else '') != (valor or '')
+            for campo, valor in (('horas_semana', horas_semana), ('id_curso', id_curso),
+                                 ('id_profesor', id_profesor), ('id_semestre', id_semestre)))
+
         conn.execute("""
             UPDATE clases SET
                 nombre = ?, descripcion = ?, n_horas = ?, horas_semana = ?,
@@ -200,6 +216,58 @@ def update_clase(id_clase):
             WHERE id_clase = ?
         """, (nombre, descripcion, n_horas, horas_semana, id_curso, id_profesor, id_semestre, id_clase))
         conn.commit()
+        afectados = reparacion.cronogramas_de_clase(conn, id_clase) if cambio else []
         conn.close()
         flash('Clase actualizada correctamente.', 'success')
+        if afectados:
+            # Un solo trabajo que los repara en serie: horarios con profesores en común no leen ocupaciones viejas.
+            ids = [c['id_cronograma'] for c in afectados]
+            gestor_trabajos.enviar(f"Reparación de {len(ids)} horario(s)", reparacion.reparar_horarios, ids,
+                                   ids_cronogramas=ids)
+            flash(f"Se encoló la reparación de {len(afectados)} horario(s) con esta clase: "
+                  + ", ".join(c['nombre'] for c in afectados), 'warning')
+    return redirect(url_for('gestion_bp.gestion'))
+
+@gestion_bp.route('/gestion/importar', methods=['POST'])
+def importar_datos():
+    """Importa profesores, cursos o clases desde un archivo CSV o JSON (ver importacion.py)."""
+    como_json = request.accept_mimetypes.best == 'application/json'
+    entidad = request.form.get('entidad')
+    archivo = request.files.get('archivo')
+    formato = request.form.get('formato') or importacion.formato_de(archivo.filename if archivo else None)
+
+    error = None
+    if entidad not in importacion.ENTIDADES:
+        error = "Error: Debe elegir qué importar (profesores, cursos o clases)."
+    elif archivo is None or not archivo.filename:
+        error = "Error: Debe seleccionar un archivo."
+    elif formato not in importacion.FORMATOS:
+        error = "Error: El archivo debe ser .csv, .json o .jsonl."
+
+    if error is None:
+        conn = get_db_connection()
+        try:
+            informe = importacion.importar_archivo(conn, entidad, archivo.stream, formato,
+                                                   simular=bool(request.form.get('simular')))
+        except ValueError as e:
+            error = f"Error: {e}"
+        finally:
+            conn.close()
+
+    if error:
+        if como_json:
+            return jsonify({'error': error}), 400
+        flash(error, 'error')
+        return redirect(url_for('gestion_bp.gestion'))
+    if como_json:
+        return jsonify(informe)
+
+    errores = informe['errores']
+    verbo = 'se validaron' if request.form.get('simular') else 'se importaron'
+    flash(f"De {informe['leidas']} filas {verbo} {informe['insertadas']} ({entidad}); {len(errores)} con errores.",
+          'error' if errores else 'success')
+    for e in errores[:MAX_ERRORES_MOSTRADOS]:
+        flash(f"Fila {e['fila']}: {e['error']}", 'error')
+    if len(errores) > MAX_ERRORES_MOSTRADOS:
+        flash(f"... y {len(errores) - MAX_ERRORES_MOSTRADOS} errores más.", 'error')
     return redirect(url_for('gestion_bp.gestion'))
@@ -0,0 +1,285 @@
+"""
+Motor heurístico de generación de horarios (construcción voraz + recocido simulado).
+
+Minimiza los mismos términos que el modelo MILP de `generador.py` (exceso
+diario, inicios de bloque, huecos, fragmentación y bloques largos) sin probar
+optimalidad, a cambio de responder en menos de un segundo. La ocupación de
+cada curso, profesor y clase se representa por día como una máscara de bits
+de las horas de la grilla, de modo que factibilidad y costo se calculan con
+operaciones de bits y tablas precalculadas.
+"""
+import math
+import random
+
+# Iteraciones del recocido por clase del modelo (acotadas por MAX_ITERACIONES).
+ITERACIONES_POR_CLASE = 3000
+MAX_ITERACIONES = 150000
+TEMPERATURA_INICIAL = 10.0
+TEMPERATURA_FINAL = 0.05
+# Intentos de construcción voraz (con distinto orden) antes de rendirse.
+INTENTOS_CONSTRUCCION = 20
+SEMILLA = 0
+
+
+def _terminos(m, n_horas, limite_horas_diarias):
+    """Horas sobre el límite, inicios de bloque, huecos y horas en bloques de 3+ de una máscara diaria."""
+    interior = ((1 << n_horas) - 1) & ~1 & ~(1 << (n_horas - 1))
+    inicios = (m & ~(m << 1)).bit_count()
+    huecos = ((m << 1) & (m >> 1) & ~m & interior).bit_count()
+    exceso = max(0, m.bit_count() - limite_horas_diarias)
+    largos = (m & (m >> 1) & (m >> 2)).bit_count()
+    return exceso, inicios, huecos, largos
+
+
+def _tablas_costo(n_horas, limite_horas_diarias, pen_exceso, pen_inicio_bloque, pen_hueco,
+                  pen_fragmentacion, pen_bloque_largo):
+    """Costo de cada máscara diaria posible para un curso y para una clase."""
+    costo_curso = []
+    costo_clase = []
+    for m in range(1 << n_horas):
+        exceso, inicios, huecos, largos = _terminos(m, n_horas, limite_horas_diarias)
+        costo_curso.append(exceso * pen_exceso + inicios * pen_inicio_bloque + huecos * pen_hueco)
+        costo_clase.append(inicios * pen_fragmentacion + largos * pen_bloque_largo)
+    return costo_curso, costo_clase
+
+
+def desglose_costo(clases_a_planificar, asignacion, dias, horas, constantes):
+    """
+    Costo de una asignación [(id_clase, dia, hora)] separado por término del
+    objetivo: {'exceso_horas', 'inicio_bloque', 'hueco', 'fragmentacion',
+    'bloque_largo'} -> {'cantidad', 'costo'}. Los tres primeros se cuentan por
+    curso y día y los dos últimos por clase y día, como en el modelo.
+    """
+    n_horas = len(horas)
+    indice_dia = {d: i for i, d in enumerate(dias)}
+    indice_hora = {h: i for i, h in enumerate(horas)}
+    por_curso, por_clase = {}, {}
+    for id_c, d, h in asignacion:
+        if id_c not in clases_a_planificar or d not in indice_dia or h not in indice_hora:
+            continue
+        bit = 1 << indice_hora[h]
+        clave_curso = (clases_a_planificar[id_c]['id_curso'], indice_dia[d])
+        por_curso[clave_curso] = por_curso.get(clave_curso, 0) | bit
+        por_clase[(id_c, indice_dia[d])] = por_clase.get((id_c, indice_dia[d]), 0) | bit
+
+    cantidades = dict.fromkeys(('exceso_horas', 'inicio_bloque', 'hueco', 'fragmentacion', 'bloque_largo'), 0)
+    for m in por_curso.values():
+        exceso, inicios, huecos, _ = _terminos(m, n_horas, constantes['limite_horas_diarias'])
+        cantidades['exceso_horas'] += exceso
+        cantidades['inicio_bloque'] += inicios
+        cantidades['hueco'] += huecos
+    for m in por_clase.values():
+        _, inicios, _, largos = _terminos(m, n_horas, constantes['limite_horas_diarias'])
+        cantidades['fragmentacion'] += inicios
+        cantidades['bloque_largo'] += largos
+
+    pesos = {'exceso_horas': constantes['pen_exceso'], 'inicio_bloque': constantes['pen_inicio_bloque'],
+             'hueco': constantes['pen_hueco'], 'fragmentacion': constantes['pen_fragmentacion'],
+             'bloque_largo': constantes['pen_bloque_largo']}
+    return {termino: {'cantidad': n, 'costo': n * pesos[termino]} for termino, n in cantidades.items()}
+
+
+class _Estado:
+    """Asignación actual: máscaras por clase, curso y profesor para cada día."""
+
+    def __init__(self, clases, n_dias, bloqueos):
+        self.clases = clases
+        self.clase = {id_c: [0] * n_dias for id_c in clases}
+        self.curso = {c['id_curso']: [0] * n_dias for c in clases.values()}
+        self.profesor = {c['id_profesor']: list(bloqueos.get(c['id_profesor'], [0] * n_dias)) for c in clases.values()}
+
+    def poner(self, id_c, d, bit):
+        c = self.clases[id_c]
+        self.clase[id_c][d] |= bit
+        self.curso[c['id_curso']][d] |= bit
+        self.profesor[c['id_profesor']][d] |= bit
+
+    def quitar(self, id_c, d, bit):
+        c = self.clases[id_c]
+        self.clase[id_c][d] &= ~bit
+        self.curso[c['id_curso']][d] &= ~bit
+        self.profesor[c['id_profesor']][d] &= ~bit
+
+    def copia_clases(self):
+        return {id_c: list(mascaras) for id_c, mascaras in self.clase.items()}
+
+
+def resolver_heuristico(clases_a_planificar, horarios_profesores_ocupados, dias, horas, constantes, trabajo=None,
+                        inicial=None):
+    """
+    Genera un horario para `clases_a_planificar` con la heurística.
+
+    Recibe la grilla (`dias`, `horas`) y las `constantes` de penalización de
+    `generador.py` (dict con limite_horas_diarias, pen_exceso, pen_inicio_bloque,
+    pen_hueco, pen_fragmentacion, pen_bloque_largo). Si se da `inicial`, una
+    asignación previa [(id_clase, dia, hora)], se conservan sus horas que sigan
+    siendo factibles y solo se completan o recortan las demás. Retorna el mismo dict que
+    `generador.resolver_componente`; el estado es 'Heuristica' si encontró un
+    horario factible y 'Not Solved' si la construcción voraz falló.
+    """
+    n_dias, n_horas = len(dias), len(horas)
+    completo = (1 << n_horas) - 1
+    costo_curso, costo_clase = _tablas_costo(n_horas, **constantes)
+    indice_dia = {d: i for i, d in enumerate(dias)}
+    indice_hora = {h: i for i, h in enumerate(horas)}
+
+    bloqueos = {}
+    for id_p, slots in horarios_profesores_ocupados.items():
+        mascaras = [0] * n_dias
+        for d, h in slots:
+            if d in indice_dia and h in indice_hora:
+                mascaras[indice_dia[d]] |= 1 << indice_hora[h]
+        bloqueos[id_p] = mascaras
+
+    previas = []
+    for id_c, d, h in inicial or ():
+        if id_c in clases_a_planificar and d in indice_dia and h in indice_hora:
+            previas.append((id_c, indice_dia[d], 1 << indice_hora[h]))
+
+    rng = random.Random(SEMILLA)
+    estado = _construir(clases_a_planificar, bloqueos, n_dias, n_horas, completo, costo_curso, costo_clase, rng, previas)
+    if estado is None:
+        return {'estado': 'Not Solved', 'objetivo': None, 'asignacion': []}
+
+    def costo_total():
+        return (sum(costo_curso[m] for mascaras in estado.curso.values() for m in mascaras)
+                + sum(costo_clase[m] for mascaras in estado.clase.values() for m in mascaras))
+
+    costo = costo_total()
+    mejor_costo, mejor = costo, estado.copia_clases()
+    if trabajo is not None:
+        trabajo.actualizar_objetivo(mejor_costo)
+
+    # --- Recocido simulado: mover una hora de una clase o intercambiar horas de dos clases del mismo curso ---
+    ids = [id_c for id_c, c in clases_a_planificar.items() if c['horas_semana'] > 0]
+    por_curso = {}
+    for id_c in ids:
+        por_curso.setdefault(clases_a_planificar[id_c]['id_curso'], []).append(id_c)
+    iteraciones = min(MAX_ITERACIONES, ITERACIONES_POR_CLASE * len(ids))
+    enfriamiento = (TEMPERATURA_FINAL / TEMPERATURA_INICIAL) ** (1 / max(iteraciones, 1))
+    temperatura = TEMPERATURA_INICIAL
+
+    for it in range(iteraciones):
+        temperatura *= enfriamiento
+        if trabajo is not None and it % 5000 == 0:
+            trabajo.comprobar_cancelacion()
+        id_a = rng.choice(ids)
+        ca = clases_a_planificar[id_a]
+        d1 = rng.choice([d for d in range(n_dias) if estado.clase[id_a][d]])
+        b1 = _bit_aleatorio(estado.clase[id_a][d1], rng)
+        d2 = rng.randrange(n_dias)
+        companeros = por_curso[ca['id_curso']]
+
+        if len(companeros) > 1 and rng.random() < 0.5:
+            # Intercambio con otra clase del mismo curso que ocupe (d2, b2).
+            id_b = rng.choice(companeros)
+            if id_b == id_a or not estado.clase[id_b][d2]:
+                continue
+            b2 = _bit_aleatorio(estado.clase[id_b][d2], rng)
+            cb = clases_a_planificar[id_b]
+            antes = (costo_clase[estado.clase[id_a][d1]] + costo_clase[estado.clase[id_b][d2]]
+                     + (costo_clase[estado.clase[id_a][d2]] + costo_clase[estado.clase[id_b][d1]] if d1 != d2 else 0))
+            estado.quitar(id_a, d1, b1)
+            estado.quitar(id_b, d2, b2)
+            if (estado.clase[id_a][d2] & b2 or estado.clase[id_b][d1] & b1
+                    or estado.profesor[ca['id_profesor']][d2] & b2 or estado.profesor[cb['id_profesor']][d1] & b1):
+                estado.poner(id_a, d1, b1)
+                estado.poner(id_b, d2, b2)
+                continue
+            estado.poner(id_a, d2, b2)
+            estado.poner(id_b, d1, b1)
+            despues = (costo_clase[estado.clase[id_a][d1]] + costo_clase[estado.clase[id_b][d2]]
+                       + (costo_clase[estado.clase[id_a][d2]] + costo_clase[estado.clase[id_b][d1]] if d1 != d2 else 0))
+            delta = despues - antes
+            if delta > 0 and rng.random() >= math.exp(-delta / temperatura):
+                estado.quitar(id_a, d2, b2)
+                estado.quitar(id_b, d1, b1)
+                estado.poner(id_a, d1, b1)
+                estado.poner(id_b, d2, b2)
+                continue
+        else:
+            # Mover una hora de la clase a un slot libre para su curso y su profesor.
+            libres = completo & ~(estado.curso[ca['id_curso']][d2] | estado.profesor[ca['id_profesor']][d2])
+            if not libres:
+                continue
+            b2 = _bit_aleatorio(libres, rng)
+            id_curso = ca['id_curso']
+            dias_afectados = (d1,) if d1 == d2 else (d1, d2)
+            antes = sum(costo_curso[estado.curso[id_curso][d]] + costo_clase[estado.clase[id_a][d]] for d in dias_afectados)
+            estado.quitar(id_a, d1, b1)
+            estado.poner(id_a, d2, b2)
+            despues = sum(costo_curso[estado.curso[id_curso][d]] + costo_clase[estado.clase[id_a][d]] for d in dias_afectados)
+            delta = despues - antes
+            if delta > 0 and rng.random() >= math.exp(-delta / temperatura):
+                estado.quitar(id_a, d2, b2)
+                estado.poner(id_a, d1, b1)
+                continue
+
+        costo += delta
+        if costo < mejor_costo:
+            mejor_costo, mejor = costo, estado.copia_clases()
+            if trabajo is not None:
+                trabajo.actualizar_objetivo(mejor_costo)
+
+    asignacion = [(id_c, dias[d], horas[h])
+                  for id_c, mascaras in mejor.items()
+                  for d, m in enumerate(mascaras)
+                  for h in range(n_horas) if m >> h & 1]
+    return {'estado': 'Heuristica', 'objetivo': float(mejor_costo), 'asignacion': asignacion}
+
+
+def _bit_aleatorio(mascara, rng):
+    """Uno de los bits encendidos de `mascara`, elegido al azar."""
+    bits = [1 << h for h in range(mascara.bit_length()) if mascara >> h & 1]
+    return rng.choice(bits)
+
+
+def _construir(clases, bloqueos, n_dias, n_horas, completo, costo_curso, costo_clase, rng, previas=()):
+    """
+    Construcción voraz: fija primero las horas `previas` que sigan siendo
+    factibles y luego asigna las restantes una a una en el slot factible de
+    menor costo incremental, empezando por las clases más difíciles. Si se
+    queda sin slots, reintenta con otro orden.
+    """
+    carga_profesor = {}
+    for c in clases.values():
+        carga_profesor[c['id_profesor']] = carga_profesor.get(c['id_profesor'], 0) + c['horas_semana']
+
+    for intento in range(INTENTOS_CONSTRUCCION):
+        estado = _Estado(clases, n_dias, bloqueos)
+        colocadas = {id_c: 0 for id_c in clases}
+        for id_c, d, bit in previas:
+            c = clases[id_c]
+            if colocadas[id_c] < c['horas_semana'] and not (estado.curso[c['id_curso']][d] | estado.profesor[c['id_profesor']][d]) & bit:
+                estado.poner(id_c, d, bit)
+                colocadas[id_c] += 1
+        orden = sorted(clases, key=lambda id_c: (-carga_profesor[clases[id_c]['id_profesor']],
+                                                 -clases[id_c]['horas_semana'],
+                                                 rng.random() if intento else 0))
+        factible = True
+        for id_c in orden:
+            c = clases[id_c]
+            for _ in range(c['horas_semana'] - colocadas[id_c]):
+                mejor = None
+                for d in range(n_dias):
+                    m_curso = estado.curso[c['id_curso']][d]
+                    m_clase = estado.clase[id_c][d]
+                    libres = completo & ~(m_curso | estado.profesor[c['id_profesor']][d])
+                    for h in range(n_horas):
+                        bit = 1 << h
+                        if not libres & bit:
+                            continue
+                        delta = (costo_curso[m_curso | bit] - costo_curso[m_curso]
+                                 + costo_clase[m_clase | bit] - costo_clase[m_clase])
+                        clave = (delta, rng.random())
+                        if mejor is None or clave < mejor[0]:
+                            mejor = (clave, d, bit)
+                if mejor is None:
+                    factible = False
+                    break
+                estado.poner(id_c, mejor[1], mejor[2])
+            if not factible:
+                break
+        if factible:
+            return estado
+    return None
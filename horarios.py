@@ -1,8 +1,21 @@
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from database import get_db_connection
+from datetime import datetime, timezone
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort, make_response, Response
+from database import DIAS_SEMANA, a_minutos, get_db_connection, version_tabla
+from werkzeug.http import is_resource_modified
+import cache_grillas
+import catalogos
+import conflictos
+import exportacion
+import telemetria
+import cache_soluciones
+import reparacion
+from generador import generar_horarios, MOTORES, MOTOR_POR_DEFECTO, ARRANQUES
+from trabajos import gestor_trabajos
 import sqlite3
-import pulp
+
+# Horarios mostrados por página en la lista.
+HORARIOS_POR_PAGINA = 20
 
 horarios_bp = Blueprint('horarios_bp', __name__,
                         template_folder='templates',
@@ -17,7 +30,7 @@ def _organize_schedule_for_display(details):
     if not details:
         return {}, [], days_of_week
 
-    hours = sorted(list(set(d['h_inicio'] for d in details)))
+    hours = [h for _, h in sorted(set((d['min_inicio'], d['h_inicio']) for d in details))]
 
     schedule_grid = {hour: {day: None for day in days_of_week} for hour in hours}
 
@@ -29,50 +42,116 @@ def _organize_schedule_for_display(details):
 
     return schedule_grid, hours, days_of_week
 
+def _agrupar_por_cronograma(cronogramas, detalles):
+    """
+    Recorre una sola vez las filas de `detalles` (ordenadas en el mismo orden
+    que `cronogramas`) y produce, uno a uno, los horarios listos para la plantilla.
+    """
+    detalles = iter(detalles)
+    pendiente = next(detalles, None)
+    for cronograma in cronogramas:
+        id_c = cronograma['id_cronograma']
+        detalles_list = []
+        while pendiente is not None and pendiente['id_cronograma'] == id_c:
+            detalles_list.append(dict(pendiente))
+            pendiente = next(detalles, None)
+
+        schedule_grid, sorted_hours, days_of_week = _organize_schedule_for_display(detalles_list)
+        yield {
+            'id_cronograma': id_c,
+            'nombre': cronograma['nombre'],
+            'curso_nombre': cronograma['curso_nombre'],
+            'semestre_nombre': detalles_list[0]['semestre_nombre'] if detalles_list else None,
+            'grid': schedule_grid,
+            'sorted_hours': sorted_hours,
+            'days_of_week': days_of_week
+        }
+
+def _con_validadores(respuesta, etag, modificado):
+    """Añade ETag (débil) y Last-Modified, y obliga al navegador a revalidar antes de reutilizar."""
+    respuesta.set_etag(etag, weak=True)
+    if modificado:
+        respuesta.last_modified = modificado
+    respuesta.cache_control.no_cache = True
+    return respuesta
+
 @horarios_bp.route('/')
 def lista_horarios():
+    """
+    Lista los horarios guardados, HORARIOS_POR_PAGINA por página y opcionalmente
+    filtrados por semestre y curso (parámetros pagina, id_semestre, id_curso).
+    Los detalles de toda la página se traen en una sola consulta ordenada, y
+    solo para los cronogramas que no estén en `cache_grillas`. La respuesta
+    lleva ETag y Last-Modified de la versión global 'horarios'.
+    """
+    pagina = max(request.args.get('pagina', 1, type=int), 1)
+    id_semestre = request.args.get('id_semestre', type=int)
+    id_curso = request.args.get('id_curso', type=int)
+
+    condiciones, parametros = [], []
+    if id_curso:
+        condiciones.append("cr.id_curso = ?")
+        parametros.append(id_curso)
+    if id_semestre:
+        condiciones.append("""EXISTS (SELECT 1 FROM detalle_cronogramas dc JOIN clases cl ON dc.id_clase = cl.id_clase
+                                      WHERE dc.id_cronograma = cr.id_cronograma AND cl.id_semestre = ?)""")
+        parametros.append(id_semestre)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+
     conn = get_db_connection()
-    cronogramas = conn.execute("""
-        SELECT cr.id_cronograma, cr.nombre, cu.nombre as curso_nombre
+    # La versión global cambia con cualquier escritura que afecte a la lista: si el
+    # navegador ya tiene esta versión, se responde 304 sin consultar nada más.
+    version, modificado = version_tabla(conn, 'horarios')
+    etag = f"horarios-{version}"
+    if modificado:
+        modificado = datetime.strptime(modificado, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    if not is_resource_modified(request.environ, etag=etag, last_modified=modificado):
+        conn.close()
+        return _con_validadores(make_response('', 304), etag, modificado)
+
+    total = conn.execute(f"SELECT COUNT(*) FROM cronogramas cr {where}", parametros).fetchone()[0]
+    total_paginas = max(-(-total // HORARIOS_POR_PAGINA), 1)
+    pagina = min(pagina, total_paginas)
+    cronogramas = conn.execute(f"""
+        SELECT cr.id_cronograma, cr.nombre, cu.nombre as curso_nombre, COALESCE(vc.version, 0) as version
         FROM cronogramas cr
         LEFT JOIN cursos cu ON cr.id_curso = cu.id_curso
+        LEFT JOIN versiones_cronogramas vc ON cr.id_cronograma = vc.id_cronograma
+        {where}
         ORDER BY cr.id_cronograma DESC
-    """).fetchall()
-    
-    horarios_procesados = {}
-    for cronograma in cronogramas:
-        id_c = cronograma['id_cronograma']
-        detalles_rows = conn.execute("""
-            SELECT d.dia, d.h_inicio, d.h_fin, cl.nombre as clase_nombre, 
-                   pr.nombre as profesor_nombre, cu.nombre as curso_nombre, 
+        LIMIT ? OFFSET ?
+    """, (*parametros, HORARIOS_POR_PAGINA, (pagina - 1) * HORARIOS_POR_PAGINA)).fetchall()
+
+    # Las grillas en caché con la versión vigente se reutilizan; el resto se calcula y se guarda.
+    horarios = {c['id_cronograma']: cache_grillas.buscar(c['id_cronograma'], c['version']) for c in cronogramas}
+    faltantes = [c for c in cronogramas if horarios[c['id_cronograma']] is None]
+    if faltantes:
+        ids = [c['id_cronograma'] for c in faltantes]
+        marcadores = ", ".join("?" for _ in ids)
+        detalles_rows = conn.execute(f"""
+            SELECT d.id_cronograma, d.dia, d.h_inicio, d.h_fin, d.min_inicio, cl.nombre as clase_nombre,
+                   pr.nombre as profesor_nombre, cu.nombre as curso_nombre,
                    se.nombre as semestre_nombre
             FROM detalle_cronogramas d
             JOIN clases cl ON d.id_clase = cl.id_clase
             JOIN cursos cu ON cl.id_curso = cu.id_curso
             JOIN profesores pr ON cl.id_profesor = pr.id_profesor
             LEFT JOIN semestres se ON cl.id_semestre = se.id_semestre
-            WHERE d.id_cronograma = ?
-        """, (id_c,)).fetchall()
-        
-        detalles_list = [dict(row) for row in detalles_rows]
-        
-        semestre_nombre = None
-        if detalles_list:
-            semestre_nombre = detalles_list[0]['semestre_nombre']
-
-        schedule_grid, sorted_hours, days_of_week = _organize_schedule_for_display(detalles_list)
-        
-        horarios_procesados[id_c] = {
-            'id_cronograma': cronograma['id_cronograma'],
-            'nombre': cronograma['nombre'],
-            'curso_nombre': cronograma['curso_nombre'],
-            'semestre_nombre': semestre_nombre,
-            'grid': schedule_grid,
-            'sorted_hours': sorted_hours,
-            'days_of_week': days_of_week
-        }
+            WHERE d.id_cronograma IN ({marcadores})
+            ORDER BY d.id_cronograma DESC, d.id_detalle
+        """, ids).fetchall()
+        for cronograma, horario in zip(faltantes, _agrupar_por_cronograma(faltantes, detalles_rows)):
+            cache_grillas.guardar(cronograma['id_cronograma'], cronograma['version'], horario)
+            horarios[cronograma['id_cronograma']] = horario
+
+    semestres, cursos = catalogos.obtener(conn, 'semestres', 'cursos')
     conn.close()
-    return render_template("horarios.html", horarios_guardados=horarios_procesados)
+    respuesta = make_response(render_template("horarios.html",
+                                              horarios_guardados=[horarios[c['id_cronograma']] for c in cronogramas],
+                                              total=total, pagina=pagina, total_paginas=total_paginas,
+                                              semestres=semestres, cursos=cursos,
+                                              id_semestre=id_semestre, id_curso=id_curso))
+    return _con_validadores(respuesta, etag, modificado)
 
 
 @horarios_bp.route('/add')
@@ -84,29 +163,16 @@ def add_horario_form():
         LEFT JOIN cursos cu ON cr.id_curso = cu.id_curso
         ORDER BY cr.nombre ASC
     """).fetchall()
-    semestres_rows = conn.execute("SELECT id_semestre, nombre FROM semestres ORDER BY nombre DESC").fetchall()
-    profesores_rows = conn.execute("SELECT id_profesor, nombre FROM profesores ORDER BY nombre ASC").fetchall()
-    clases_rows = conn.execute("""
-        SELECT cl.id_clase, cl.nombre, cl.id_profesor, cu.id_curso, cu.nombre as curso_nombre, se.nombre as semestre_nombre
-        FROM clases cl
-        JOIN cursos cu ON cl.id_curso = cu.id_curso
-        LEFT JOIN semestres se ON cl.id_semestre = se.id_semestre
-        ORDER BY cu.nombre, cl.nombre
-    """).fetchall()
-    cursos_rows = conn.execute("SELECT id_curso, nombre FROM cursos ORDER BY nombre ASC").fetchall()
+    # Las clases no se incrustan: el formulario pide a /api/clases solo las del profesor elegido.
+    semestres, profesores, cursos = catalogos.obtener(conn, 'semestres', 'profesores', 'cursos')
     conn.close()
 
     cronogramas = [dict(row) for row in cronogramas_rows]
-    semestres = [dict(row) for row in semestres_rows]
-    profesores = [dict(row) for row in profesores_rows]
-    clases = [dict(row) for row in clases_rows]
-    cursos = [dict(row) for row in cursos_rows]
 
     return render_template("add_horario.html", 
                            cronogramas=cronogramas,
                            semestres=semestres,
                            profesores=profesores,
-                           clases=clases, 
                            cursos=cursos)
 
 @horarios_bp.route('/crear_cronograma', methods=['POST'])
@@ -144,7 +210,15 @@ def crear_horario():
         flash("Error: Todos los campos del formulario son obligatorios.", "error")
         return redirect(url_for('horarios_bp.add_horario_form'))
     
-    if h_inicio >= h_fin:
+    try:
+        min_inicio, min_fin = a_minutos(h_inicio), a_minutos(h_fin)
+    except ValueError:
+        flash("Error: Las horas deben tener el formato HH:MM.", "error")
+        return redirect(url_for('horarios_bp.add_horario_form'))
+    if dia not in DIAS_SEMANA:
+        flash(f"Error: Día no válido: {dia}.", "error")
+        return redirect(url_for('horarios_bp.add_horario_form'))
+    if min_inicio >= min_fin:
         flash("Error: La hora de inicio debe ser anterior a la hora de fin.", "error")
         return redirect(url_for('horarios_bp.add_horario_form'))
 
@@ -186,15 +260,26 @@ def crear_horario():
         conflicto_horario = conn.execute("""
             SELECT dc.h_inicio, dc.h_fin, cl.nombre FROM detalle_cronogramas dc
             JOIN clases cl ON dc.id_clase = cl.id_clase
-            WHERE dc.id_cronograma = ? AND dc.dia = ? AND dc.h_fin > ? AND dc.h_inicio < ?
-        """, (id_cronograma, dia, h_inicio, h_fin)).fetchone()
+            WHERE dc.id_cronograma = ? AND dc.dia_num = ? AND dc.min_inicio < ? AND dc.min_fin > ?
+        """, (id_cronograma, DIAS_SEMANA.index(dia), min_fin, min_inicio)).fetchone()
 
         if conflicto_horario:
             flash(f"Conflicto de horario: El rango de {h_inicio} a {h_fin} se solapa con la clase '{conflicto_horario['nombre']}' ({conflicto_horario['h_inicio']} - {conflicto_horario['h_fin']}) el mismo día.", "error")
             conn.close()
             return redirect(url_for('horarios_bp.add_horario_form'))
 
-        conn.execute("INSERT INTO detalle_cronogramas (id_cronograma, dia, h_inicio, h_fin, id_clase, id_curso) VALUES (?, ?, ?, ?, ?, ?)", (id_cronograma, dia, h_inicio, h_fin, id_clase, id_curso_clase))
+        # El profesor no puede estar dictando otra clase del semestre a esa hora (en cualquier horario)
+        choques = conflictos.conflictos_entrada(conn, id_clase, DIAS_SEMANA.index(dia), min_inicio, min_fin, id_cronograma)
+        if choques:
+            otra = choques[0]['entradas'][0]
+            if choques[0]['tipo'] == 'clase_repetida':
+                flash(f"Conflicto de horario: La clase '{otra['clase']}' ya está en el horario '{otra['cronograma']}' el {dia} de {otra['h_inicio']} a {otra['h_fin']}.", "error")
+            else:
+                flash(f"Conflicto de profesor: {choques[0]['profesor']} ya dicta '{otra['clase']}' en el horario '{otra['cronograma']}' el {dia} de {otra['h_inicio']} a {otra['h_fin']}.", "error")
+            conn.close()
+            return redirect(url_for('horarios_bp.add_horario_form'))
+
+        conn.execute("INSERT INTO detalle_cronogramas (id_cronograma, dia_num, min_inicio, min_fin, id_clase, id_curso) VALUES (?, ?, ?, ?, ?, ?)", (id_cronograma, DIAS_SEMANA.index(dia), min_inicio, min_fin, id_clase, id_curso_clase))
         conn.commit()
         flash("Clase agregada al horario con éxito.", "success")
 
@@ -210,188 +295,66 @@ def crear_horario():
 def crear_horario_auto_form():
     """Muestra el formulario para iniciar la creación automática de horarios."""
     conn = get_db_connection()
-    cursos = conn.execute("SELECT id_curso, nombre FROM cursos ORDER BY nombre ASC").fetchall()
-    semestres = conn.execute("SELECT id_semestre, nombre FROM semestres ORDER BY nombre DESC").fetchall()
+    cursos, semestres = catalogos.obtener(conn, 'cursos', 'semestres')
     conn.close()
     return render_template('crear_horario_auto.html', cursos=cursos, semestres=semestres)
 
 
-# --- Constantes para la Optimización ---
-LIMITE_HORAS_DIARIAS = 4
-PENALIZACION_EXCESO_HORAS = 100 
-PENALIZACION_INICIO_BLOQUE = 10
-PENALIZACION_HUECO = 1
-PENALIZACION_FRAGMENTACION = 3 
-PENALIZACION_BLOQUE_LARGO = 4 
-M = 1000 # Un valor 'M' grande para las restricciones de tipo Big M
-
 @horarios_bp.route('/ejecutar_creacion_automatica', methods=['POST'])
 def ejecutar_creacion_automatica():
-    """Ejecuta el algoritmo de generación automática de horarios usando PuLP."""
+    """
+    Reserva el cronograma y encola su generación automática como trabajo en segundo plano.
+    Responde de inmediato con el id del trabajo (JSON) o redirige a su página de estado.
+
+    Con `alcance=semestre` se reserva un cronograma por cada curso con clases en el
+    semestre ("<nombre> - <curso>") y todos se generan juntos en un único modelo.
+    `motor` elige entre el modelo exacto ('milp') y la heurística rápida ('heuristico'),
+    y `arranque` la solución inicial (ninguna, heurística o el horario anterior del curso).
+    """
     nombre_cronograma = request.form.get('nombre')
+    alcance = request.form.get('alcance', 'curso')
+    motor = request.form.get('motor', MOTOR_POR_DEFECTO)
+    arranque = request.form.get('arranque', 'ninguno')
     id_curso = request.form.get('id_curso')
     id_semestre = request.form.get('id_semestre')
 
-    if not all([nombre_cronograma, id_curso, id_semestre]):
+    if not all([nombre_cronograma, id_semestre]) or (alcance == 'curso' and not id_curso):
         flash("Nombre, curso y semestre son obligatorios.", "error")
         return redirect(url_for('horarios_bp.crear_horario_auto_form'))
 
+    if motor not in MOTORES or arranque not in ARRANQUES:
+        flash(f"Opciones de generación desconocidas: motor '{motor}', arranque '{arranque}'.", "error")
+        return redirect(url_for('horarios_bp.crear_horario_auto_form'))
+
     conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        # --- VALIDACIÓN: Verificar si el nombre ya existe antes de INSERTAR ---
-        cursor.execute("SELECT id_cronograma FROM cronogramas WHERE nombre = ?", (nombre_cronograma,))
-        if cursor.fetchone():
-            flash(f"Error: Ya existe un horario con el nombre '{nombre_cronograma}'. Por favor, elige otro.", "error")
-            conn.close()
-            return redirect(url_for('horarios_bp.crear_horario_auto_form'))
-        cursor.execute("INSERT INTO cronogramas (nombre, id_curso) VALUES (?, ?)", (nombre_cronograma, id_curso))
-        id_cronograma = cursor.lastrowid
-
-        # --- Obtener datos para el modelo ---
-        clases_raw = conn.execute("""
-            SELECT id_clase, nombre, horas_semana, id_profesor
-            FROM clases WHERE id_curso = ? AND id_semestre = ? AND horas_semana > 0
-        """, (id_curso, id_semestre)).fetchall()
-
-        if not clases_raw:
-            flash("No se encontraron clases con horas asignadas para este curso y semestre.", "warning")
-            conn.commit()
-            return redirect(url_for('horarios_bp.lista_horarios'))
-
-        clases_a_planificar = {c['id_clase']: dict(c) for c in clases_raw}
-        ids_clases = list(clases_a_planificar.keys())
-        ids_profesores = list(set(c['id_profesor'] for c in clases_a_planificar.values()))
-
-        dias = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes']
-        horas = [f"{h:02d}:00" for h in range(7, 14)]
-
-        # --- Definir el problema de optimización ---
-        prob = pulp.LpProblem("Generacion_Horarios_Optimizacion", pulp.LpMinimize)
-
-        # --- Variables de Decisión ---
-        vars_horario = pulp.LpVariable.dicts("Horario", (ids_clases, dias, horas), 0, 1, pulp.LpBinary)
-
-        # --- Variables Auxiliares para Costes (Centradas en el Día) ---
-        slot_ocupado = pulp.LpVariable.dicts("SlotOcupado", (dias, horas), 0, 1, pulp.LpBinary)
-        horas_por_dia = pulp.LpVariable.dicts("HorasPorDia", dias, 0, None, pulp.LpInteger)
-        exceso_diario = pulp.LpVariable.dicts("ExcesoDiario", dias, 0, None, pulp.LpInteger)
-        inicio_bloque = pulp.LpVariable.dicts("InicioBloque", (dias, horas), 0, 1, pulp.LpBinary)
-        hueco = pulp.LpVariable.dicts("Hueco", (dias, horas), 0, 1, pulp.LpBinary)
-        inicio_clase = pulp.LpVariable.dicts("InicioClase", (ids_clases, dias, horas), 0, 1, pulp.LpBinary)
-        bloque_largo = pulp.LpVariable.dicts("BloqueLargo", (ids_clases, dias, horas), 0, 1, pulp.LpBinary) 
-        # --- Función Objetivo (Minimizar Penalizaciones del Horario del Estudiante) ---
-        prob += (
-            pulp.lpSum(exceso_diario[d] for d in dias) * PENALIZACION_EXCESO_HORAS
-            + pulp.lpSum(inicio_bloque[d][h] for d in dias for h in horas) * PENALIZACION_INICIO_BLOQUE
-            + pulp.lpSum(hueco[d][h] for d in dias for h in horas[1:-1]) * PENALIZACION_HUECO
-            + pulp.lpSum(inicio_clase[id_c][d][h] for id_c in ids_clases for d in dias for h in horas) * PENALIZACION_FRAGMENTACION
-            + pulp.lpSum(bloque_largo[id_c][d][h] for id_c in ids_clases for d in dias for h in horas[:-2]) * PENALIZACION_BLOQUE_LARGO
-        ), "Costo_Total_Horario_Estudiante"
-
-        # --- Restricciones Duras (Innegociables) ---
-        # 1. Cada clase debe cumplir sus horas semanales
-        for id_c, clase in clases_a_planificar.items():
-            prob += pulp.lpSum(vars_horario[id_c][d][h] for d in dias for h in horas) == clase['horas_semana'], f"Horas_Semanales_{id_c}"
-
-        # 2. Unicidad del Slot de Horario (Un solo slot ocupado a la vez)
-        for d in dias:
-            for h in horas:
-                prob += slot_ocupado[d][h] == pulp.lpSum(vars_horario[id_c][d][h] for id_c in ids_clases), f"Define_Slot_Ocupado_{d}_{h}"
-
-        # 3. No Colisión de Profesores (Un profesor solo puede dar una clase a la vez)
-        clases_por_profesor = {id_p: [id_c for id_c, clase in clases_a_planificar.items() if clase['id_profesor'] == id_p] for id_p in ids_profesores}
-        profesores_ocupados = conn.execute("SELECT cl.id_profesor, dc.dia, dc.h_inicio FROM detalle_cronogramas dc JOIN clases cl ON dc.id_clase = cl.id_clase").fetchall()
-        horarios_profesores_ocupados = {}
-        for p in profesores_ocupados:
-            horarios_profesores_ocupados.setdefault(p['id_profesor'], []).append((p['dia'], p['h_inicio']))
-
-        for id_p in ids_profesores:
-            for d in dias:
-                for h in horas:
-                    suma_clases_profesor_actual = pulp.lpSum(vars_horario[id_c][d][h] for id_c in clases_por_profesor.get(id_p, []))
-                    if (d, h) in horarios_profesores_ocupados.get(id_p, []):
-                        prob += suma_clases_profesor_actual == 0, f"Conflicto_Externo_Profesor_{id_p}_{d}_{h}"
-                    else:
-                        prob += suma_clases_profesor_actual <= 1, f"Unicidad_Interna_Profesor_{id_p}_{d}_{h}"
-
-        # --- Restricciones para Cálculo de Costes (Penalizaciones Flexibles) ---
-        for d in dias:
-            # 4. Cálculo de horas totales por día
-            prob += horas_por_dia[d] == pulp.lpSum(slot_ocupado[d][h] for h in horas), f"Calc_Horas_Por_Dia_{d}"
-            # Penalización si las horas del día exceden el límite
-            prob += exceso_diario[d] >= horas_por_dia[d] - LIMITE_HORAS_DIARIAS, f"Penaliza_Exceso_{d}"
-
-            # 5. Penalización por cada inicio de bloque en el día
-            h0 = horas[0]
-            prob += inicio_bloque[d][h0] == slot_ocupado[d][h0], f"Inicio_Bloque_Dia_0_{d}"
-            for k in range(1, len(horas)):
-                h_actual = horas[k]
-                h_anterior = horas[k-1]
-                prob += inicio_bloque[d][h_actual] >= slot_ocupado[d][h_actual] - slot_ocupado[d][h_anterior], f"Inicio_Bloque_Dia_Logic_{d}_{h_actual}"
-
-            # 6. Penalización por huecos en el día
-            for k in range(len(horas) - 2):
-                h_anterior = horas[k]
-                h_siguiente = horas[k+2]
-                h_actual = horas[k+1]
-                # Un hueco es [OCUPADO, VACIO, OCUPADO]
-                prob += hueco[d][h_actual] >= slot_ocupado[d][h_anterior] + slot_ocupado[d][h_siguiente] - slot_ocupado[d][h_actual] - 1, f"Hueco_Dia_Logic_{d}_{h_actual}"
-
-            # --- (Puedes añadir este bloque después de la penalización de huecos, cerca de la línea 335) ---
-
-            # 7. Penalización por fragmentación de clases (para agrupar horas de la misma materia)
-        for id_c in ids_clases:
-             for d in dias:
-                 # Un inicio en la primera hora del día se cuenta si la clase está asignada ahí.
-                h0 = horas[0]
-                prob += inicio_clase[id_c][d][h0] >= vars_horario[id_c][d][h0], f"Inicio_Clase_{id_c}_{d}_{h0}"
-                     # --- Este bloque va después del bucle de la línea 349 ---
-# --- (Asegúrate de que esté dentro de los bucles "for id_c in ids_clases:" y "for d in dias:") ---
-
-                    # 8. Penalización por bloques de 3 horas o más (para priorizar bloques de 2)
-                for k in range(len(horas) - 2):
-                        h1 = horas[k]
-                        h2 = horas[k+1]
-                        h3 = horas[k+2]
-                        # La variable 'bloque_largo' se activa si hay 3 horas consecutivas ocupadas por la misma clase.
-                        # La lógica es: Largo >= (Hora1 + Hora2 + Hora3) - 2
-                        prob += bloque_largo[id_c][d][h1] >= vars_horario[id_c][d][h1] + vars_horario[id_c][d][h2] + vars_horario[id_c][d][h3] - 2, f"Detecta_Bloque_Largo_{id_c}_{d}_{h1}"
-
-                    # Para el resto de horas, un inicio ocurre si la hora actual está ocupada por la clase
-                    # y la hora anterior NO lo estaba.
-                for k in range(1, len(horas)):
-                        h_actual = horas[k]
-                        h_anterior = horas[k-1]
-                        # La magia ocurre aquí: inicio_clase >= actual - anterior.
-                        # Se fuerza a ser 1 solo en el patrón [AUSENTE, PRESENTE] -> [0, 1].
-                        prob += inicio_clase[id_c][d][h_actual] >= vars_horario[id_c][d][h_actual] - vars_horario[id_c][d][h_anterior], f"Inicio_Clase_Logic_{id_c}_{d}_{h_actual}"
-
-
-        # --- Resolver el problema ---
-        # Le damos 60 segundos como máximo para encontrar una solución.
-        prob.solve(pulp.PULP_CBC_CMD(msg=0, timeLimit=60))
-
-
-        # --- Procesar el resultado ---
-        if pulp.LpStatus[prob.status] == 'Optimal':
-            for id_clase in ids_clases:
-                for d in dias:
-                    for h in horas:
-                        if vars_horario[id_clase][d][h].varValue == 1:
-                            h_inicio_num = int(h.split(':')[0])
-                            h_fin = f"{h_inicio_num + 1:02d}:00"
-                            cursor.execute("""
-                                INSERT INTO detalle_cronogramas (id_cronograma, dia, h_inicio, h_fin, id_clase, id_curso)
-                                VALUES (?, ?, ?, ?, ?, ?)
-                            """, (id_cronograma, d, h, h_fin, id_clase, id_curso))
-            conn.commit()
-            flash(f"Horario '{nombre_cronograma}' generado con éxito. Costo de penalización: {pulp.value(prob.objective):.2f}", "success")
+        if alcance == 'semestre':
+            cursos = conn.execute("""
+                SELECT DISTINCT cu.id_curso, cu.nombre FROM clases cl
+                JOIN cursos cu ON cl.id_curso = cu.id_curso
+                WHERE cl.id_semestre = ? AND cl.horas_semana > 0
+                ORDER BY cu.nombre
+            """, (id_semestre,)).fetchall()
+            if not cursos:
+                flash("No se encontraron clases con horas asignadas para este semestre.", "warning")
+                return redirect(url_for('horarios_bp.crear_horario_auto_form'))
+            nombres = {c['id_curso']: f"{nombre_cronograma} - {c['nombre']}" for c in cursos}
         else:
-            conn.rollback()
-            flash(f"No se pudo generar un horario que cumpliera todas las restricciones. Estado: {pulp.LpStatus[prob.status]}", "error")
-            return redirect(url_for('horarios_bp.crear_horario_auto_form'))
+            nombres = {int(id_curso): nombre_cronograma}
 
+        cursor = conn.cursor()
+        # --- VALIDACIÓN: Verificar si el nombre ya existe antes de INSERTAR ---
+        for nombre in nombres.values():
+            cursor.execute("SELECT id_cronograma FROM cronogramas WHERE nombre = ?", (nombre,))
+            if cursor.fetchone():
+                flash(f"Error: Ya existe un horario con el nombre '{nombre}'. Por favor, elige otro.", "error")
+                return redirect(url_for('horarios_bp.crear_horario_auto_form'))
+        # Los cronogramas quedan reservados mientras el trabajo se ejecuta; si la generación falla, el trabajo los elimina.
+        cronogramas = {}
+        for id_c, nombre in nombres.items():
+            cursor.execute("INSERT INTO cronogramas (nombre, id_curso) VALUES (?, ?)", (nombre, id_c))
+            cronogramas[id_c] = cursor.lastrowid
+        conn.commit()
     except sqlite3.IntegrityError:
         conn.rollback()
         flash("no se puede crear dos horarios con el mismo nombre", "error")
@@ -403,7 +366,123 @@ def ejecutar_creacion_automatica():
     finally:
         conn.close()
 
-    return redirect(url_for('horarios_bp.lista_horarios'))
+    trabajo = gestor_trabajos.enviar(f"Generación de '{nombre_cronograma}'", generar_horarios,
+                                     id_semestre, cronogramas, motor, arranque,
+                                     ids_cronogramas=cronogramas.values(), reservados=cronogramas.values())
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(trabajo.a_dict()), 202
+    return redirect(url_for('horarios_bp.ver_trabajo', id_trabajo=trabajo.id_trabajo))
+
+
+# --- Rutas para consultar y cancelar trabajos de generación ---
+
+@horarios_bp.route('/trabajos/<id_trabajo>')
+def estado_trabajo(id_trabajo):
+    """Retorna en JSON el estado, el incumbente y el tiempo transcurrido de un trabajo."""
+    trabajo = gestor_trabajos.obtener(id_trabajo)
+    if trabajo is None:
+        abort(404)
+    return jsonify(trabajo.a_dict())
+
+@horarios_bp.route('/trabajos/<id_trabajo>/ver')
+def ver_trabajo(id_trabajo):
+    """Página que consulta periódicamente el estado del trabajo."""
+    trabajo = gestor_trabajos.obtener(id_trabajo)
+    if trabajo is None:
+        abort(404)
+    return render_template('estado_trabajo.html', trabajo=trabajo.a_dict())
+
+@horarios_bp.route('/trabajos/<id_trabajo>/cancelar', methods=['POST'])
+def cancelar_trabajo(id_trabajo):
+    """Solicita la cancelación de un trabajo pendiente o en ejecución."""
+    trabajo = gestor_trabajos.cancelar(id_trabajo)
+    if trabajo is None:
+        abort(404)
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(trabajo.a_dict())
+    flash("Se solicitó la cancelación de la generación.", "warning")
+    return redirect(url_for('horarios_bp.ver_trabajo', id_trabajo=id_trabajo))
+
+@horarios_bp.route('/reparar/<int:id_cronograma>', methods=['POST'])
+def reparar_horario(id_cronograma):
+    """
+    Encola la reparación incremental de un horario guardado (ver reparacion.py):
+    se reoptimizan solo las horas afectadas por los cambios en clases o profesores.
+    """
+    conn = get_db_connection()
+    try:
+        cronograma = conn.execute("SELECT nombre FROM cronogramas WHERE id_cronograma = ?", (id_cronograma,)).fetchone()
+    finally:
+        conn.close()
+    if cronograma is None:
+        abort(404)
+
+    trabajo = gestor_trabajos.enviar(f"Reparación de '{cronograma['nombre']}'", reparacion.reparar_horario,
+                                     id_cronograma, ids_cronogramas=[id_cronograma])
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(trabajo.a_dict()), 202
+    return redirect(url_for('horarios_bp.ver_trabajo', id_trabajo=trabajo.id_trabajo))
+
+@horarios_bp.route('/exportar/<alcance>/<int:id_alcance>.<formato>')
+def exportar(alcance, id_alcance, formato):
+    """Exporta las entradas de un cronograma, profesor o semestre en iCalendar, CSV o JSON, generadas fila a fila."""
+    if alcance not in exportacion.ALCANCES or formato not in exportacion.FORMATOS:
+        abort(404)
+    conn = get_db_connection()
+    nombre = exportacion.nombre_de(conn, alcance, id_alcance)
+    conn.close()
+    if nombre is None:
+        abort(404)
+
+    def documento():
+        # El cuerpo se envía después de cerrar el contexto de la solicitud, cuya conexión ya
+        # volvió al pool: el cursor usa una conexión propia, devuelta aunque el cliente corte.
+        conn_exportacion = get_db_connection()
+        try:
+            yield from exportacion.generar(formato, exportacion.consultar(conn_exportacion, alcance, id_alcance),
+                                           f"{alcance.capitalize()} {nombre}")
+        finally:
+            conn_exportacion.close()
+
+    respuesta = Response(documento(), content_type=exportacion.FORMATOS[formato])
+    respuesta.headers['Content-Disposition'] = f'attachment; filename="horario-{alcance}-{id_alcance}.{formato}"'
+    return respuesta
+
+@horarios_bp.route('/conflictos')
+def conflictos_horarios():
+    """Pares de entradas de horarios guardados que se solapan para un mismo profesor, por semestre."""
+    id_semestre = request.args.get('id_semestre', type=int)
+    conn = get_db_connection()
+    if id_semestre is None:
+        semestres = [f['id_semestre'] for f in conn.execute("SELECT id_semestre FROM semestres ORDER BY id_semestre")]
+    else:
+        semestres = [id_semestre]
+    resultado = [{'id_semestre': s, 'conflictos': conflictos.conflictos_semestre(conn, s)} for s in semestres]
+    conn.close()
+    return jsonify({'semestres': resultado, 'total': sum(len(r['conflictos']) for r in resultado)})
+
+@horarios_bp.route('/cache')
+def estadisticas_cache():
+    """Contadores de aciertos/fallos de la caché de resultados del solver."""
+    conn = get_db_connection()
+    datos = cache_soluciones.estadisticas(conn)
+    conn.close()
+    return jsonify(datos)
+
+@horarios_bp.route('/telemetria')
+def historial_solver():
+    """Historial de la generación automática, agregado por tamaño y por constantes de penalización (HTML o JSON)."""
+    limite = min(max(request.args.get('limite', telemetria.EJECUCIONES_RECIENTES, type=int), 1), 1000)
+    conn = get_db_connection()
+    datos = telemetria.resumen(conn)
+    datos['recientes'] = telemetria.recientes(conn, limite)
+    conn.close()
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(datos)
+    return render_template('telemetria.html', **datos)
+
 
 
 @horarios_bp.route('/delete/<int:id_cronograma>', methods=['POST'])
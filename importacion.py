@@ -0,0 +1,260 @@
+"""
+Importación masiva de profesores, cursos y clases desde CSV o JSON.
+
+Las filas se leen de a una desde el archivo (CSV con encabezado, un arreglo
+JSON o JSON Lines) y se validan contra catálogos en memoria cargados una sola
+vez al empezar (cédulas, nombres de cursos y semestres, combinaciones
+curso-profesor-semestre ya usadas), que se actualizan con cada fila aceptada.
+Las filas válidas se insertan con `executemany` en lotes de TAMANO_LOTE, todo
+en una sola transacción; las inválidas no detienen la importación y quedan en
+el informe con su número de fila (1 = primer registro, sin contar el
+encabezado).
+
+Columnas por entidad:
+- profesores: cedula*, nombre*, correo, telefono
+- cursos: nombre*, descripcion
+- clases: nombre*, horas_semana*, n_horas, descripcion y el curso, profesor y
+  semestre, cada uno por id (`id_curso`, `id_profesor`, `id_semestre`) o por
+  nombre/cédula (`curso`, `profesor` = cédula, `semestre`)
+
+Uso:
+    python importacion.py profesores profesores.csv
+    python importacion.py clases clases.json --simular
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+
+import database
+
+# Filas por cada executemany.
+TAMANO_LOTE = 1000
+
+FORMATOS = ('csv', 'json')
+
+
+class ErrorFila(ValueError):
+    """Fila rechazada; el mensaje va al informe de la importación."""
+
+
+def _texto(fila, campo, obligatorio=False):
+    valor = fila.get(campo)
+    valor = '' if valor is None else str(valor).strip()
+    if obligatorio and not valor:
+        raise ErrorFila(f"falta el campo '{campo}'")
+    return valor or None
+
+
+def _entero(fila, campo, obligatorio=False):
+    valor = _texto(fila, campo, obligatorio)
+    if valor is None:
+        return None
+    try:
+        numero = int(valor)
+    except ValueError:
+        raise ErrorFila(f"'{campo}' debe ser un número entero: {valor!r}")
+    if numero <= 0:
+        raise ErrorFila(f"'{campo}' debe ser mayor que cero")
+    return numero
+
+
+def _referencia(fila, nombre, por_clave, ids):
+    """Resuelve `id_<nombre>` (debe existir) o `<nombre>` (buscado en `por_clave`)."""
+    id_referencia = _entero(fila, f'id_{nombre}')
+    if id_referencia is not None:
+        if id_referencia not in ids:
+            raise ErrorFila(f"no existe {nombre} con id {id_referencia}")
+        return id_referencia
+    clave = _texto(fila, nombre)
+    if clave is None:
+        raise ErrorFila(f"falta el campo '{nombre}' o 'id_{nombre}'")
+    id_referencia = por_clave.get(clave.lower())
+    if id_referencia is None:
+        raise ErrorFila(f"no existe {nombre} '{clave}'")
+    return id_referencia
+
+
+# --- Profesores ---
+
+def _catalogo_profesores(conn):
+    return {'cedulas': {f['cedula'].strip() for f in conn.execute("SELECT cedula FROM profesores")}}
+
+
+def _validar_profesor(fila, catalogo):
+    cedula = _texto(fila, 'cedula', obligatorio=True)
+    nombre = _texto(fila, 'nombre', obligatorio=True)
+    if cedula in catalogo['cedulas']:
+        raise ErrorFila(f"ya existe un profesor con la cédula {cedula}")
+    catalogo['cedulas'].add(cedula)
+    return (cedula, nombre, _texto(fila, 'correo'), _texto(fila, 'telefono'))
+
+
+# --- Cursos ---
+
+def _catalogo_cursos(conn):
+    return {'nombres': {f['nombre'].lower() for f in conn.execute("SELECT nombre FROM cursos")}}
+
+
+def _validar_curso(fila, catalogo):
+    nombre = _texto(fila, 'nombre', obligatorio=True)
+    if nombre.lower() in catalogo['nombres']:
+        raise ErrorFila(f"ya existe un curso con el nombre '{nombre}'")
+    catalogo['nombres'].add(nombre.lower())
+    return (nombre, _texto(fila, 'descripcion'))
+
+
+# --- Clases ---
+
+def _catalogo_clases(conn):
+    def por_clave(sql):
+        claves = {}
+        for clave, id_fila in conn.execute(sql):
+            claves.setdefault(clave.strip().lower(), id_fila)
+        return claves
+
+    return {
+        'cursos': por_clave("SELECT nombre, id_curso FROM cursos ORDER BY id_curso"),
+        'id_cursos': {f[0] for f in conn.execute("SELECT id_curso FROM cursos")},
+        'profesores': por_clave("SELECT cedula, id_profesor FROM profesores ORDER BY id_profesor"),
+        'id_profesores': {f[0] for f in conn.execute("SELECT id_profesor FROM profesores")},
+        'semestres': por_clave("SELECT nombre, id_semestre FROM semestres ORDER BY id_semestre"),
+        'id_semestres': {f[0] for f in conn.execute("SELECT id_semestre FROM semestres")},
+        'combinaciones': {tuple(f) for f in conn.execute("SELECT id_curso, id_profesor, id_semestre FROM clases")},
+    }
+
+
+def _validar_clase(fila, catalogo):
+    nombre = _texto(fila, 'nombre', obligatorio=True)
+    horas_semana = _entero(fila, 'horas_semana', obligatorio=True)
+    n_horas = _entero(fila, 'n_horas')
+    id_curso = _referencia(fila, 'curso', catalogo['cursos'], catalogo['id_cursos'])
+    id_profesor = _referencia(fila, 'profesor', catalogo['profesores'], catalogo['id_profesores'])
+    id_semestre = _referencia(fila, 'semestre', catalogo['semestres'], catalogo['id_semestres'])
+    combinacion = (id_curso, id_profesor, id_semestre)
+    if combinacion in catalogo['combinaciones']:
+        raise ErrorFila("ya existe una clase con la misma combinación de Curso, Profesor y Semestre")
+    catalogo['combinaciones'].add(combinacion)
+    return (nombre, _texto(fila, 'descripcion'), n_horas, horas_semana, id_curso, id_profesor, id_semestre)
+
+
+# entidad -> (carga de catálogos, validación de una fila -> parámetros, INSERT)
+ENTIDADES = {
+    'profesores': (_catalogo_profesores, _validar_profesor,
+                   "INSERT INTO profesores (cedula, nombre, correo, telefono) VALUES (?, ?, ?, ?)"),
+    'cursos': (_catalogo_cursos, _validar_curso,
+               "INSERT INTO cursos (nombre, descripcion) VALUES (?, ?)"),
+    'clases': (_catalogo_clases, _validar_clase,
+               """INSERT INTO clases (nombre, descripcion, n_horas, horas_semana, id_curso, id_profesor, id_semestre)
+                  VALUES (?, ?, ?, ?, ?, ?, ?)"""),
+}
+
+
+def leer_filas(archivo, formato):
+    """
+    Itera los registros (dicts) de un archivo de texto abierto.
+
+    `csv` usa la primera línea como encabezado. `json` acepta un arreglo de
+    objetos o un objeto por línea (JSON Lines); solo el arreglo se carga
+    completo en memoria.
+    """
+    if formato == 'csv':
+        yield from csv.DictReader(archivo)
+        return
+    primero = archivo.read(1)
+    while primero.isspace():
+        primero = archivo.read(1)
+    if primero == '[':
+        yield from json.loads(primero + archivo.read())
+        return
+    linea = primero + archivo.readline()
+    while linea:
+        if linea.strip():
+            yield json.loads(linea)
+        linea = archivo.readline()
+
+
+def formato_de(nombre_archivo):
+    """Deduce el formato por la extensión (.csv, o .json/.jsonl/.ndjson)."""
+    extension = os.path.splitext(nombre_archivo or '')[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.json', '.jsonl', '.ndjson'):
+        return 'json'
+    return None
+
+
+def importar(conn, entidad, filas, simular=False):
+    """
+    Valida e inserta las `filas` de `entidad` en una sola transacción.
+
+    Retorna el informe {'entidad', 'leidas', 'insertadas', 'errores': [{'fila', 'error'}]}.
+    Con `simular` se valida e inserta igual, pero al final se descarta todo.
+    Un archivo mal formado (CSV/JSON) aborta la importación con ValueError.
+    """
+    cargar_catalogo, validar, insertar = ENTIDADES[entidad]
+    catalogo = cargar_catalogo(conn)
+    informe = {'entidad': entidad, 'leidas': 0, 'insertadas': 0, 'errores': []}
+    lote = []
+    try:
+        for numero, fila in enumerate(filas, start=1):
+            informe['leidas'] = numero
+            try:
+                if not isinstance(fila, dict):
+                    raise ErrorFila("el registro no es un objeto")
+                lote.append(validar(fila, catalogo))
+            except ErrorFila as e:
+                informe['errores'].append({'fila': numero, 'error': str(e)})
+                continue
+            if len(lote) >= TAMANO_LOTE:
+                conn.executemany(insertar, lote)
+                informe['insertadas'] += len(lote)
+                lote = []
+        if lote:
+            conn.executemany(insertar, lote)
+            informe['insertadas'] += len(lote)
+        if simular:
+            conn.rollback()
+        else:
+            conn.commit()
+    except (csv.Error, json.JSONDecodeError, UnicodeDecodeError) as e:
+        conn.rollback()
+        raise ValueError(f"Archivo mal formado cerca del registro {informe['leidas'] + 1}: {e}") from e
+    except Exception:
+        conn.rollback()
+        raise
+    return informe
+
+
+def importar_archivo(conn, entidad, binario, formato, simular=False):
+    """Importa desde un archivo binario (p. ej. una subida de Flask) codificado en UTF-8."""
+    texto = io.TextIOWrapper(binario, encoding='utf-8-sig', newline='')
+    return importar(conn, entidad, leer_filas(texto, formato), simular)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Importa profesores, cursos o clases desde un archivo CSV o JSON.")
+    parser.add_argument('entidad', choices=sorted(ENTIDADES))
+    parser.add_argument('archivo')
+    parser.add_argument('--formato', choices=FORMATOS, help="Por defecto se deduce de la extensión del archivo.")
+    parser.add_argument('--simular', action='store_true', help="Solo valida: no guarda nada.")
+    parser.add_argument('--base', default=database.DATABASE_NAME, help="Base de datos SQLite (por defecto %(default)s).")
+    args = parser.parse_args()
+
+    formato = args.formato or formato_de(args.archivo)
+    if formato is None:
+        parser.error("no se pudo deducir el formato; use --formato")
+
+    database.DATABASE_NAME = args.base
+    conn = database.get_db_connection()
+    database.crear_esquema(conn)
+    try:
+        with open(args.archivo, 'rb') as binario:
+            informe = importar_archivo(conn, args.entidad, binario, formato, args.simular)
+    except ValueError as e:
+        sys.exit(f"Error: {e}")
+    finally:
+        conn.close()
+    print(json.dumps(informe, indent=2, ensure_ascii=False))
@@ -0,0 +1,123 @@
+"""
+Generador de instancias sintéticas para pruebas de rendimiento.
+
+Crea una base de datos SQLite con el esquema de `database.crear_esquema` y la
+llena con un semestre, cursos, profesores y clases, más un horario ya guardado
+de otro curso del semestre que bloquea slots de los profesores. Todo es
+reproducible a partir de la semilla.
+
+Uso:
+    python instancias.py --clases 100 --salida /tmp/instancia.db
+"""
+import argparse
+import random
+import sqlite3
+
+import database
+
+DIAS = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes']
+HORAS = list(range(7, 14))
+
+# Clases por curso en las instancias generadas (como un semestre típico).
+CLASES_POR_CURSO = 6
+
+
+def generar_instancia(ruta, n_clases, compartido=0.3, bloqueos=0.1, semilla=0):
+    """
+    Crea la base de datos `ruta` con una instancia sintética y retorna un dict
+    con sus parámetros e ids (id_semestre a planificar, cursos, profesores).
+
+    - `n_clases`: número de clases del semestre a planificar.
+    - `compartido`: probabilidad de que una clase reutilice un profesor que ya
+      enseña en otro curso (más alto = cursos más acoplados).
+    - `bloqueos`: fracción de los slots de cada profesor ya ocupada por el
+      horario guardado de un curso ajeno a la instancia.
+    """
+    rng = random.Random(semilla)
+    conn = sqlite3.connect(ruta)
+    database.crear_esquema(conn)
+
+    cur = conn.cursor()
+    cur.execute("INSERT INTO semestres (nombre, fecha_inicio, fecha_fin) VALUES (?, ?, ?)", ('Semestre sintético', '2025-02-03', '2025-06-27'))
+    id_semestre = cur.lastrowid
+
+    n_cursos = max(1, -(-n_clases // CLASES_POR_CURSO))
+    cursos = []
+    for i in range(n_cursos):
+        cur.execute("INSERT INTO cursos (nombre, descripcion) VALUES (?, ?)", (f"Curso {i + 1:03d}", "Curso sintético"))
+        cursos.append(cur.lastrowid)
+
+    profesores = []
+
+    def nuevo_profesor():
+        n = len(profesores) + 1
+        cur.execute("INSERT INTO profesores (cedula, nombre, correo, telefono) VALUES (?, ?, ?, ?)",
+                    (f"{10**9 + n}", f"Profesor {n:04d}", f"profesor{n}@ejemplo.com", None))
+        profesores.append(cur.lastrowid)
+        return cur.lastrowid
+
+    filas_clases = []
+    profesores_del_curso = set()
+    for i in range(n_clases):
+        id_curso = cursos[i // CLASES_POR_CURSO]
+        if i % CLASES_POR_CURSO == 0:
+            profesores_del_curso = set()
+        # Un profesor dicta a lo sumo una clase por curso y semestre (ux_clases_curso_profesor_semestre)
+        candidatos = [p for p in profesores if p not in profesores_del_curso]
+        if candidatos and rng.random() < compartido:
+            id_profesor = rng.choice(candidatos)
+        else:
+            id_profesor = nuevo_profesor()
+        profesores_del_curso.add(id_profesor)
+        horas_semana = rng.choice([2, 2, 3, 3, 4])
+        filas_clases.append((f"Clase {i + 1:04d}", None, horas_semana, horas_semana, id_curso, id_profesor, id_semestre))
+    cur.executemany("""
+        INSERT INTO clases (nombre, descripcion, n_horas, horas_semana, id_curso, id_profesor, id_semestre)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, filas_clases)
+
+    # --- Horario guardado de otro curso que bloquea a los profesores ---
+    n_bloqueados = int(round(bloqueos * len(DIAS) * len(HORAS)))
+    if n_bloqueados:
+        cur.execute("INSERT INTO cursos (nombre, descripcion) VALUES (?, ?)", ("Curso previo", "Bloqueos sintéticos"))
+        id_curso_previo = cur.lastrowid
+        cur.execute("INSERT INTO cronogramas (nombre, id_curso) VALUES (?, ?)", ("Horario previo", id_curso_previo))
+        id_cronograma_previo = cur.lastrowid
+        detalles = []
+        for id_profesor in profesores:
+            cur.execute("""
+                INSERT INTO clases (nombre, descripcion, n_horas, horas_semana, id_curso, id_profesor, id_semestre)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (f"Clase previa {id_profesor}", None, n_bloqueados, n_bloqueados, id_curso_previo, id_profesor, id_semestre))
+            id_clase_previa = cur.lastrowid
+            for d, h in rng.sample([(d, h) for d in DIAS for h in HORAS], n_bloqueados):
+                detalles.append((id_cronograma_previo, DIAS.index(d), h * 60, (h + 1) * 60, id_clase_previa, id_curso_previo))
+        cur.executemany("""
+            INSERT INTO detalle_cronogramas (id_cronograma, dia_num, min_inicio, min_fin, id_clase, id_curso)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, detalles)
+
+    conn.commit()
+    conn.close()
+    return {
+        'ruta': ruta,
+        'n_clases': n_clases,
+        'compartido': compartido,
+        'bloqueos': bloqueos,
+        'semilla': semilla,
+        'id_semestre': id_semestre,
+        'cursos': cursos,
+        'n_profesores': len(profesores),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Genera una base de datos sintética de horarios.")
+    parser.add_argument('--clases', type=int, default=50)
+    parser.add_argument('--compartido', type=float, default=0.3)
+    parser.add_argument('--bloqueos', type=float, default=0.1)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', required=True)
+    args = parser.parse_args()
+    info = generar_instancia(args.salida, args.clases, args.compartido, args.bloqueos, args.semilla)
+    print(f"Instancia creada en {info['ruta']}: {info['n_clases']} clases, {len(info['cursos'])} cursos, {info['n_profesores']} profesores.")
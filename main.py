@@ -1,24 +1,40 @@
 # 1. Importaciones necesarias
 import os
 from flask import Flask, render_template
-from database import get_db_connection
+from database import get_db_connection, init_db, liberar_conexion_solicitud
 
 # Importar los blueprints de las funcionalidades
 from profesores import profesores_bp
 from cursos import cursos_bp
 from gestion import gestion_bp
 from horarios import horarios_bp # <-- AÑADIDO
+from api import api_bp
+import metricas
 
 app = Flask(__name__)
 
 # Añadir una clave secreta para la gestión de sesiones (necesaria para flash)
 app.secret_key = os.urandom(24)
 
+# Cada solicitud usa una sola conexión del pool, que se devuelve siempre al terminar
+app.teardown_appcontext(liberar_conexion_solicitud)
+
+# Latencia por endpoint y uso de SQL por solicitud, expuestos en /metricas
+metricas.init_app(app)
+
 # 2. Registrar los blueprints con sus prefijos de URL
 app.register_blueprint(profesores_bp, url_prefix='/profesores')
 app.register_blueprint(cursos_bp, url_prefix='/cursos')
 app.register_blueprint(gestion_bp) 
 app.register_blueprint(horarios_bp) # <-- AÑADIDO (usará el prefijo '/horarios' definido en el blueprint)
+app.register_blueprint(api_bp) # API JSON de solo lectura en '/api'
+
+# Crea las tablas que falten y aplica las migraciones pendientes: `flask --app main init-db`
+# (igual que `python init_db.py`). No se ejecuta al importar, para que los workers,
+# los procesos del solver y cada comando de `flask` no lo repitan.
+@app.cli.command('init-db')
+def init_db_comando():
+    init_db()
 
 # --- Rutas HTML Principales ---
 
@@ -34,4 +50,5 @@ def aulas():
 
 # 3. Bloque para iniciar el servidor
 if __name__ == '__main__':
+  init_db()
   app.run(host='0.0.0.0', port=8080, debug=True)
@@ -0,0 +1,218 @@
+"""
+Métricas de las solicitudes y de SQL, en formato de texto de Prometheus.
+
+`init_app(app)` mide cada solicitud: latencia por endpoint (histograma),
+solicitudes por código de estado y, por endpoint, cuántas sentencias SQL se
+ejecutaron, cuánto tardaron y cuántas filas se leyeron. Las sentencias las
+informan los cursores de las conexiones de `database.get_db_connection`
+(ver `database.CursorMedido`); las de trabajos en segundo plano se cuentan con
+el endpoint `segundo_plano`. Si el cuerpo de la respuesta se genera al enviarse
+(las exportaciones), la medición sigue activa hasta que el servidor cierra la
+respuesta, así que su SQL y su latencia completa cuentan para el endpoint.
+
+Si una misma sentencia se repite UMBRAL_N_MAS_1 veces o más en una solicitud
+(el patrón N+1: una consulta por cada fila de otra), se cuenta en
+`horarios_n_mas_1_total` y se registra un aviso con la sentencia. Con
+HORARIOS_LOG_LENTAS_MS también se registran las solicitudes más lentas que ese
+umbral. Las métricas se leen en GET /metricas, solo desde la misma máquina
+(ver ACCESO_METRICAS).
+"""
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from flask import Response, abort, g, request
+
+# Límites superiores (segundos) de los intervalos del histograma de latencia.
+LIMITES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Repeticiones de una misma sentencia en una solicitud a partir de las cuales se avisa de un N+1.
+UMBRAL_N_MAS_1 = int(os.environ.get('HORARIOS_UMBRAL_N_MAS_1', 10))
+# Solicitudes más lentas que esto (ms) se registran; sin definir, no se registra ninguna.
+LOG_LENTAS_MS = float(os.environ['HORARIOS_LOG_LENTAS_MS']) if os.environ.get('HORARIOS_LOG_LENTAS_MS') else None
+# Direcciones desde las que se puede leer /metricas.
+DIRECCIONES_LOCALES = ('127.0.0.1', '::1')
+# 'local' sirve /metricas a peticiones directas desde DIRECCIONES_LOCALES; 'no' no registra la ruta.
+# Detrás de un proxy inverso todas las peticiones llegan desde 127.0.0.1: se rechazan las que traen
+# cabeceras de reenvío, pero si el proxy no las añade hay que usar 'no' o bloquear /metricas en él.
+ACCESO_METRICAS = os.environ.get('HORARIOS_METRICAS', 'local')
+_CABECERAS_REENVIO = ('Forwarded', 'X-Forwarded-For', 'X-Real-IP')
+
+registro = logging.getLogger('horarios.metricas')
+
+_medicion = contextvars.ContextVar('medicion_solicitud', default=None)
+_lock = threading.Lock()
+_latencias = {}     # (endpoint, método) -> [conteos por intervalo..., suma, total]
+_solicitudes = Counter()  # (endpoint, método, código)
+_sql = {}           # endpoint -> [sentencias, segundos, filas]
+_n_mas_1 = Counter()  # endpoint
+
+_ESPACIOS = re.compile(r'\s+')
+
+
+class MedicionSolicitud:
+    """SQL ejecutado durante una solicitud."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.inicio = time.perf_counter()
+        self.sentencias = 0
+        self.segundos_sql = 0.0
+        self.filas = 0
+        self.repeticiones = Counter()
+
+
+def _acumular_sql(endpoint, sentencias, segundos, filas):
+    with _lock:
+        total = _sql.setdefault(endpoint, [0, 0.0, 0])
+        total[0] += sentencias
+        total[1] += segundos
+        total[2] += filas
+
+
+def registrar_sentencia(sql, segundos):
+    """Lo llama el cursor después de ejecutar `sql`."""
+    medicion = _medicion.get()
+    if medicion is None:
+        _acumular_sql('segundo_plano', 1, segundos, 0)
+        return
+    medicion.sentencias += 1
+    medicion.segundos_sql += segundos
+    medicion.repeticiones[sql] += 1
+
+
+def registrar_filas(filas, segundos):
+    """Lo llama el cursor después de leer `filas` filas."""
+    medicion = _medicion.get()
+    if medicion is None:
+        _acumular_sql('segundo_plano', 0, segundos, filas)
+        return
+    medicion.filas += filas
+    medicion.segundos_sql += segundos
+
+
+def _iniciar():
+    g.medicion_token = _medicion.set(MedicionSolicitud(request.endpoint or 'sin_ruta'))
+
+
+def _terminar(respuesta):
+    if respuesta.is_streamed:
+        # El cuerpo se genera después de after_request: la medición queda activa mientras se envía
+        # y se registra cuando el servidor cierra la respuesta.
+        token = g.pop('medicion_token', None)
+        if token is not None:
+            medicion, metodo, ruta = _medicion.get(), request.method, request.path
+            respuesta.call_on_close(lambda: _cerrar(token, medicion, metodo, ruta, respuesta.status_code))
+        return respuesta
+    _registrar_solicitud(respuesta.status_code)
+    return respuesta
+
+
+def _terminar_con_error(exc=None):
+    # after_request no corre si la vista lanzó una excepción: se registra aquí como 500
+    if exc is not None:
+        _registrar_solicitud(500)
+
+
+def _registrar_solicitud(codigo):
+    token = g.pop('medicion_token', None)
+    if token is not None:
+        _cerrar(token, _medicion.get(), request.method, request.path, codigo)
+
+
+def _cerrar(token, medicion, metodo, ruta, codigo):
+    """Termina la medición de una solicitud y acumula sus métricas."""
+    try:
+        _medicion.reset(token)
+    except ValueError:
+        # El servidor cerró la respuesta en otro contexto; ahí la medición nunca estuvo activa.
+        pass
+    duracion = time.perf_counter() - medicion.inicio
+    clave = (medicion.endpoint, metodo)
+
+    with _lock:
+        latencia = _latencias.setdefault(clave, [0] * len(LIMITES_LATENCIA) + [0.0, 0])
+        for i, limite in enumerate(LIMITES_LATENCIA):
+            if duracion <= limite:
+                latencia[i] += 1
+        latencia[-2] += duracion
+        latencia[-1] += 1
+        _solicitudes[(*clave, codigo)] += 1
+    _acumular_sql(medicion.endpoint, medicion.sentencias, medicion.segundos_sql, medicion.filas)
+
+    repetidas = [(sql, n) for sql, n in medicion.repeticiones.items() if n >= UMBRAL_N_MAS_1]
+    if repetidas:
+        with _lock:
+            _n_mas_1[medicion.endpoint] += 1
+        for sql, n in repetidas:
+            registro.warning("Posible N+1 en %s %s: %d ejecuciones de %s",
+                             metodo, ruta, n, _ESPACIOS.sub(' ', sql).strip()[:200])
+    if LOG_LENTAS_MS is not None and duracion * 1000 >= LOG_LENTAS_MS:
+        registro.warning("Solicitud lenta: %s %s -> %d en %.1f ms (%d sentencias SQL, %.1f ms, %d filas)",
+                         metodo, ruta, codigo, duracion * 1000,
+                         medicion.sentencias, medicion.segundos_sql * 1000, medicion.filas)
+
+
+def _etiquetas(**valores):
+    texto = ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                     for k, v in valores.items())
+    return "{" + texto + "}"
+
+
+def exposicion():
+    """Texto de todas las métricas en el formato de exposición de Prometheus."""
+    with _lock:
+        latencias = {k: list(v) for k, v in _latencias.items()}
+        solicitudes = dict(_solicitudes)
+        sql = {k: list(v) for k, v in _sql.items()}
+        n_mas_1 = dict(_n_mas_1)
+
+    lineas = [
+        "# HELP horarios_solicitud_segundos Latencia de las solicitudes por endpoint.",
+        "# TYPE horarios_solicitud_segundos histogram",
+    ]
+    for (endpoint, metodo), valores in sorted(latencias.items()):
+        for limite, conteo in zip(LIMITES_LATENCIA, valores):
+            lineas.append(f"horarios_solicitud_segundos_bucket{_etiquetas(endpoint=endpoint, metodo=metodo, le=limite)} {conteo}")
+        lineas.append(f"horarios_solicitud_segundos_bucket{_etiquetas(endpoint=endpoint, metodo=metodo, le='+Inf')} {valores[-1]}")
+        lineas.append(f"horarios_solicitud_segundos_sum{_etiquetas(endpoint=endpoint, metodo=metodo)} {valores[-2]:.6f}")
+        lineas.append(f"horarios_solicitud_segundos_count{_etiquetas(endpoint=endpoint, metodo=metodo)} {valores[-1]}")
+
+    lineas += ["# HELP horarios_solicitudes_total Solicitudes atendidas por endpoint y código de estado.",
+               "# TYPE horarios_solicitudes_total counter"]
+    for (endpoint, metodo, codigo), n in sorted(solicitudes.items()):
+        lineas.append(f"horarios_solicitudes_total{_etiquetas(endpoint=endpoint, metodo=metodo, codigo=codigo)} {n}")
+
+    for indice, nombre, ayuda in ((0, 'horarios_sql_sentencias_total', 'Sentencias SQL ejecutadas.'),
+                                  (1, 'horarios_sql_segundos_total', 'Tiempo en ejecutar sentencias y leer filas.'),
+                                  (2, 'horarios_sql_filas_total', 'Filas leídas de los cursores.')):
+        lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} counter"]
+        for endpoint, valores in sorted(sql.items()):
+            valor = f"{valores[indice]:.6f}" if indice == 1 else valores[indice]
+            lineas.append(f"{nombre}{_etiquetas(endpoint=endpoint)} {valor}")
+
+    lineas += ["# HELP horarios_n_mas_1_total Solicitudes con una sentencia repetida al menos el umbral de N+1.",
+               "# TYPE horarios_n_mas_1_total counter"]
+    for endpoint, n in sorted(n_mas_1.items()):
+        lineas.append(f"horarios_n_mas_1_total{_etiquetas(endpoint=endpoint)} {n}")
+    return "\n".join(lineas) + "\n"
+
+
+def ver_metricas():
+    if request.remote_addr not in DIRECCIONES_LOCALES or any(c in request.headers for c in _CABECERAS_REENVIO):
+        abort(403)
+    return Response(exposicion(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_app(app):
+    """Registra la medición de solicitudes y, salvo con HORARIOS_METRICAS=no, la ruta /metricas."""
+    if ACCESO_METRICAS not in ('local', 'no'):
+        raise ValueError(f"HORARIOS_METRICAS desconocido: {ACCESO_METRICAS}")
+    app.before_request(_iniciar)
+    app.after_request(_terminar)
+    app.teardown_request(_terminar_con_error)
+    if ACCESO_METRICAS == 'local':
+        app.add_url_rule('/metricas', 'metricas', ver_metricas)
@@ -0,0 +1,486 @@
+"""
+Modelo MILP de generación de horarios (PuLP).
+
+Construye el problema de optimización a partir de datos simples, sin Flask ni
+base de datos; lo usan `generador.py` y `benchmark.py`.
+
+- `construir_modelo(clases_a_planificar, horarios_profesores_ocupados, formulacion=None, tiempos=None)`
+  retorna `(prob, variables)`. `clases_a_planificar` es un dict
+  id_clase -> {'id_curso', 'id_profesor', 'horas_semana', ...} y
+  `horarios_profesores_ocupados` un dict id_profesor -> lista de (dia, hora)
+  ya ocupados en otros horarios. `variables['horario'][id_clase][dia][hora]`
+  son las variables de decisión. Si se pasa un dict `tiempos`, se llena con
+  los segundos de cada fase ('indices', 'variables', 'objetivo', 'restricciones').
+- `fijar_solucion_inicial` da valores iniciales (MIP start) a las variables.
+- `fijar_vecindario` restringe el modelo a reoptimizar parte de un horario
+  guardado (ver `reparacion.py`).
+- `canonizar_asignacion` adapta una asignación a la ruptura de simetría.
+- `extraer_asignacion` lee la asignación [(id_clase, dia, hora)] resuelta.
+
+Las restricciones se arman como diccionarios variable -> coeficiente sobre
+índices precalculados (slots planos por clase, clases por curso y por profesor,
+máscara de bits de los slots bloqueados de cada profesor), sin pasar por la
+aritmética de expresiones de PuLP, de modo que el tiempo de construcción crece
+linealmente con el tamaño del modelo.
+
+PuLP se importa dentro de las funciones que construyen el modelo: importar
+este módulo (y con él `generador`) no carga el solver, así que el arranque de
+la aplicación web no paga ese costo.
+"""
+import os
+import time
+
+# --- Constantes para la Optimización ---
+LIMITE_HORAS_DIARIAS = 4
+PENALIZACION_EXCESO_HORAS = 100
+PENALIZACION_INICIO_BLOQUE = 10
+PENALIZACION_HUECO = 1
+PENALIZACION_FRAGMENTACION = 3
+PENALIZACION_BLOQUE_LARGO = 4
+# Costo de mover o quitar una hora ya guardada al reparar un horario (ver fijar_vecindario).
+PENALIZACION_MOVIMIENTO = 20
+
+DIAS = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes']
+HORAS = [f"{h:02d}:00" for h in range(7, 14)]
+
+# Slots de la grilla en orden (día, hora): el índice plano es k_dia * len(HORAS) + k_hora.
+SLOTS = [(d, h) for d in DIAS for h in HORAS]
+_INDICE_SLOT = {slot: i for i, slot in enumerate(SLOTS)}
+
+# 'clasica' es el modelo original; 'compacta' es una reformulación equivalente
+# (mismo óptimo) con menos variables enteras y restricciones.
+FORMULACIONES = ('clasica', 'compacta')
+FORMULACION_POR_DEFECTO = os.environ.get('HORARIOS_FORMULACION', 'compacta')
+
+# Sentidos de restricción de PuLP (pulp.LpConstraintEQ, LpConstraintLE y LpConstraintGE).
+_EQ, _LE, _GE = 0, -1, 1
+
+
+def construir_modelo(clases_a_planificar, horarios_profesores_ocupados, formulacion=None, tiempos=None,
+                     romper_simetria=True):
+    """
+    Construye el modelo con la formulación indicada (ver FORMULACIONES; por
+    defecto FORMULACION_POR_DEFECTO). Retorna (prob, variables).
+    `romper_simetria=False` omite el orden entre días intercambiables de la
+    formulación compacta, necesario si luego se fijan variables a un horario dado.
+    """
+    formulacion = formulacion or FORMULACION_POR_DEFECTO
+    if formulacion not in FORMULACIONES:
+        raise ValueError(f"Formulación desconocida: {formulacion}")
+    if formulacion == 'compacta':
+        return construir_modelo_compacto(clases_a_planificar, horarios_profesores_ocupados, tiempos, romper_simetria)
+    return construir_modelo_clasico(clases_a_planificar, horarios_profesores_ocupados, tiempos)
+
+
+def _indices(clases_a_planificar, horarios_profesores_ocupados):
+    """Agrupa las clases por curso y por profesor y arma la máscara de slots bloqueados de cada profesor."""
+    clases_por_curso = {}
+    clases_por_profesor = {}
+    for id_c, clase in clases_a_planificar.items():
+        clases_por_curso.setdefault(clase['id_curso'], []).append(id_c)
+        clases_por_profesor.setdefault(clase['id_profesor'], []).append(id_c)
+    bloqueos = {}
+    for id_p in clases_por_profesor:
+        mascara = 0
+        for d, h in horarios_profesores_ocupados.get(id_p, ()):
+            i = _INDICE_SLOT.get((d, h))
+            if i is not None:
+                mascara |= 1 << i
+        bloqueos[id_p] = mascara
+    return clases_por_curso, clases_por_profesor, bloqueos
+
+
+def _fase(tiempos, nombre, inicio):
+    """Acumula en `tiempos[nombre]` los segundos desde `inicio` y retorna el instante actual."""
+    ahora = time.perf_counter()
+    if tiempos is not None:
+        tiempos[nombre] = tiempos.get(nombre, 0.0) + ahora - inicio
+    return ahora
+
+
+def _restriccion(restricciones, coeficientes, sentido, rhs, nombre):
+    """
+    Registra `sum(coef * var) <sentido> rhs` a partir de un dict variable -> coeficiente.
+    Las restricciones se acumulan en `restricciones` y se pasan al problema de una
+    vez con `prob.extend`, que no recorre sus variables (PuLP las recoge al escribir el modelo).
+    """
+    import pulp
+    restricciones[nombre] = pulp.LpConstraint(pulp.LpAffineExpression(coeficientes), sentido, nombre, rhs)
+
+
+def _sumar(coeficientes, variables, coef):
+    """Suma `coef` al coeficiente de cada variable de `variables` en el dict `coeficientes`."""
+    for v in variables:
+        coeficientes[v] = coeficientes.get(v, 0) + coef
+    return coeficientes
+
+
+def construir_modelo_clasico(clases_a_planificar, horarios_profesores_ocupados, tiempos=None):
+    """
+    Construye el modelo de optimización para las clases de uno o varios cursos.
+
+    Las penalizaciones del horario del estudiante se calculan por curso; la no
+    colisión de profesores abarca todos los cursos del modelo. `variables`
+    reúne los dicts de variables por nombre ('horario', 'slot_ocupado',
+    'inicio_clase', ...).
+    """
+    import pulp
+    t = time.perf_counter()
+    ids_clases = list(clases_a_planificar.keys())
+    clases_por_curso, clases_por_profesor, bloqueos = _indices(clases_a_planificar, horarios_profesores_ocupados)
+    ids_cursos = list(clases_por_curso.keys())
+    dias = DIAS
+    horas = HORAS
+    n_horas = len(horas)
+    t = _fase(tiempos, 'indices', t)
+
+    # --- Definir el problema de optimización ---
+    prob = pulp.LpProblem("Generacion_Horarios_Optimizacion", pulp.LpMinimize)
+
+    # --- Variables de Decisión ---
+    vars_horario = pulp.LpVariable.dicts("Horario", (ids_clases, dias, horas), 0, 1, pulp.LpBinary)
+
+    # --- Variables Auxiliares para Costes (Centradas en el Día de cada Curso) ---
+    slot_ocupado = pulp.LpVariable.dicts("SlotOcupado", (ids_cursos, dias, horas), 0, 1, pulp.LpBinary)
+    horas_por_dia = pulp.LpVariable.dicts("HorasPorDia", (ids_cursos, dias), 0, None, pulp.LpInteger)
+    exceso_diario = pulp.LpVariable.dicts("ExcesoDiario", (ids_cursos, dias), 0, None, pulp.LpInteger)
+    inicio_bloque = pulp.LpVariable.dicts("InicioBloque", (ids_cursos, dias, horas), 0, 1, pulp.LpBinary)
+    hueco = pulp.LpVariable.dicts("Hueco", (ids_cursos, dias, horas), 0, 1, pulp.LpBinary)
+    inicio_clase = pulp.LpVariable.dicts("InicioClase", (ids_clases, dias, horas), 0, 1, pulp.LpBinary)
+    bloque_largo = pulp.LpVariable.dicts("BloqueLargo", (ids_clases, dias, horas), 0, 1, pulp.LpBinary)
+
+    # Vistas planas por slot (índice k_dia * n_horas + k_hora).
+    x = {id_c: [vars_horario[id_c][d][h] for d, h in SLOTS] for id_c in ids_clases}
+    so = {cu: [slot_ocupado[cu][d][h] for d, h in SLOTS] for cu in ids_cursos}
+    ib = {cu: [inicio_bloque[cu][d][h] for d, h in SLOTS] for cu in ids_cursos}
+    hu = {cu: [hueco[cu][d][h] for d, h in SLOTS] for cu in ids_cursos}
+    ic = {id_c: [inicio_clase[id_c][d][h] for d, h in SLOTS] for id_c in ids_clases}
+    bl = {id_c: [bloque_largo[id_c][d][h] for d, h in SLOTS] for id_c in ids_clases}
+    t = _fase(tiempos, 'variables', t)
+
+    # --- Función Objetivo (Minimizar Penalizaciones del Horario del Estudiante) ---
+    objetivo = {}
+    for cu in ids_cursos:
+        for d in dias:
+            objetivo[exceso_diario[cu][d]] = PENALIZACION_EXCESO_HORAS
+        _sumar(objetivo, ib[cu], PENALIZACION_INICIO_BLOQUE)
+        for kd in range(len(dias)):
+            _sumar(objetivo, hu[cu][kd * n_horas + 1:(kd + 1) * n_horas - 1], PENALIZACION_HUECO)
+    for id_c in ids_clases:
+        _sumar(objetivo, ic[id_c], PENALIZACION_FRAGMENTACION)
+        for kd in range(len(dias)):
+            _sumar(objetivo, bl[id_c][kd * n_horas:(kd + 1) * n_horas - 2], PENALIZACION_BLOQUE_LARGO)
+    prob += pulp.LpAffineExpression(objetivo), "Costo_Total_Horario_Estudiante"
+    t = _fase(tiempos, 'objetivo', t)
+
+    restricciones = {}
+    # --- Restricciones Duras (Innegociables) ---
+    # 1. Cada clase debe cumplir sus horas semanales
+    for id_c, clase in clases_a_planificar.items():
+        _restriccion(restricciones, dict.fromkeys(x[id_c], 1), _EQ, clase['horas_semana'], f"Horas_Semanales_{id_c}")
+
+    # 2. Unicidad del Slot de Horario (Un solo slot ocupado a la vez en cada curso)
+    for cu in ids_cursos:
+        for s, (d, h) in enumerate(SLOTS):
+            coef = {so[cu][s]: 1, **{x[id_c][s]: -1 for id_c in clases_por_curso[cu]}}
+            _restriccion(restricciones, coef, _EQ, 0, f"Define_Slot_Ocupado_{cu}_{d}_{h}")
+
+    # 3. No Colisión de Profesores (Un profesor solo puede dar una clase a la vez, en cualquier curso)
+    for id_p, clases_p in clases_por_profesor.items():
+        mascara = bloqueos[id_p]
+        for s, (d, h) in enumerate(SLOTS):
+            coef = {x[id_c][s]: 1 for id_c in clases_p}
+            if mascara >> s & 1:
+                _restriccion(restricciones, coef, _EQ, 0, f"Conflicto_Externo_Profesor_{id_p}_{d}_{h}")
+            else:
+                _restriccion(restricciones, coef, _LE, 1, f"Unicidad_Interna_Profesor_{id_p}_{d}_{h}")
+
+    # --- Restricciones para Cálculo de Costes (Penalizaciones Flexibles) ---
+    for cu in ids_cursos:
+        for kd, d in enumerate(dias):
+            base = kd * n_horas
+            # 4. Cálculo de horas totales por día
+            coef = {horas_por_dia[cu][d]: 1, **dict.fromkeys(so[cu][base:base + n_horas], -1)}
+            _restriccion(restricciones, coef, _EQ, 0, f"Calc_Horas_Por_Dia_{cu}_{d}")
+            # Penalización si las horas del día exceden el límite
+            _restriccion(restricciones, {exceso_diario[cu][d]: 1, horas_por_dia[cu][d]: -1}, _GE, -LIMITE_HORAS_DIARIAS,
+                         f"Penaliza_Exceso_{cu}_{d}")
+
+            # 5. Penalización por cada inicio de bloque en el día
+            _restriccion(restricciones, {ib[cu][base]: 1, so[cu][base]: -1}, _EQ, 0, f"Inicio_Bloque_Dia_0_{cu}_{d}")
+            for k in range(1, n_horas):
+                s = base + k
+                _restriccion(restricciones, {ib[cu][s]: 1, so[cu][s]: -1, so[cu][s - 1]: 1}, _GE, 0,
+                             f"Inicio_Bloque_Dia_Logic_{cu}_{d}_{horas[k]}")
+
+            # 6. Penalización por huecos en el día: un hueco es [OCUPADO, VACIO, OCUPADO]
+            for k in range(1, n_horas - 1):
+                s = base + k
+                _restriccion(restricciones, {hu[cu][s]: 1, so[cu][s - 1]: -1, so[cu][s + 1]: -1, so[cu][s]: 1}, _GE, -1,
+                             f"Hueco_Dia_Logic_{cu}_{d}_{horas[k]}")
+
+    for id_c in ids_clases:
+        xc, icc, blc = x[id_c], ic[id_c], bl[id_c]
+        for kd, d in enumerate(dias):
+            base = kd * n_horas
+            # 7. Fragmentación: un inicio en la primera hora del día se cuenta si la clase está asignada ahí,
+            # y en el resto de horas si la hora actual está ocupada y la anterior no.
+            _restriccion(restricciones, {icc[base]: 1, xc[base]: -1}, _GE, 0, f"Inicio_Clase_{id_c}_{d}_{horas[0]}")
+            # 8. Bloques de 3 horas o más (para priorizar bloques de 2): Largo >= (Hora1 + Hora2 + Hora3) - 2
+            for k in range(n_horas - 2):
+                s = base + k
+                _restriccion(restricciones, {blc[s]: 1, xc[s]: -1, xc[s + 1]: -1, xc[s + 2]: -1}, _GE, -2,
+                             f"Detecta_Bloque_Largo_{id_c}_{d}_{horas[k]}")
+            for k in range(1, n_horas):
+                s = base + k
+                _restriccion(restricciones, {icc[s]: 1, xc[s]: -1, xc[s - 1]: 1}, _GE, 0,
+                             f"Inicio_Clase_Logic_{id_c}_{d}_{horas[k]}")
+    prob.extend(restricciones)
+    _fase(tiempos, 'restricciones', t)
+
+    variables = {
+        'horario': vars_horario,
+        'slot_ocupado': slot_ocupado,
+        'horas_por_dia': horas_por_dia,
+        'exceso_diario': exceso_diario,
+        'inicio_bloque': inicio_bloque,
+        'hueco': hueco,
+        'inicio_clase': inicio_clase,
+        'bloque_largo': bloque_largo,
+    }
+    return prob, variables
+
+
+def construir_modelo_compacto(clases_a_planificar, horarios_profesores_ocupados, tiempos=None, romper_simetria=True):
+    """
+    Reformulación del modelo clásico con el mismo valor óptimo:
+
+    - `slot_ocupado` y `horas_por_dia` se sustituyen por las sumas que definen,
+      y `inicio_bloque`/`inicio_clase` en la primera hora por la ocupación misma.
+    - Las variables de penalización son continuas: al minimizar con costo
+      positivo toman el valor entero exacto cuando el horario es entero.
+    - Los slots bloqueados de un profesor fijan en 0 sus variables (cota superior)
+      en vez de añadir restricciones, y solo se añade la unicidad de un profesor
+      si tiene clases en más de un curso (dentro de un curso ya la garantiza la
+      unicidad del slot). Tampoco se crean `bloque_largo` para clases de menos
+      de 3 horas ni la unicidad del slot para cursos de una sola clase.
+    - Ruptura de simetría: si los días son intercambiables (mismos bloqueos en
+      todos) se ordenan por horas asignadas, de mayor a menor.
+    """
+    import pulp
+    t = time.perf_counter()
+    ids_clases = list(clases_a_planificar.keys())
+    clases_por_curso, clases_por_profesor, bloqueos = _indices(clases_a_planificar, horarios_profesores_ocupados)
+    ids_cursos = list(clases_por_curso.keys())
+    clases_largas = [id_c for id_c in ids_clases if clases_a_planificar[id_c]['horas_semana'] >= 3]
+    dias = DIAS
+    horas = HORAS
+    n_horas = len(horas)
+    t = _fase(tiempos, 'indices', t)
+
+    prob = pulp.LpProblem("Generacion_Horarios_Optimizacion", pulp.LpMinimize)
+
+    # --- Variables de Decisión (los slots bloqueados quedan fijos en 0) ---
+    vars_horario = pulp.LpVariable.dicts("Horario", (ids_clases, dias, horas), 0, 1, pulp.LpBinary)
+    x = {id_c: [vars_horario[id_c][d][h] for d, h in SLOTS] for id_c in ids_clases}
+    for id_c, clase in clases_a_planificar.items():
+        mascara = bloqueos[clase['id_profesor']]
+        s = 0
+        while mascara:
+            if mascara & 1:
+                x[id_c][s].upBound = 0
+            mascara >>= 1
+            s += 1
+
+    # --- Variables de penalización (continuas) ---
+    exceso_diario = pulp.LpVariable.dicts("ExcesoDiario", (ids_cursos, dias), 0, None)
+    inicio_bloque = pulp.LpVariable.dicts("InicioBloque", (ids_cursos, dias, horas[1:]), 0, 1)
+    hueco = pulp.LpVariable.dicts("Hueco", (ids_cursos, dias, horas[1:-1]), 0, 1)
+    inicio_clase = pulp.LpVariable.dicts("InicioClase", (ids_clases, dias, horas[1:]), 0, 1)
+    bloque_largo = pulp.LpVariable.dicts("BloqueLargo", (clases_largas, dias, horas[:-2]), 0, 1)
+    t = _fase(tiempos, 'variables', t)
+
+    # --- Función Objetivo ---
+    # El inicio de bloque (o de clase) en la primera hora es la ocupación de esa hora.
+    objetivo = {}
+    for cu in ids_cursos:
+        for kd, d in enumerate(dias):
+            objetivo[exceso_diario[cu][d]] = PENALIZACION_EXCESO_HORAS
+            _sumar(objetivo, inicio_bloque[cu][d].values(), PENALIZACION_INICIO_BLOQUE)
+            _sumar(objetivo, (x[id_c][kd * n_horas] for id_c in clases_por_curso[cu]), PENALIZACION_INICIO_BLOQUE)
+            _sumar(objetivo, hueco[cu][d].values(), PENALIZACION_HUECO)
+    for id_c in ids_clases:
+        for kd, d in enumerate(dias):
+            _sumar(objetivo, (x[id_c][kd * n_horas],), PENALIZACION_FRAGMENTACION)
+            _sumar(objetivo, inicio_clase[id_c][d].values(), PENALIZACION_FRAGMENTACION)
+    for id_c in clases_largas:
+        for d in dias:
+            _sumar(objetivo, bloque_largo[id_c][d].values(), PENALIZACION_BLOQUE_LARGO)
+    prob += pulp.LpAffineExpression(objetivo), "Costo_Total_Horario_Estudiante"
+    t = _fase(tiempos, 'objetivo', t)
+
+    restricciones = {}
+    # 1. Cada clase debe cumplir sus horas semanales
+    for id_c, clase in clases_a_planificar.items():
+        _restriccion(restricciones, dict.fromkeys(x[id_c], 1), _EQ, clase['horas_semana'], f"Horas_Semanales_{id_c}")
+
+    # 2. Unicidad del Slot de Horario en cada curso
+    for cu in ids_cursos:
+        if len(clases_por_curso[cu]) > 1:
+            for s, (d, h) in enumerate(SLOTS):
+                _restriccion(restricciones, {x[id_c][s]: 1 for id_c in clases_por_curso[cu]}, _LE, 1, f"Unicidad_Slot_{cu}_{d}_{h}")
+
+    # 3. No Colisión de Profesores entre cursos distintos
+    for id_p, clases_p in clases_por_profesor.items():
+        if len({clases_a_planificar[id_c]['id_curso'] for id_c in clases_p}) > 1:
+            mascara = bloqueos[id_p]
+            for s, (d, h) in enumerate(SLOTS):
+                if not mascara >> s & 1:
+                    _restriccion(restricciones, {x[id_c][s]: 1 for id_c in clases_p}, _LE, 1, f"Unicidad_Interna_Profesor_{id_p}_{d}_{h}")
+
+    # --- Penalizaciones del curso por día ---
+    for cu in ids_cursos:
+        clases_cu = clases_por_curso[cu]
+        for kd, d in enumerate(dias):
+            base = kd * n_horas
+            ocupacion = [[x[id_c][base + k] for id_c in clases_cu] for k in range(n_horas)]
+            ib = inicio_bloque[cu][d]
+            todas = [v for occ in ocupacion for v in occ]
+            coef = dict.fromkeys(todas, -1)
+            coef[exceso_diario[cu][d]] = 1
+            _restriccion(restricciones, coef, _GE, -LIMITE_HORAS_DIARIAS, f"Penaliza_Exceso_{cu}_{d}")
+            for k in range(1, n_horas):
+                coef = {ib[horas[k]]: 1, **dict.fromkeys(ocupacion[k], -1), **dict.fromkeys(ocupacion[k - 1], 1)}
+                _restriccion(restricciones, coef, _GE, 0, f"Inicio_Bloque_Dia_Logic_{cu}_{d}_{horas[k]}")
+            for k in range(1, n_horas - 1):
+                coef = {hueco[cu][d][horas[k]]: 1, **dict.fromkeys(ocupacion[k - 1], -1),
+                        **dict.fromkeys(ocupacion[k + 1], -1), **dict.fromkeys(ocupacion[k], 1)}
+                _restriccion(restricciones, coef, _GE, -1, f"Hueco_Dia_Logic_{cu}_{d}_{horas[k]}")
+
+    # --- Penalizaciones de la clase por día ---
+    for id_c in ids_clases:
+        xc = x[id_c]
+        largas = id_c in bloque_largo
+        for kd, d in enumerate(dias):
+            base = kd * n_horas
+            ic = inicio_clase[id_c][d]
+            for k in range(1, n_horas):
+                _restriccion(restricciones, {ic[horas[k]]: 1, xc[base + k]: -1, xc[base + k - 1]: 1}, _GE, 0,
+                             f"Inicio_Clase_Logic_{id_c}_{d}_{horas[k]}")
+            if largas:
+                bl = bloque_largo[id_c][d]
+                for k in range(n_horas - 2):
+                    s = base + k
+                    _restriccion(restricciones, {bl[horas[k]]: 1, xc[s]: -1, xc[s + 1]: -1, xc[s + 2]: -1}, _GE, -2,
+                                 f"Detecta_Bloque_Largo_{id_c}_{d}_{horas[k]}")
+
+    # --- Ruptura de simetría entre días intercambiables ---
+    if romper_simetria and _dias_intercambiables(bloqueos):
+        for kd in range(len(dias) - 1):
+            coef = {}
+            for id_c in ids_clases:
+                _sumar(coef, x[id_c][kd * n_horas:(kd + 1) * n_horas], 1)
+                _sumar(coef, x[id_c][(kd + 1) * n_horas:(kd + 2) * n_horas], -1)
+            _restriccion(restricciones, coef, _GE, 0, f"Simetria_Dias_{dias[kd]}_{dias[kd + 1]}")
+    prob.extend(restricciones)
+    _fase(tiempos, 'restricciones', t)
+
+    return prob, {'horario': vars_horario}
+
+
+def _dias_intercambiables(bloqueos):
+    """True si cada profesor tiene bloqueadas las mismas horas todos los días (`bloqueos`: id_profesor -> máscara)."""
+    n_horas = len(HORAS)
+    dia = (1 << n_horas) - 1
+    return all(len({mascara >> (kd * n_horas) & dia for kd in range(len(DIAS))}) == 1 for mascara in bloqueos.values())
+
+
+def canonizar_asignacion(clases_a_planificar, horarios_profesores_ocupados, asignacion):
+    """
+    Reordena los días de una asignación factible para que cumpla la ruptura de
+    simetría de la formulación compacta, sin cambiar su costo. Se usa antes de
+    pasarla como MIP start.
+    """
+    _, _, bloqueos = _indices(clases_a_planificar, horarios_profesores_ocupados)
+    if _dias_intercambiables(bloqueos):
+        horas_por_dia = {d: 0 for d in DIAS}
+        for _, d, _ in asignacion:
+            horas_por_dia[d] += 1
+        orden = sorted(DIAS, key=lambda d: -horas_por_dia[d])
+        nuevo_dia = {viejo: DIAS[i] for i, viejo in enumerate(orden)}
+        asignacion = [(id_c, nuevo_dia[d], h) for id_c, d, h in asignacion]
+    return asignacion
+
+
+def fijar_solucion_inicial(clases_a_planificar, variables, asignacion):
+    """
+    Asigna valores iniciales (MIP start) a todas las variables del modelo a
+    partir de una asignación factible [(id_clase, dia, hora)]: las variables
+    auxiliares toman el menor valor que cumple sus restricciones de definición.
+    En la formulación compacta solo hay que fijar las variables de decisión;
+    CBC completa las continuas.
+    """
+    dias, horas = DIAS, HORAS
+    asignados = set(asignacion)
+    if 'inicio_clase' not in variables:
+        for id_c in clases_a_planificar:
+            for d in dias:
+                for h in horas:
+                    variables['horario'][id_c][d][h].setInitialValue(int((id_c, d, h) in asignados))
+        return
+
+    for id_c in clases_a_planificar:
+        for d in dias:
+            ocupado = [(id_c, d, h) in asignados for h in horas]
+            for k, h in enumerate(horas):
+                variables['horario'][id_c][d][h].setInitialValue(int(ocupado[k]))
+                variables['inicio_clase'][id_c][d][h].setInitialValue(int(ocupado[k] and (k == 0 or not ocupado[k-1])))
+                largo = k + 2 < len(horas) and all(ocupado[k:k+3])
+                variables['bloque_largo'][id_c][d][h].setInitialValue(int(largo))
+
+    for id_curso in variables['slot_ocupado']:
+        clases_curso = [id_c for id_c, c in clases_a_planificar.items() if c['id_curso'] == id_curso]
+        for d in dias:
+            ocupado = [any((id_c, d, h) in asignados for id_c in clases_curso) for h in horas]
+            variables['horas_por_dia'][id_curso][d].setInitialValue(sum(ocupado))
+            variables['exceso_diario'][id_curso][d].setInitialValue(max(0, sum(ocupado) - LIMITE_HORAS_DIARIAS))
+            for k, h in enumerate(horas):
+                variables['slot_ocupado'][id_curso][d][h].setInitialValue(int(ocupado[k]))
+                variables['inicio_bloque'][id_curso][d][h].setInitialValue(int(ocupado[k] and (k == 0 or not ocupado[k-1])))
+                es_hueco = 0 < k < len(horas) - 1 and ocupado[k-1] and not ocupado[k] and ocupado[k+1]
+                variables['hueco'][id_curso][d][h].setInitialValue(int(es_hueco))
+
+
+def fijar_vecindario(prob, clases_a_planificar, variables, asignacion, dias_libres,
+                     penalizacion=PENALIZACION_MOVIMIENTO):
+    """
+    Restringe el modelo a reoptimizar un vecindario de la asignación guardada
+    [(id_clase, dia, hora)]: `dias_libres` es un dict id_clase -> días que se
+    pueden cambiar; el resto de los slots de cada clase queda fijo en su valor
+    actual. Dentro del vecindario, cada hora actual que no se conserve suma
+    `penalizacion` al objetivo (se resta por cada hora conservada), para mover
+    lo menos posible. Construir el modelo con `romper_simetria=False`.
+    """
+    import pulp
+    actuales = set(asignacion)
+    premio = {}
+    for id_c in clases_a_planificar:
+        libres = dias_libres.get(id_c, ())
+        for d, h in SLOTS:
+            variable = variables['horario'][id_c][d][h]
+            if d in libres:
+                if (id_c, d, h) in actuales:
+                    premio[variable] = -penalizacion
+            else:
+                variable.lowBound = variable.upBound = int((id_c, d, h) in actuales)
+    if premio:
+        prob.setObjective(prob.objective + pulp.LpAffineExpression(premio))
+
+
+def extraer_asignacion(clases_a_planificar, variables):
+    """Retorna la asignación [(id_clase, dia, hora)] de un modelo ya resuelto."""
+    vars_horario = variables['horario']
+    return [(id_c, d, h)
+            for id_c in clases_a_planificar
+            for d, h in SLOTS
+            if (vars_horario[id_c][d][h].varValue or 0) > 0.5]
@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, abort
 from database import get_db_connection
+import catalogos
 
 profesores_bp = Blueprint('profesores_bp', __name__)
 
@@ -8,8 +9,7 @@ profesores_bp = Blueprint('profesores_bp', __name__)
 def lista(): 
     """Renderiza la lista de profesores desde la base de datos."""
     conn = get_db_connection()
-    # Usamos el nombre completo de la tabla si es necesario
-    lista_profesores = conn.execute("SELECT id_profesor, cedula, nombre, correo, telefono FROM profesores ORDER BY nombre").fetchall()
+    lista_profesores = catalogos.obtener(conn, 'profesores')
     conn.close()
     return render_template("profesores.html", profesores=lista_profesores)
 
@@ -0,0 +1,284 @@
+"""
+Reparación incremental de un horario guardado.
+
+Cuando cambia una clase (sus horas semanales o su profesor en
+`gestion.update_clase`) o un profesor queda ocupado en otro horario del
+semestre, el horario se repara en lugar de borrarlo y generarlo de nuevo:
+
+1. Las entradas del cronograma se pasan a la grilla de `modelo.py` (una
+   entrada de varias horas ocupa varios slots).
+2. Se detectan las horas rotas: de clases que ya no son del curso o del
+   semestre, en slots donde el profesor está ocupado en otro horario o donde
+   coinciden dos clases del curso, y las clases cuyo número de horas ya no es
+   `horas_semana`.
+3. Se reoptimiza solo un vecindario: todos los días de las clases afectadas y,
+   para las demás clases del curso, los días con horas rotas. El resto queda
+   fijo (`modelo.fijar_vecindario`) y cada hora guardada que se mueve cuesta
+   PENALIZACION_MOVIMIENTO, así que CBC resuelve un modelo con pocas
+   variables libres y conserva todo lo que puede. Si el vecindario no tiene
+   solución, se reintenta con todo el curso libre, manteniendo ese costo.
+
+Solo se reescriben las entradas que cambian: las que conservan todas sus
+horas no se tocan y las horas nuevas se insertan de a una. Las entradas que
+no caen en la grilla horaria se conservan tal cual y cuentan para
+`horas_semana`; si suman más horas que las de la clase, la reparación no
+puede quitarlas y se informa para corregirlas a mano.
+
+Varios horarios se reparan con `reparar_horarios`, uno tras otro en el mismo
+trabajo, para que cada uno lea la ocupación de los profesores ya actualizada
+por los anteriores.
+"""
+import time
+from collections import Counter
+
+import generador
+import heuristica
+import modelo
+import telemetria
+from database import get_db_connection
+from generador import ErrorGeneracion
+from modelo import DIAS, HORAS
+from trabajos import TrabajoCancelado
+
+_HORAS_GRILLA = {int(h[:2]): h for h in HORAS}
+
+
+def _slots(entrada):
+    """Slots (dia, hora) de la grilla que cubre una entrada, o None si no cae en horas enteras de la grilla."""
+    if entrada['dia_num'] >= len(DIAS) or entrada['min_inicio'] % 60 or entrada['min_fin'] % 60:
+        return None
+    horas = range(entrada['min_inicio'] // 60, entrada['min_fin'] // 60)
+    if not horas or any(h not in _HORAS_GRILLA for h in horas):
+        return None
+    return [(DIAS[entrada['dia_num']], _HORAS_GRILLA[h]) for h in horas]
+
+
+def diagnosticar(clases_a_planificar, entradas, horarios_profesores_ocupados):
+    """
+    Compara las entradas guardadas con las clases y la ocupación actual.
+
+    Retorna (asignacion, fuera_de_grilla, afectadas, dias_afectados):
+    `asignacion` son las horas [(id_clase, dia, hora)] guardadas de las clases
+    del modelo; `fuera_de_grilla`, id_clase -> horas de entradas que no caen en
+    la grilla; `afectadas`, las clases con alguna hora rota o con un número de
+    horas distinto de `horas_semana`; y `dias_afectados`, los días con horas
+    rotas o con entradas de clases que ya no son del horario.
+    """
+    ocupados = {id_p: set(slots) for id_p, slots in horarios_profesores_ocupados.items()}
+    asignacion, fuera_de_grilla = [], Counter()
+    afectadas, dias_afectados = set(), set()
+    clases_por_slot = {}
+    for e in entradas:
+        id_c = e['id_clase']
+        slots = _slots(e)
+        if id_c not in clases_a_planificar:
+            if slots:
+                dias_afectados.add(slots[0][0])
+            continue
+        if slots is None:
+            fuera_de_grilla[id_c] += -(-(e['min_fin'] - e['min_inicio']) // 60)
+            continue
+        ocupado_profesor = ocupados.get(clases_a_planificar[id_c]['id_profesor'], ())
+        for d, h in slots:
+            asignacion.append((id_c, d, h))
+            clases_por_slot.setdefault((d, h), []).append(id_c)
+            if (d, h) in ocupado_profesor:
+                afectadas.add(id_c)
+                dias_afectados.add(d)
+    for (d, _), ids in clases_por_slot.items():
+        if len(ids) > 1:
+            afectadas.update(ids)
+            dias_afectados.add(d)
+    horas = Counter(id_c for id_c, _, _ in asignacion)
+    for id_c, clase in clases_a_planificar.items():
+        if horas[id_c] + fuera_de_grilla[id_c] != clase['horas_semana']:
+            afectadas.add(id_c)
+    return asignacion, fuera_de_grilla, afectadas, dias_afectados
+
+
+def _resolver_vecindario(clases_a_planificar, horarios_profesores_ocupados, asignacion, dias_libres, trabajo):
+    """Resuelve el modelo con todo fijo salvo `dias_libres` (ver modelo.fijar_vecindario)."""
+    import pulp  # solo la reparación con el motor exacto lo necesita (ver modelo.py)
+    fases = {}
+    prob, variables = modelo.construir_modelo(clases_a_planificar, horarios_profesores_ocupados, tiempos=fases,
+                                              romper_simetria=False)
+    modelo.fijar_vecindario(prob, clases_a_planificar, variables, asignacion, dias_libres)
+    t0 = time.perf_counter()
+    generador.resolver_cbc(prob, trabajo)
+    estado = pulp.LpStatus[prob.status]
+    return {
+        'estado': estado,
+        'asignacion': modelo.extraer_asignacion(clases_a_planificar, variables) if estado == 'Optimal' else [],
+        'estadisticas': {
+            'variables': len(prob.variables()),
+            'restricciones': prob.numConstraints(),
+            't_construccion': sum(fases.values()),
+            't_resolucion': time.perf_counter() - t0,
+        },
+    }
+
+
+def _escribir(conn, id_cronograma, clases_a_planificar, entradas, nueva):
+    """
+    Deja en el cronograma la asignación `nueva`: borra las entradas de clases
+    que ya no son del horario y las que perdieron alguna hora, e inserta las
+    horas que faltan (sin hacer commit).
+    """
+    nueva = set(nueva)
+    conservadas, borrar = set(), []
+    for e in entradas:
+        if e['id_clase'] not in clases_a_planificar:
+            borrar.append((e['id_detalle'],))
+            continue
+        slots = _slots(e)
+        if slots is None:
+            continue
+        claves = {(e['id_clase'], d, h) for d, h in slots}
+        if claves <= nueva and not claves & conservadas:
+            conservadas |= claves
+        else:
+            borrar.append((e['id_detalle'],))
+    conn.executemany("DELETE FROM detalle_cronogramas WHERE id_detalle = ?", borrar)
+    generador._guardar_asignacion(conn, clases_a_planificar, sorted(nueva - conservadas),
+                                  {clases_a_planificar[id_c]['id_curso']: id_cronograma for id_c, _, _ in nueva})
+
+
+def reparar_horario(trabajo, id_cronograma):
+    """
+    Cuerpo del trabajo de reparación de un horario guardado. Si nada está roto
+    no cambia nada; si no encuentra un horario válido lanza ErrorGeneracion y
+    el horario queda como estaba (a diferencia de la generación, no se elimina).
+    """
+    conn = get_db_connection()
+    ejecucion = {
+        'cursos': [],
+        'motor': 'reparacion',
+        'formulacion': modelo.FORMULACION_POR_DEFECTO,
+        'arranque': 'ninguno',
+        'tiempo_limite': generador.TIEMPO_LIMITE_SOLVER,
+        'constantes': generador.constantes_penalizacion(),
+        'componentes_cache': 0,
+    }
+    t0 = time.perf_counter()
+    try:
+        trabajo.comprobar_cancelacion()
+        cronograma = conn.execute("SELECT id_curso FROM cronogramas WHERE id_cronograma = ?", (id_cronograma,)).fetchone()
+        if cronograma is None:
+            raise ErrorGeneracion("El horario ya no existe.")
+        entradas = conn.execute("""
+            SELECT dc.id_detalle, dc.id_clase, dc.dia_num, dc.min_inicio, dc.min_fin, cl.id_semestre
+            FROM detalle_cronogramas dc JOIN clases cl ON dc.id_clase = cl.id_clase
+            WHERE dc.id_cronograma = ?
+        """, (id_cronograma,)).fetchall()
+        semestres = Counter(e['id_semestre'] for e in entradas if e['id_semestre'] is not None)
+        if cronograma['id_curso'] is None or not semestres:
+            raise ErrorGeneracion("El horario no tiene curso o entradas que reparar; usa la generación automática.")
+        id_curso = cronograma['id_curso']
+        id_semestre = semestres.most_common(1)[0][0]
+        ejecucion.update({'id_semestre': id_semestre, 'cursos': [id_curso], 'n_cursos': 1})
+
+        clases = generador._cargar_clases(conn, id_semestre, [id_curso])
+        profesores = {c['id_profesor'] for c in clases.values()}
+        ocupados = generador._cargar_profesores_ocupados(conn, id_semestre, profesores, excluir=[id_cronograma])
+        asignacion, fuera_de_grilla, afectadas, dias_afectados = diagnosticar(clases, entradas, ocupados)
+        # Las horas fuera de la grilla se conservan y cuentan para horas_semana
+        excedidas = [c for id_c, c in clases.items() if fuera_de_grilla[id_c] > c['horas_semana']]
+        if excedidas:
+            ejecucion['estado'] = 'Fuera de grilla'
+            raise ErrorGeneracion("Horas fuera de la grilla que superan las horas semanales: " + ", ".join(
+                f"'{c['nombre']}' ({fuera_de_grilla[c['id_clase']]} de {c['horas_semana']})" for c in excedidas)
+                + ". Corrige esas entradas a mano.")
+        clases = {id_c: dict(c, horas_semana=c['horas_semana'] - fuera_de_grilla[id_c]) for id_c, c in clases.items()}
+        sobrantes = [e for e in entradas if e['id_clase'] not in clases]
+        ejecucion.update({
+            'n_clases': len(clases),
+            'n_horas': sum(c['horas_semana'] for c in clases.values()),
+            'n_profesores': len(profesores),
+            'n_bloqueos': sum(len(set(slots)) for slots in ocupados.values()),
+            't_carga': time.perf_counter() - t0,
+        })
+        if not afectadas and not sobrantes:
+            ejecucion.update({'estado': 'Sin cambios', 'exito': 1})
+            return "El horario no necesita reparación."
+
+        # --- Vecindario: las clases afectadas completas y las demás en los días afectados ---
+        nueva, libres = asignacion, 0
+        if afectadas:
+            vecindario = {id_c: set(DIAS) for id_c in afectadas}
+            for id_c, d, _ in asignacion:
+                if id_c not in afectadas and d in dias_afectados:
+                    vecindario[id_c] = dias_afectados
+            intentos = [vecindario]
+            if any(vecindario.get(id_c) != set(DIAS) for id_c in clases):
+                intentos.append({id_c: set(DIAS) for id_c in clases})
+            estadisticas = []
+            for dias_libres in intentos:
+                resultado = _resolver_vecindario(clases, ocupados, asignacion, dias_libres, trabajo)
+                estadisticas.append(resultado['estadisticas'])
+                if resultado['estado'] == 'Optimal':
+                    break
+                trabajo.comprobar_cancelacion()
+            ejecucion.update({
+                'n_componentes': len(estadisticas),
+                **{clave: sum(e[clave] for e in estadisticas)
+                   for clave in ('variables', 'restricciones', 't_construccion', 't_resolucion')},
+            })
+            if resultado['estado'] != 'Optimal':
+                ejecucion['estado'] = resultado['estado']
+                raise ErrorGeneracion(f"No se pudo reparar el horario sin romper las restricciones. Estado: {resultado['estado']}. "
+                                      "Prueba con la generación automática.")
+            nueva = resultado['asignacion']
+            libres = sum(len(dias) for dias in dias_libres.values()) * len(HORAS)
+
+        _escribir(conn, id_cronograma, clases, entradas, nueva)
+        conn.commit()
+
+        antes, despues = set(asignacion), set(nueva)
+        quitadas = len(antes - despues) + sum(-(-(e['min_fin'] - e['min_inicio']) // 60) for e in sobrantes)
+        anadidas = len(despues - antes)
+        desglose = heuristica.desglose_costo(clases, nueva, DIAS, HORAS, ejecucion['constantes'])
+        costo = sum(t['costo'] for t in desglose.values())
+        trabajo.actualizar_objetivo(costo)
+        # Sin clases afectadas solo se quitaron entradas de clases que ya no son del horario.
+        ejecucion.update({'estado': 'Optimal' if afectadas else 'Reparado', 'exito': 1,
+                          'objetivo': costo, 'desglose': desglose})
+        total = len(clases) * len(DIAS) * len(HORAS)
+        return (f"Horario reparado: {quitadas} horas quitadas o movidas y {anadidas} añadidas "
+                f"({libres} de {total} slots reoptimizados). Costo de penalización: {costo:.2f}")
+    except BaseException as e:
+        conn.rollback()
+        ejecucion.setdefault('estado', 'Cancelado' if isinstance(e, TrabajoCancelado) else 'Error')
+        ejecucion['mensaje'] = str(e) or type(e).__name__
+        raise
+    finally:
+        ejecucion['t_total'] = time.perf_counter() - t0
+        telemetria.registrar(conn, ejecucion)
+        conn.close()
+
+
+def reparar_horarios(trabajo, ids_cronogramas):
+    """
+    Repara los horarios `ids_cronogramas` uno tras otro (ver reparar_horario).
+    Un horario que no se puede reparar no detiene a los demás; si alguno falla,
+    el trabajo termina con ErrorGeneracion y el detalle de cada uno.
+    """
+    mensajes, fallidos = [], 0
+    for id_cronograma in ids_cronogramas:
+        try:
+            mensajes.append(f"Horario {id_cronograma}: {reparar_horario(trabajo, id_cronograma)}")
+        except ErrorGeneracion as e:
+            fallidos += 1
+            mensajes.append(f"Horario {id_cronograma}: {e}")
+    if fallidos:
+        raise ErrorGeneracion(f"{fallidos} de {len(mensajes)} horarios no se pudieron reparar. " + " ".join(mensajes))
+    return " ".join(mensajes)
+
+
+def cronogramas_de_clase(conn, id_clase):
+    """Ids y nombres de los horarios guardados con entradas de la clase."""
+    return conn.execute("""
+        SELECT DISTINCT cr.id_cronograma, cr.nombre FROM detalle_cronogramas dc
+        JOIN cronogramas cr ON dc.id_cronograma = cr.id_cronograma
+        WHERE dc.id_clase = ?
+        ORDER BY cr.id_cronograma
+    """, (id_clase,)).fetchall()
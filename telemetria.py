@@ -0,0 +1,122 @@
+"""
+Historial persistente de la generación automática.
+
+`generador.generar_horarios` registra cada ejecución, termine bien o no, en la
+tabla `ejecuciones_solver`: tamaño de la entrada (cursos, clases, horas,
+profesores y slots bloqueados), tamaño del modelo, tiempos, estado, costo con
+su desglose por término y el motor, la formulación y las constantes de
+penalización usadas. La tabla está acotada a MAX_EJECUCIONES filas.
+
+`resumen` agrupa el historial por motor y rango de clases (cómo escala el
+tiempo con el tamaño) y por juego de constantes (qué cambió al modificar los
+`PENALIZACION_*`). Las ejecuciones que tomaron alguna componente de la caché
+de soluciones no entran en las series de tiempos.
+"""
+import json
+import logging
+import os
+import sqlite3
+
+MAX_EJECUCIONES = int(os.environ.get('HORARIOS_MAX_EJECUCIONES', 10000))
+# Límites superiores de los rangos de número de clases con que se agrupa el historial.
+RANGOS_CLASES = (10, 25, 50, 100, 250, 500)
+# Ejecuciones que muestra `recientes` por defecto.
+EJECUCIONES_RECIENTES = 50
+
+COLUMNAS = ('id_semestre', 'cursos', 'motor', 'formulacion', 'arranque', 'tiempo_limite', 'constantes',
+            'n_cursos', 'n_clases', 'n_horas', 'n_profesores', 'n_bloqueos', 'n_componentes',
+            'componentes_cache', 'variables', 'restricciones', 't_carga', 't_construccion', 't_resolucion',
+            't_total', 'estado', 'exito', 'objetivo', 'desglose', 'mensaje')
+_COLUMNAS_JSON = ('cursos', 'constantes', 'desglose')
+
+registro = logging.getLogger('horarios.telemetria')
+
+
+def _rango_clases():
+    """Expresión SQL con la etiqueta del rango de `n_clases` (p. ej. '11-25')."""
+    casos, desde = [], 1
+    for hasta in RANGOS_CLASES:
+        casos.append(f"WHEN n_clases <= {hasta} THEN '{desde}-{hasta}'")
+        desde = hasta + 1
+    return f"CASE {' '.join(casos)} ELSE '>{RANGOS_CLASES[-1]}' END"
+
+
+def registrar(conn, ejecucion):
+    """
+    Guarda una ejecución (dict con columnas de `ejecuciones_solver`; cursos,
+    constantes y desglose se guardan como JSON) y hace commit. Un fallo al
+    guardar se registra como aviso y no interrumpe la generación.
+    """
+    datos = {c: ejecucion.get(c) for c in COLUMNAS if c in ejecucion}
+    for columna in _COLUMNAS_JSON:
+        if datos.get(columna) is not None:
+            datos[columna] = json.dumps(datos[columna], sort_keys=True, ensure_ascii=False)
+    try:
+        conn.execute(f"INSERT INTO ejecuciones_solver ({', '.join(datos)}) VALUES ({', '.join('?' for _ in datos)})",
+                     tuple(datos.values()))
+        conn.execute("""
+            DELETE FROM ejecuciones_solver WHERE id_ejecucion <= (
+                SELECT id_ejecucion FROM ejecuciones_solver ORDER BY id_ejecucion DESC LIMIT 1 OFFSET ?
+            )
+        """, (MAX_EJECUCIONES,))
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        registro.warning("No se pudo registrar la ejecución del solver: %s", e)
+
+
+def _a_dict(fila):
+    datos = dict(fila)
+    for columna in _COLUMNAS_JSON:
+        if datos.get(columna) is not None:
+            datos[columna] = json.loads(datos[columna])
+    if 'exito' in datos:
+        datos['exito'] = bool(datos['exito'])
+    return datos
+
+
+def recientes(conn, limite=EJECUCIONES_RECIENTES):
+    """Las últimas `limite` ejecuciones, de la más reciente a la más antigua."""
+    filas = conn.execute("SELECT * FROM ejecuciones_solver ORDER BY id_ejecucion DESC LIMIT ?", (limite,))
+    return [_a_dict(f) for f in filas]
+
+
+def resumen(conn):
+    """
+    Agregados del historial:
+    - 'por_tamano': por motor, formulación y rango de clases, cuántas
+      ejecuciones hubo, cuántas tuvieron éxito y el promedio del tamaño del
+      modelo y de los tiempos (más el máximo de resolución);
+    - 'por_constantes': por motor, formulación y juego de constantes, el
+      periodo en que se usó, la tasa de éxito, el tiempo medio de resolución y
+      el costo medio por clase de las ejecuciones con éxito.
+    """
+    por_tamano = conn.execute(f"""
+        SELECT motor, formulacion, {_rango_clases()} AS rango_clases,
+               COUNT(*) AS ejecuciones, SUM(exito) AS exitosas,
+               ROUND(AVG(n_clases), 1) AS clases_promedio,
+               ROUND(AVG(variables)) AS variables_promedio,
+               ROUND(AVG(restricciones)) AS restricciones_promedio,
+               ROUND(AVG(t_construccion), 4) AS t_construccion_promedio,
+               ROUND(AVG(t_resolucion), 4) AS t_resolucion_promedio,
+               ROUND(MAX(t_resolucion), 4) AS t_resolucion_maximo,
+               ROUND(AVG(t_total), 4) AS t_total_promedio
+        FROM ejecuciones_solver
+        WHERE componentes_cache = 0 AND n_clases > 0
+        GROUP BY motor, formulacion, rango_clases
+        ORDER BY motor, formulacion, MIN(n_clases)
+    """).fetchall()
+    por_constantes = conn.execute("""
+        SELECT motor, formulacion, constantes,
+               MIN(fecha) AS desde, MAX(fecha) AS hasta,
+               COUNT(*) AS ejecuciones, SUM(exito) AS exitosas,
+               ROUND(AVG(CASE WHEN componentes_cache = 0 THEN t_resolucion END), 4) AS t_resolucion_promedio,
+               ROUND(AVG(CASE WHEN exito THEN objetivo / n_clases END), 4) AS costo_por_clase
+        FROM ejecuciones_solver
+        GROUP BY motor, formulacion, constantes
+        ORDER BY MAX(id_ejecucion) DESC
+    """).fetchall()
+    return {
+        'por_tamano': [dict(f) for f in por_tamano],
+        'por_constantes': [_a_dict(f) for f in por_constantes],
+    }
@@ -0,0 +1,305 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from database import get_db_connection
+
+# --- Configuración del pool de trabajos ---
+# Número de resoluciones que se ejecutan en paralelo. El resto espera en cola.
+MAX_TRABAJOS_SIMULTANEOS = int(os.environ.get('HORARIOS_MAX_TRABAJOS', 2))
+# Cantidad de trabajos terminados que se conservan para poder consultarlos.
+MAX_TRABAJOS_TERMINADOS = 200
+# Cada cuántos segundos se renueva el latido de los trabajos de este proceso, se guarda
+# el incumbente de los que están en ejecución y se revisan las cancelaciones pedidas
+# desde otro proceso.
+INTERVALO_SINCRONIZACION = 1.0
+# Un trabajo sin terminar cuyo latido tiene más de estos segundos quedó abandonado
+# (su proceso murió) y se marca como fallido (ver recuperar_trabajos).
+LATIDO_VENCIDO = 30.0
+
+registro = logging.getLogger('horarios.trabajos')
+_HOST = socket.gethostname()
+
+ESTADOS_TERMINALES = ('completado', 'fallido', 'cancelado')
+
+
+class TrabajoCancelado(Exception):
+    """Se lanza dentro de un trabajo cuando el usuario solicitó cancelarlo."""
+
+
+class Trabajo:
+    """Estado observable de una tarea en segundo plano (p. ej. una resolución de horario)."""
+
+    def __init__(self, descripcion, ids_cronogramas=(), reservados=()):
+        self.id_trabajo = uuid.uuid4().hex
+        self.descripcion = descripcion
+        self.ids_cronogramas = list(ids_cronogramas)
+        self.reservados = list(reservados)
+        self.estado = 'pendiente'
+        self.objetivo = None
+        self.mensaje = None
+        self.creado = time.time()
+        self.inicio = None
+        self.fin = None
+        self._cancelacion = threading.Event()
+        self._lock = threading.Lock()
+        self._proceso = None
+
+    @property
+    def cancelado(self):
+        return self._cancelacion.is_set()
+
+    def comprobar_cancelacion(self):
+        """Lanza TrabajoCancelado si se pidió la cancelación."""
+        if self.cancelado:
+            raise TrabajoCancelado("El trabajo fue cancelado por el usuario.")
+
+    def actualizar_objetivo(self, valor):
+        """Registra el mejor valor objetivo (incumbente) encontrado hasta ahora."""
+        self.objetivo = valor
+
+    def registrar_proceso(self, proceso):
+        """Asocia el subproceso del solver para poder terminarlo al cancelar."""
+        with self._lock:
+            self._proceso = proceso
+            if proceso is not None and self.cancelado:
+                proceso.terminate()
+
+    def cancelar(self):
+        with self._lock:
+            self._cancelacion.set()
+            if self._proceso is not None and self._proceso.poll() is None:
+                self._proceso.terminate()
+
+    @classmethod
+    def desde_fila(cls, fila):
+        """Copia de solo lectura de un trabajo guardado en la tabla `trabajos` (p. ej. de otro proceso)."""
+        trabajo = cls(fila['descripcion'], json.loads(fila['ids_cronogramas']), json.loads(fila['reservados']))
+        trabajo.id_trabajo = fila['id_trabajo']
+        for campo in ('estado', 'objetivo', 'mensaje', 'creado', 'inicio', 'fin'):
+            setattr(trabajo, campo, fila[campo])
+        if fila['cancelacion']:
+            trabajo._cancelacion.set()
+        return trabajo
+
+    def tiempo_transcurrido(self):
+        if self.inicio is None:
+            return 0.0
+        return (self.fin or time.time()) - self.inicio
+
+    def a_dict(self):
+        return {
+            'id_trabajo': self.id_trabajo,
+            'descripcion': self.descripcion,
+            'ids_cronogramas': self.ids_cronogramas,
+            'estado': self.estado,
+            'cancelacion_solicitada': self.cancelado,
+            'objetivo': self.objetivo,
+            'tiempo_transcurrido': round(self.tiempo_transcurrido(), 2),
+            'mensaje': self.mensaje,
+        }
+
+
+class GestorTrabajos:
+    """
+    Pool local de hilos que ejecuta trabajos. Los trabajos de este proceso se
+    guardan en memoria y su estado, además, en la tabla `trabajos`, de modo que
+    cualquier proceso web puede consultarlos o cancelarlos. Cada trabajo guarda
+    el proceso que lo ejecuta y un latido que renueva el hilo de sincronización;
+    los trabajos de un proceso que murió se recuperan (ver recuperar_trabajos).
+    """
+
+    def __init__(self, max_trabajos=MAX_TRABAJOS_SIMULTANEOS):
+        self._executor = ThreadPoolExecutor(max_workers=max_trabajos, thread_name_prefix='trabajo')
+        self._trabajos = {}
+        self._lock = threading.Lock()
+        self._sincronizador = None
+
+    def enviar(self, descripcion, funcion, *args, ids_cronogramas=(), reservados=()):
+        """
+        Encola `funcion(trabajo, *args)` y retorna el Trabajo inmediatamente.
+        El valor retornado por la función se guarda como mensaje del trabajo.
+        `reservados` son los cronogramas creados para el trabajo: si un reinicio
+        lo interrumpe, los que sigan vacíos se eliminan.
+        """
+        trabajo = Trabajo(descripcion, ids_cronogramas=ids_cronogramas, reservados=reservados)
+        conn = get_db_connection()
+        try:
+            conn.execute("""
+                INSERT INTO trabajos (id_trabajo, descripcion, estado, ids_cronogramas, reservados, creado, host, pid, latido)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (trabajo.id_trabajo, descripcion, trabajo.estado, json.dumps(trabajo.ids_cronogramas),
+                  json.dumps(trabajo.reservados), trabajo.creado, _HOST, os.getpid(), trabajo.creado))
+            conn.commit()
+        finally:
+            conn.close()
+        with self._lock:
+            self._trabajos[trabajo.id_trabajo] = trabajo
+            self._purgar_terminados()
+        self._iniciar_sincronizacion()
+        self._executor.submit(self._ejecutar, trabajo, funcion, args)
+        return trabajo
+
+    def obtener(self, id_trabajo):
+        """El trabajo de este proceso o, si lo ejecuta otro, una copia de su estado guardado (None si no existe)."""
+        self._iniciar_sincronizacion()
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+        if trabajo is not None:
+            return trabajo
+        conn = get_db_connection()
+        try:
+            fila = conn.execute("SELECT * FROM trabajos WHERE id_trabajo = ?", (id_trabajo,)).fetchone()
+        finally:
+            conn.close()
+        return Trabajo.desde_fila(fila) if fila else None
+
+    def cancelar(self, id_trabajo):
+        """Pide la cancelación; si el trabajo es de otro proceso, este la ve en su próxima sincronización."""
+        trabajo = self.obtener(id_trabajo)
+        if trabajo is not None and trabajo.estado not in ESTADOS_TERMINALES:
+            trabajo.cancelar()
+            conn = get_db_connection()
+            try:
+                conn.execute("UPDATE trabajos SET cancelacion = 1 WHERE id_trabajo = ?", (id_trabajo,))
+                conn.commit()
+            finally:
+                conn.close()
+        return trabajo
+
+    def _ejecutar(self, trabajo, funcion, args):
+        # La función siempre se invoca, aunque el trabajo ya esté cancelado,
+        # para que pueda liberar los recursos que reservó (p. ej. el cronograma).
+        trabajo.estado = 'ejecutando'
+        trabajo.inicio = time.time()
+        self._guardar(trabajo)
+        try:
+            trabajo.mensaje = funcion(trabajo, *args)
+            trabajo.estado = 'completado'
+        except TrabajoCancelado as e:
+            trabajo.mensaje = str(e)
+            trabajo.estado = 'cancelado'
+        except Exception as e:
+            trabajo.mensaje = str(e)
+            trabajo.estado = 'fallido'
+        finally:
+            trabajo.fin = time.time()
+            trabajo.registrar_proceso(None)
+            self._guardar(trabajo)
+
+    def _guardar(self, trabajo):
+        """Escribe el estado del trabajo en la tabla; al terminar, descarta las filas terminadas más antiguas."""
+        conn = get_db_connection()
+        try:
+            conn.execute("""
+                UPDATE trabajos SET estado = ?, objetivo = ?, mensaje = ?, inicio = ?, fin = ?, latido = ? WHERE id_trabajo = ?
+            """, (trabajo.estado, trabajo.objetivo, trabajo.mensaje, trabajo.inicio, trabajo.fin, time.time(),
+                  trabajo.id_trabajo))
+            if trabajo.estado in ESTADOS_TERMINALES:
+                conn.execute(f"""
+                    DELETE FROM trabajos WHERE id_trabajo IN (
+                        SELECT id_trabajo FROM trabajos WHERE estado IN ({", ".join("?" for _ in ESTADOS_TERMINALES)})
+                        ORDER BY creado DESC LIMIT -1 OFFSET ?
+                    )
+                """, (*ESTADOS_TERMINALES, MAX_TRABAJOS_TERMINADOS))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _iniciar_sincronizacion(self):
+        with self._lock:
+            if self._sincronizador is None:
+                self._sincronizador = threading.Thread(target=self._sincronizar, name='trabajos-sincronizacion', daemon=True)
+                self._sincronizador.start()
+
+    def _sincronizar(self):
+        """
+        Hilo que renueva el latido de los trabajos de este proceso, guarda el incumbente
+        de los que están en ejecución, aplica las cancelaciones pedidas por otros
+        procesos y recupera los trabajos abandonados por procesos que murieron.
+        """
+        while True:
+            time.sleep(INTERVALO_SINCRONIZACION)
+            with self._lock:
+                locales = {t.id_trabajo: t for t in self._trabajos.values() if t.estado not in ESTADOS_TERMINALES}
+            try:
+                conn = get_db_connection()
+                try:
+                    if locales:
+                        conn.executemany(f"""
+                            UPDATE trabajos SET latido = ?, objetivo = ?
+                            WHERE id_trabajo = ? AND estado NOT IN ({", ".join("?" for _ in ESTADOS_TERMINALES)})
+                        """, [(time.time(), t.objetivo, t.id_trabajo, *ESTADOS_TERMINALES) for t in locales.values()])
+                        conn.commit()
+                        marcadores = ", ".join("?" for _ in locales)
+                        for fila in conn.execute(f"SELECT id_trabajo FROM trabajos WHERE cancelacion = 1 AND id_trabajo IN ({marcadores})",
+                                                 list(locales)).fetchall():
+                            locales[fila['id_trabajo']].cancelar()
+                    recuperados = recuperar_trabajos(conn)
+                    if recuperados:
+                        registro.warning("%d trabajo(s) abandonados marcados como fallidos.", recuperados)
+                finally:
+                    conn.close()
+            except sqlite3.OperationalError as e:
+                # Base ocupada o bloqueada: se reintenta en la próxima vuelta.
+                registro.debug("Sincronización de trabajos postergada: %s", e)
+            except Exception:
+                registro.exception("Error en la sincronización de trabajos")
+
+    def _purgar_terminados(self):
+        terminados = [t for t in self._trabajos.values() if t.estado in ESTADOS_TERMINALES]
+        exceso = len(terminados) - MAX_TRABAJOS_TERMINADOS
+        if exceso > 0:
+            for trabajo in sorted(terminados, key=lambda t: t.creado)[:exceso]:
+                del self._trabajos[trabajo.id_trabajo]
+
+
+def _abandonado(fila, limite):
+    """True si el proceso dueño del trabajo ya no existe: murió en esta máquina o su latido venció."""
+    if fila['host'] == _HOST and fila['pid'] is not None and fila['pid'] != os.getpid():
+        try:
+            os.kill(fila['pid'], 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+    return fila['latido'] is None or fila['latido'] < limite
+
+
+def recuperar_trabajos(conn, vencimiento=LATIDO_VENCIDO):
+    """
+    Marca como fallidos los trabajos sin terminar cuyo proceso murió (ver
+    _abandonado) y elimina sus cronogramas reservados que sigan vacíos. Los
+    trabajos con un latido reciente siguen en ejecución y no se tocan. Lo
+    llama el hilo de sincronización de cada proceso; retorna cuántos marcó.
+    """
+    marcadores = ", ".join("?" for _ in ESTADOS_TERMINALES)
+    limite = time.time() - vencimiento
+    candidatos = [fila for fila in conn.execute(f"""
+        SELECT id_trabajo, reservados, host, pid, latido FROM trabajos WHERE estado NOT IN ({marcadores})
+    """, ESTADOS_TERMINALES).fetchall() if _abandonado(fila, limite)]
+    recuperados = 0
+    for fila in candidatos:
+        # Solo el proceso que gana la actualización libera las reservas, aunque varios lo intenten a la vez
+        marcado = conn.execute(f"""
+            UPDATE trabajos SET estado = 'fallido', mensaje = ?, fin = ?
+            WHERE id_trabajo = ? AND estado NOT IN ({marcadores}) AND latido IS ?
+        """, ("El trabajo se interrumpió porque el proceso que lo ejecutaba se detuvo.", time.time(),
+              fila['id_trabajo'], *ESTADOS_TERMINALES, fila['latido'])).rowcount
+        if marcado:
+            conn.executemany("""
+                DELETE FROM cronogramas WHERE id_cronograma = ?
+                  AND NOT EXISTS (SELECT 1 FROM detalle_cronogramas WHERE id_cronograma = ?)
+            """, [(id_c, id_c) for id_c in json.loads(fila['reservados'])])
+            recuperados += 1
+        conn.commit()
+    return recuperados
+
+
+gestor_trabajos = GestorTrabajos()